@@ -0,0 +1,791 @@
+"""
+性能基准测试脚本
+
+使用方法:
+    # PyTorch eager 与 ONNX Runtime 推理速度对比
+    python benchmark.py onnx --sizes 64 128 256
+
+    # 直接解码图像与预处理图块库的数据加载吞吐量对比
+    python benchmark.py dataset --samples 400 --workers 4
+
+    # 梯度检查点在不同设置下的峰值内存与单步训练用时
+    python benchmark.py memory --checkpoint-every 0 1 4 --batch-sizes 4 8
+
+    # 残差密集块：torch.cat 与预分配缓冲区的 CPU 推理对比
+    python benchmark.py rdb --sizes 64 128 256
+
+    # 各模型结构的推理帧率（例如 320x180 -> 1280x720）
+    python benchmark.py models --height 180 --width 320
+
+    # CPU 上 1/2/4 个进程 DistributedDataParallel 训练的扩展性（总线程数固定）
+    python benchmark.py ddp --procs 1 2 4 --batch-size 4
+
+    # 推理器启动用时：训练检查点与导出的推理权重（_weights.pth / .safetensors）对比
+    python benchmark.py startup --checkpoint ./checkpoints/best_model.pth
+
+    # 推理服务在并发请求下的吞吐量和延迟：不合并批次与动态批处理对比
+    python benchmark.py serving --clients 8 --max-batch-sizes 1 4
+
+    # 每张图像的格式转换开销（4K 输出）：主机端 NumPy 转换与设备端 uint8 转换对比
+    python benchmark.py convert --height 2160 --width 3840
+
+    # 命令行启动用时（python -X importtime），超出上限时以非零状态退出
+    python benchmark.py importtime --max-ms 500
+"""
+
+import os
+import argparse
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import yaml
+
+from models import build_model, MODEL_NAMES
+
+
+def load_config(config_path):
+    """加载配置文件"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def create_model(config, num_blocks=None, checkpoint_every=0, name=None):
+    """按配置创建随机初始化的模型（速度测试与权重无关）"""
+    model_cfg = dict(config['model'])
+    if num_blocks:
+        model_cfg['num_blocks'] = num_blocks
+    if name:
+        model_cfg['name'] = name
+
+    model = build_model(model_cfg, checkpoint_every=checkpoint_every)
+    model.eval()
+
+    return model
+
+
+def time_call(fn, runs, warmup=1):
+    """多次调用取平均用时（秒）"""
+    for _ in range(warmup):
+        fn()
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs
+
+
+def benchmark_onnx(args):
+    """PyTorch eager 与 ONNX Runtime CPU 推理对比"""
+    import torch
+    from utils.onnx_utils import export_onnx, OnnxRuntimeModel
+
+    config = load_config(args.config)
+    inference_cfg = config['inference']
+    intra_threads = args.intra_threads if args.intra_threads is not None else inference_cfg.get('ort_intra_threads', 0)
+    inter_threads = args.inter_threads if args.inter_threads is not None else inference_cfg.get('ort_inter_threads', 0)
+
+    torch.manual_seed(0)
+    model = create_model(config, args.num_blocks)
+    channels = config['model']['num_channels']
+
+    print("="*60)
+    print(f"ONNX Runtime 基准测试: {sum(p.numel() for p in model.parameters()):,} 参数, "
+          f"PyTorch 线程 {torch.get_num_threads()}, "
+          f"ORT intra 线程 {intra_threads or '默认'}, inter 线程 {inter_threads or '默认'}")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        onnx_path = os.path.join(tmp_dir, 'model.onnx')
+        export_onnx(model, onnx_path, in_channels=channels)
+        ort_model = OnnxRuntimeModel(onnx_path, intra_threads, inter_threads)
+
+        print(f"\n{'输入尺寸':>10} {'eager (ms)':>12} {'ORT (ms)':>12} {'加速':>8} {'最大差异':>10}")
+        for size in args.sizes:
+            x = torch.rand(args.batch_size, channels, size, size)
+
+            with torch.no_grad():
+                eager_time = time_call(lambda: model(x), args.runs)
+                expected = model(x)
+            ort_time = time_call(lambda: ort_model(x), args.runs)
+            max_diff = (ort_model(x) - expected).abs().max().item()
+
+            print(f"{size:>10} {eager_time*1000:>12.1f} {ort_time*1000:>12.1f} "
+                  f"{eager_time / ort_time:>7.2f}x {max_diff:>10.2e}")
+
+
+def benchmark_dataset(args):
+    """ImageDataset（每次解码整张图像）与 PatchDataset（内存映射图块库）吞吐量对比"""
+    from torch.utils.data import DataLoader
+    from utils import ImageDataset, PatchDataset, build_patch_store
+
+    config = load_config(args.config)
+    data_cfg = config['data']
+    scale = config['model']['scale']
+    image_dir = args.image_dir or data_cfg['train_dir']
+    store_dir = args.store_dir or data_cfg.get('patch_store')
+
+    def measure(dataset):
+        loader = DataLoader(dataset, batch_size=args.batch_size, shuffle=True, num_workers=args.workers)
+        samples = 0
+        start = time.perf_counter()
+        while samples < args.samples:
+            for lr_imgs, _ in loader:
+                samples += lr_imgs.shape[0]
+                if samples >= args.samples:
+                    break
+        return samples / (time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if not store_dir or not os.path.exists(os.path.join(store_dir, 'meta.json')):
+            store_dir = tmp_dir
+            build_patch_store(
+                image_dir, store_dir, scale=scale,
+                patch_size=data_cfg.get('patch_size', 480),
+                stride=data_cfg.get('patch_stride', 240)
+            )
+
+        print("="*60)
+        print(f"数据加载基准测试: hr_size {data_cfg['hr_size']}, 批次 {args.batch_size}, "
+              f"加载进程 {args.workers}, 样本数 {args.samples}")
+        print("="*60)
+
+        image_rate = measure(ImageDataset(image_dir, scale=scale, hr_size=data_cfg['hr_size']))
+        patch_rate = measure(PatchDataset(store_dir, scale=scale, hr_size=data_cfg['hr_size']))
+
+    print(f"\n{'数据集':>14} {'样本/秒':>10}")
+    print(f"{'ImageDataset':>14} {image_rate:>10.1f}")
+    print(f"{'PatchDataset':>14} {patch_rate:>10.1f}")
+    print(f"加速: {patch_rate / image_rate:.2f}x")
+
+
+def benchmark_memory(args):
+    """
+    梯度检查点的峰值内存与单步训练用时
+
+    CUDA 上统计 max_memory_allocated；CPU 上没有可靠的峰值内存接口，
+    改为统计前向传播中为反向保存的激活（不含参数），即检查点节省的那部分内存
+    """
+    import torch
+    import torch.nn as nn
+
+    config = load_config(args.config)
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    scale = config['model']['scale']
+    lr_size = config['data']['hr_size'] // scale
+    channels = config['model']['num_channels']
+
+    print("="*60)
+    print(f"梯度检查点基准测试: 设备 {device}, LR 输入 {lr_size}x{lr_size}, "
+          f"RRDB 块数 {args.num_blocks or config['model']['num_blocks']}")
+    print("="*60)
+
+    label = '峰值显存 (MB)' if device.type == 'cuda' else '保存的激活 (MB)'
+    print(f"\n{'批次':>6} {'检查点间隔':>10} {label:>16} {'单步用时 (ms)':>14}")
+
+    for batch_size in args.batch_sizes:
+        for checkpoint_every in args.checkpoint_every:
+            torch.manual_seed(0)
+            model = create_model(config, args.num_blocks, checkpoint_every, name='ESRGAN').to(device)
+            model.train()
+            optimizer = torch.optim.Adam(model.parameters(), lr=1e-4)
+            criterion = nn.L1Loss()
+
+            lr_imgs = torch.rand(batch_size, channels, lr_size, lr_size, device=device)
+            hr_imgs = torch.rand(batch_size, channels, lr_size * scale, lr_size * scale, device=device)
+
+            def train_step():
+                optimizer.zero_grad()
+                criterion(model(lr_imgs), hr_imgs).backward()
+                optimizer.step()
+                if device.type == 'cuda':
+                    torch.cuda.synchronize()
+
+            # 预热后再统计内存，避免计入优化器状态的首次分配
+            train_step()
+
+            if device.type == 'cuda':
+                torch.cuda.reset_peak_memory_stats(device)
+                train_step()
+                memory = torch.cuda.max_memory_allocated(device)
+            else:
+                param_storages = {p.untyped_storage().data_ptr() for p in model.parameters()}
+                saved = {}
+
+                def pack(tensor):
+                    ptr = tensor.untyped_storage().data_ptr()
+                    if ptr not in param_storages:
+                        saved[ptr] = tensor.untyped_storage().nbytes()
+                    return tensor
+
+                optimizer.zero_grad()
+                with torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+                    loss = criterion(model(lr_imgs), hr_imgs)
+                loss.backward()
+                memory = sum(saved.values())
+
+            step_time = time_call(train_step, args.runs, warmup=0)
+
+            print(f"{batch_size:>6} {checkpoint_every or '-':>10} {memory / 1024**2:>16.1f} {step_time*1000:>14.1f}")
+
+            del model, optimizer
+            if device.type == 'cuda':
+                torch.cuda.empty_cache()
+
+
+def benchmark_rdb(args):
+    """残差密集块 torch.cat 实现与预分配缓冲区实现的推理速度对比（输出应逐位一致）"""
+    import torch
+
+    config = load_config(args.config)
+    channels = config['model']['num_channels']
+
+    torch.manual_seed(0)
+    model = create_model(config, args.num_blocks, name='ESRGAN')
+
+    print("="*60)
+    print(f"残差密集块基准测试: 批次 {args.batch_size}, 线程 {torch.get_num_threads()}")
+    print("="*60)
+
+    print(f"\n{'输入尺寸':>10} {'cat (ms)':>12} {'缓冲区 (ms)':>12} {'加速':>8} {'最大差异':>10}")
+    for size in args.sizes:
+        x = torch.rand(args.batch_size, channels, size, size)
+
+        with torch.no_grad():
+            model.set_memory_efficient(False)
+            cat_time = time_call(lambda: model(x), args.runs)
+            expected = model(x)
+
+            model.set_memory_efficient(True)
+            buffer_time = time_call(lambda: model(x), args.runs)
+            max_diff = (model(x) - expected).abs().max().item()
+
+        print(f"{size:>10} {cat_time*1000:>12.1f} {buffer_time*1000:>12.1f} "
+              f"{cat_time / buffer_time:>7.2f}x {max_diff:>10.2e}")
+
+
+def benchmark_models(args):
+    """各模型结构在相同输入下的参数量、推理用时和帧率"""
+    import torch
+
+    config = load_config(args.config)
+    channels = config['model']['num_channels']
+    scale = config['model']['scale']
+
+    print("="*60)
+    print(f"模型基准测试: 输入 {args.width}x{args.height} -> {args.width * scale}x{args.height * scale}, "
+          f"线程 {torch.get_num_threads()}")
+    print("="*60)
+
+    x = torch.rand(1, channels, args.height, args.width)
+
+    print(f"\n{'模型':>16} {'参数量':>12} {'用时 (ms)':>12} {'帧率 (fps)':>12}")
+    for name in args.names:
+        torch.manual_seed(0)
+        model = create_model(config, name=name)
+        if hasattr(model, 'set_memory_efficient'):
+            model.set_memory_efficient(True)
+
+        with torch.no_grad():
+            elapsed = time_call(lambda: model(x), args.runs)
+
+        params = sum(p.numel() for p in model.parameters())
+        print(f"{name:>16} {params:>12,} {elapsed*1000:>12.1f} {1 / elapsed:>12.2f}")
+
+
+def _ddp_worker(rank, world_size, port, config, args, queue):
+    """DDP 基准测试的单个进程：合成数据上的训练步，rank 0 汇报平均单步用时"""
+    import torch
+    import torch.distributed as dist
+    import torch.nn.functional as F
+    from torch.nn.parallel import DistributedDataParallel
+
+    os.environ['MASTER_ADDR'] = '127.0.0.1'
+    os.environ['MASTER_PORT'] = str(port)
+    torch.set_num_threads(max(1, args.threads // world_size))
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+
+    torch.manual_seed(0)
+    model = create_model(config, num_blocks=args.num_blocks)
+    model.train()
+    ddp_model = DistributedDataParallel(model)
+    optimizer = torch.optim.Adam(ddp_model.parameters(), lr=1e-4)
+
+    channels = config['model']['num_channels']
+    scale = config['model']['scale']
+    lr = torch.rand(args.batch_size, channels, args.lr_size, args.lr_size)
+    hr = torch.rand(args.batch_size, channels, args.lr_size * scale, args.lr_size * scale)
+
+    def train_step():
+        optimizer.zero_grad()
+        F.l1_loss(ddp_model(lr), hr).backward()
+        optimizer.step()
+
+    elapsed = time_call(train_step, args.steps)
+
+    # 取最慢进程的用时（梯度同步使各进程步调一致）
+    elapsed = torch.tensor(elapsed)
+    dist.all_reduce(elapsed, op=dist.ReduceOp.MAX)
+    if rank == 0:
+        queue.put(elapsed.item())
+
+    dist.destroy_process_group()
+
+
+def _free_port():
+    """获取一个空闲的本地端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def benchmark_ddp(args):
+    """
+    CPU 上多进程 DDP（gloo 后端）训练的扩展性
+    总线程数固定，每个进程分得 threads / 进程数 个线程，每个进程的批次大小不变（与 Trainer 相同），
+    对比单步用时和全局吞吐量（样本/秒）
+    """
+    import torch
+    import torch.multiprocessing as mp
+
+    config = load_config(args.config)
+    args.threads = args.threads or torch.get_num_threads()
+
+    print("="*60)
+    print(f"DDP 扩展性测试: 每进程批次 {args.batch_size}, LR {args.lr_size}x{args.lr_size}, "
+          f"总线程 {args.threads}, gloo 后端")
+    print("="*60)
+
+    ctx = mp.get_context('spawn')
+    baseline = None
+
+    print(f"\n{'进程数':>6} {'线程/进程':>10} {'单步 (ms)':>12} {'样本/秒':>10} {'加速比':>8}")
+    for procs in args.procs:
+        queue = ctx.SimpleQueue()
+        mp.spawn(_ddp_worker, args=(procs, _free_port(), config, args, queue), nprocs=procs, join=True)
+        step_time = queue.get()
+
+        throughput = args.batch_size * procs / step_time
+        if baseline is None:
+            baseline = throughput
+
+        print(f"{procs:>6} {max(1, args.threads // procs):>10} {step_time*1000:>12.1f} "
+              f"{throughput:>10.2f} {throughput / baseline:>7.2f}x")
+
+
+# 在新进程中构建推理器（冷启动），输出构建用时
+_STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from inferencer import Inferencer
+imported = time.perf_counter()
+Inferencer(sys.argv[1], config_path=sys.argv[2], device='cpu', precision='fp32', backend='torch')
+print('STARTUP', imported - start, time.perf_counter() - imported)
+"""
+
+
+def _measure_startup(checkpoint_path, config_path):
+    """在新的 Python 进程中构建推理器，返回 (进程总用时, 导入用时, 推理器构建用时)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', _STARTUP_SCRIPT, checkpoint_path, config_path],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    total = time.perf_counter() - start
+
+    line = [l for l in result.stdout.splitlines() if l.startswith('STARTUP')][-1]
+    import_time, init_time = map(float, line.split()[1:])
+    return total, import_time, init_time
+
+
+def benchmark_startup(args):
+    """
+    推理器冷启动用时：训练检查点（含优化器状态，需要键名转换）与导出的推理权重对比
+    每种文件在新进程中加载 runs 次，取最小值
+    """
+    import torch
+    from utils.checkpoint_utils import save_inference_weights, safetensors
+
+    config = load_config(args.config)
+    config_path = os.path.abspath(args.config)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        checkpoint_path = args.checkpoint
+        if checkpoint_path is None:
+            # 生成与 Trainer 相同结构的检查点（模型 + Adam 状态）
+            torch.manual_seed(0)
+            model = create_model(config)
+            optimizer = torch.optim.Adam(model.parameters(), lr=1e-4)
+            for p in model.parameters():
+                p.grad = torch.zeros_like(p)
+            optimizer.step()
+
+            checkpoint_path = os.path.join(tmp_dir, 'train_checkpoint.pth')
+            torch.save({
+                'epoch': 1,
+                'model_state_dict': model.state_dict(),
+                'optimizer_state_dict': optimizer.state_dict()
+            }, checkpoint_path)
+        else:
+            checkpoint_path = os.path.abspath(checkpoint_path)
+
+        from inferencer import Inferencer
+        inferencer = Inferencer(checkpoint_path, config_path=config_path, device='cpu',
+                                precision='fp32', backend='torch')
+
+        files = [('训练检查点', checkpoint_path)]
+        files.append(('_weights.pth', os.path.join(tmp_dir, 'model_weights.pth')))
+        if safetensors is not None:
+            files.append(('.safetensors', os.path.join(tmp_dir, 'model.safetensors')))
+        else:
+            print("未安装 safetensors，跳过 .safetensors 格式")
+
+        for _, path in files[1:]:
+            save_inference_weights(inferencer.model, path, inferencer.config['model'])
+
+        print("="*60)
+        print(f"推理器启动测试: {config['model'].get('name', 'ESRGAN')}, 每种格式 {args.runs} 次取最小值")
+        print("="*60)
+
+        print(f"\n{'格式':>14} {'大小 (MB)':>10} {'进程 (s)':>10} {'导入 (s)':>10} {'构建 (ms)':>10}")
+        for label, path in files:
+            times = [_measure_startup(path, config_path) for _ in range(args.runs)]
+            total, import_time, init_time = (min(t[i] for t in times) for i in range(3))
+            size_mb = os.path.getsize(path) / 1024**2
+            print(f"{label:>14} {size_mb:>10.1f} {total:>10.2f} {import_time:>10.2f} {init_time*1000:>10.1f}")
+
+
+def benchmark_serving(args):
+    """
+    推理服务压力测试：clients 个客户端并发发送随机尺寸的 PNG 图像，
+    对比不同 max_batch_size 下的吞吐量、延迟分位数和实际平均批次大小
+    """
+    import urllib.request
+    import cv2
+    import numpy as np
+    import torch
+    from inferencer import Inferencer
+    from server import create_server
+    from utils.serving import ServingMetrics
+
+    config = load_config(args.config)
+    server_cfg = dict(config.get('server') or {})
+    server_cfg['max_wait_ms'] = args.max_wait_ms
+
+    # 尺寸在 [size - jitter, size] 内随机，检验相近尺寸的合并
+    rng = np.random.default_rng(0)
+    payloads = []
+    for _ in range(args.requests):
+        h, w = (args.height - rng.integers(0, args.size_jitter + 1),
+                args.width - rng.integers(0, args.size_jitter + 1))
+        image = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        payloads.append(cv2.imencode('.png', image)[1].tobytes())
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        torch.manual_seed(0)
+        checkpoint_path = os.path.join(tmp_dir, 'model.pth')
+        torch.save({'model_state_dict': create_model(config).state_dict()}, checkpoint_path)
+        inferencer = Inferencer(checkpoint_path, config_path=args.config, device='cpu',
+                                tile_size=0, precision='fp32', backend='torch')
+
+    print("="*60)
+    print(f"推理服务测试: {args.requests} 个请求, {args.clients} 个并发客户端, "
+          f"输入约 {args.width}x{args.height}（抖动 {args.size_jitter}）, 等待窗口 {args.max_wait_ms} ms")
+    print("="*60)
+
+    print(f"\n{'最大批次':>8} {'吞吐 (张/秒)':>12} {'平均批次':>10} {'p50 (ms)':>10} {'p90 (ms)':>10} {'p99 (ms)':>10}")
+    for max_batch_size in args.max_batch_sizes:
+        server_cfg['max_batch_size'] = max_batch_size
+        server = create_server(inferencer, '127.0.0.1', 0, server_cfg)
+        url = f"http://127.0.0.1:{server.server_address[1]}/upscale"
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def send(payload):
+            with urllib.request.urlopen(urllib.request.Request(url, data=payload), timeout=600) as response:
+                return response.read()
+
+        try:
+            send(payloads[0])  # 预热
+            server.batcher.metrics = ServingMetrics()
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.clients) as pool:
+                list(pool.map(send, payloads))
+            elapsed = time.perf_counter() - start
+
+            stats = server.batcher.metrics.snapshot()
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.batcher.close()
+
+        print(f"{max_batch_size:>8} {args.requests / elapsed:>12.2f} {stats['avg_batch_size']:>10.2f} "
+              f"{stats['latency_p50_ms']:>10.1f} {stats['latency_p90_ms']:>10.1f} {stats['latency_p99_ms']:>10.1f}")
+
+
+def _numpy_image_to_tensor(image, device):
+    """原实现: 主机上转 float32、归一化、转置，再把 float32 拷贝到设备"""
+    import numpy as np
+    import torch
+
+    img = np.transpose(image.astype(np.float32) / 255.0, (2, 0, 1))
+    return torch.from_numpy(img).unsqueeze(0).to(device)
+
+
+def _numpy_tensor_to_image(tensor):
+    """原实现: float32 拷回主机后用 NumPy 转置、反归一化和量化"""
+    import numpy as np
+
+    img = np.transpose(tensor.squeeze(0).detach().cpu().numpy(), (1, 2, 0))
+    return np.clip(img * 255.0, 0, 255).astype(np.uint8)
+
+
+def benchmark_convert(args):
+    """
+    单张图像的输入/输出格式转换用时（不含推理）
+    输入为 (height / scale) x (width / scale) 的 uint8 LR 图像，输出为 height x width 的模型输出
+    """
+    import numpy as np
+    import torch
+    from utils import image_to_tensor, tensor_to_image
+
+    config = load_config(args.config)
+    scale = config['model']['scale']
+    devices = ['cpu'] + (['cuda'] if torch.cuda.is_available() else [])
+
+    lr_image = np.random.randint(0, 256, (args.height // scale, args.width // scale, 3), dtype=np.uint8)
+
+    print("="*60)
+    print(f"格式转换测试: 输入 {lr_image.shape[1]}x{lr_image.shape[0]} -> 输出 {args.width}x{args.height}, "
+          f"线程 {torch.get_num_threads()}")
+    print("="*60)
+
+    print(f"\n{'设备':>6} {'转换':>8} {'NumPy (ms)':>12} {'设备端 (ms)':>12} {'加速比':>8} {'一致':>6}")
+    for name in devices:
+        device = torch.device(name)
+        sr_tensor = torch.rand(1, 3, args.height, args.width, device=device)
+
+        def sync(result):
+            if device.type == 'cuda':
+                torch.cuda.synchronize()
+            return result
+
+        cases = [
+            ('输入', lambda: sync(_numpy_image_to_tensor(lr_image, device)),
+             lambda: sync(image_to_tensor(lr_image, device=device))),
+            ('输入 CL', lambda: sync(_numpy_image_to_tensor(lr_image, device)),
+             lambda: sync(image_to_tensor(lr_image, device=device, channels_last=True))),
+            ('输出', lambda: _numpy_tensor_to_image(sr_tensor), lambda: tensor_to_image(sr_tensor))
+        ]
+
+        for label, numpy_fn, device_fn in cases:
+            numpy_time = time_call(numpy_fn, args.runs)
+            device_time = time_call(device_fn, args.runs)
+            a, b = numpy_fn(), device_fn()
+            same = torch.equal(a, b) if isinstance(a, torch.Tensor) else np.array_equal(a, b)
+            print(f"{name:>6} {label:>8} {numpy_time*1000:>12.2f} {device_time*1000:>12.2f} "
+                  f"{numpy_time / device_time:>7.2f}x {'是' if same else '否':>6}")
+
+
+# 启动用时检查的默认对象：轻量的包和只在解析参数后才导入 torch 的脚本
+IMPORTTIME_MODULES = ('utils', 'models', 'inference', 'train', 'benchmark')
+IMPORTTIME_SCRIPTS = ('inference.py', 'train.py', 'server.py', 'export.py', 'prune.py',
+                      'prepare_patches.py', 'benchmark.py')
+# 导入较慢的依赖，轻量入口不应该导入它们
+HEAVY_MODULES = ('torch', 'cv2', 'PIL', 'onnxruntime')
+
+
+def _run_importtime(argv):
+    """
+    在新进程中用 python -X importtime 运行 argv
+
+    Returns:
+        {模块名: 累计导入用时（秒）}
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + argv,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    )
+
+    # 每行格式: "import time: self [us] | cumulative | imported package"，嵌套导入以缩进表示
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        times[fields[2].strip()] = int(fields[1]) / 1e6
+
+    return times
+
+
+def _import_times(module):
+    """
+    在新进程中导入 module
+
+    Returns:
+        (module 的累计导入用时（秒）, {模块名: 累计用时（秒）})
+    """
+    times = _run_importtime(['-c', f'import {module}'])
+    return times.get(module, 0.0), times
+
+
+def _measure_help(script, runs):
+    """
+    script --help 的进程总用时（秒，取 runs 次中的最小值）和其间导入的较慢依赖
+    """
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, script, '--help'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
+        )
+        best = min(best, time.perf_counter() - start)
+
+    times = _run_importtime([script, '--help'])
+    return best, [name for name in HEAVY_MODULES if name in times]
+
+
+def benchmark_importtime(args):
+    """
+    命令行启动用时（python -X importtime）
+    报告各模块的累计导入用时和是否导入了较慢的依赖，以及各脚本 --help 的进程总用时；
+    设置 --max-ms 时任一项超出即以非零状态退出，可作为启动用时的回归检查
+    """
+    modules = args.modules or list(IMPORTTIME_MODULES)
+    scripts = args.scripts if args.scripts is not None else list(IMPORTTIME_SCRIPTS)
+    failures = []
+
+    print("="*60)
+    print(f"启动用时测试: Python {sys.version.split()[0]}")
+    print("="*60)
+
+    # torch 的导入用时作为参照
+    torch_time, _ = _import_times('torch')
+    print(f"\n参照: import torch {torch_time*1000:.0f} ms")
+
+    print(f"\n{'模块':<16} {'导入 (ms)':>10}  {'较慢的依赖'}")
+    for module in modules:
+        total, times = _import_times(module)
+        heavy = [name for name in HEAVY_MODULES if name in times]
+        print(f"{module:<16} {total*1000:>10.1f}  {', '.join(heavy) or '无'}")
+        if args.max_ms is not None and total * 1000 > args.max_ms:
+            failures.append(f"import {module}")
+
+    if scripts:
+        print(f"\n{'脚本':<24} {'--help (ms)':>12}  {'较慢的依赖'}")
+        for script in scripts:
+            help_time, heavy = _measure_help(script, args.runs)
+            print(f"{script:<24} {help_time*1000:>12.1f}  {', '.join(heavy) or '无'}")
+            if args.max_ms is not None and help_time * 1000 > args.max_ms:
+                failures.append(f"{script} --help")
+
+    if failures:
+        print(f"\n超出 {args.max_ms:g} ms: {', '.join(failures)}")
+        sys.exit(1)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='DLSS 性能基准测试')
+    parser.add_argument('--config', type=str, default='config.yaml', help='配置文件路径')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    onnx_parser = subparsers.add_parser('onnx', help='PyTorch eager 与 ONNX Runtime 推理对比')
+    onnx_parser.add_argument('--sizes', type=int, nargs='+', default=[64, 128, 256], help='输入边长（LR 像素）')
+    onnx_parser.add_argument('--batch-size', type=int, default=1, help='批次大小')
+    onnx_parser.add_argument('--runs', type=int, default=5, help='每个尺寸的计时次数')
+    onnx_parser.add_argument('--num-blocks', type=int, default=None, help='RRDB 块数（默认使用配置文件）')
+    onnx_parser.add_argument('--intra-threads', type=int, default=None, help='ORT intra_op 线程数')
+    onnx_parser.add_argument('--inter-threads', type=int, default=None, help='ORT inter_op 线程数')
+    onnx_parser.set_defaults(func=benchmark_onnx)
+
+    dataset_parser = subparsers.add_parser('dataset', help='直接解码图像与预处理图块库的数据加载对比')
+    dataset_parser.add_argument('--image-dir', type=str, default=None, help='训练图像目录（默认 data.train_dir）')
+    dataset_parser.add_argument('--store-dir', type=str, default=None,
+                                help='图块库目录（默认 data.patch_store，不存在时临时生成）')
+    dataset_parser.add_argument('--samples', type=int, default=200, help='每个数据集读取的样本数')
+    dataset_parser.add_argument('--batch-size', type=int, default=16, help='批次大小')
+    dataset_parser.add_argument('--workers', type=int, default=0, help='数据加载进程数')
+    dataset_parser.set_defaults(func=benchmark_dataset)
+
+    memory_parser = subparsers.add_parser('memory', help='梯度检查点的峰值内存与单步训练用时')
+    memory_parser.add_argument('--checkpoint-every', type=int, nargs='+', default=[0, 1, 4],
+                               help='检查点间隔（RRDB 块数，0 表示关闭）')
+    memory_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[4, 8], help='批次大小')
+    memory_parser.add_argument('--runs', type=int, default=3, help='每个设置的计时次数')
+    memory_parser.add_argument('--num-blocks', type=int, default=None, help='RRDB 块数（默认使用配置文件）')
+    memory_parser.set_defaults(func=benchmark_memory)
+
+    rdb_parser = subparsers.add_parser('rdb', help='残差密集块 torch.cat 与预分配缓冲区的推理对比')
+    rdb_parser.add_argument('--sizes', type=int, nargs='+', default=[64, 128, 256], help='输入边长（LR 像素）')
+    rdb_parser.add_argument('--batch-size', type=int, default=1, help='批次大小')
+    rdb_parser.add_argument('--runs', type=int, default=3, help='每个尺寸的计时次数')
+    rdb_parser.add_argument('--num-blocks', type=int, default=None, help='RRDB 块数（默认使用配置文件）')
+    rdb_parser.set_defaults(func=benchmark_rdb)
+
+    models_parser = subparsers.add_parser('models', help='各模型结构的推理帧率对比')
+    models_parser.add_argument('--names', type=str, nargs='+', default=list(MODEL_NAMES),
+                               choices=MODEL_NAMES, help='模型名称')
+    models_parser.add_argument('--height', type=int, default=180, help='输入高度（LR 像素）')
+    models_parser.add_argument('--width', type=int, default=320, help='输入宽度（LR 像素）')
+    models_parser.add_argument('--runs', type=int, default=3, help='计时次数')
+    models_parser.set_defaults(func=benchmark_models)
+
+    ddp_parser = subparsers.add_parser('ddp', help='CPU 上多进程 DDP 训练的扩展性')
+    ddp_parser.add_argument('--procs', type=int, nargs='+', default=[1, 2, 4], help='进程数')
+    ddp_parser.add_argument('--threads', type=int, default=None, help='所有进程的总线程数（默认当前线程数）')
+    ddp_parser.add_argument('--batch-size', type=int, default=4, help='每个进程的批次大小')
+    ddp_parser.add_argument('--lr-size', type=int, default=32, help='LR 输入边长')
+    ddp_parser.add_argument('--steps', type=int, default=5, help='计时的训练步数')
+    ddp_parser.add_argument('--num-blocks', type=int, default=None, help='RRDB 块数（默认使用配置文件）')
+    ddp_parser.set_defaults(func=benchmark_ddp)
+
+    startup_parser = subparsers.add_parser('startup', help='训练检查点与导出推理权重的推理器启动用时')
+    startup_parser.add_argument('--checkpoint', type=str, default=None,
+                                help='训练检查点路径（默认生成随机权重的临时检查点）')
+    startup_parser.add_argument('--runs', type=int, default=3, help='每种格式的启动次数')
+    startup_parser.set_defaults(func=benchmark_startup)
+
+    serving_parser = subparsers.add_parser('serving', help='推理服务的并发吞吐量和延迟')
+    serving_parser.add_argument('--max-batch-sizes', type=int, nargs='+', default=[1, 4],
+                                help='动态批处理的最大批次')
+    serving_parser.add_argument('--clients', type=int, default=8, help='并发客户端数')
+    serving_parser.add_argument('--requests', type=int, default=32, help='请求总数')
+    serving_parser.add_argument('--height', type=int, default=64, help='输入高度（LR 像素）')
+    serving_parser.add_argument('--width', type=int, default=64, help='输入宽度（LR 像素）')
+    serving_parser.add_argument('--size-jitter', type=int, default=8, help='输入尺寸的随机减小量')
+    serving_parser.add_argument('--max-wait-ms', type=float, default=10, help='凑批次的最长等待时间（毫秒）')
+    serving_parser.set_defaults(func=benchmark_serving)
+
+    convert_parser = subparsers.add_parser('convert', help='图像与 tensor 格式转换的开销')
+    convert_parser.add_argument('--height', type=int, default=2160, help='输出高度（HR 像素）')
+    convert_parser.add_argument('--width', type=int, default=3840, help='输出宽度（HR 像素）')
+    convert_parser.add_argument('--runs', type=int, default=10, help='计时次数')
+    convert_parser.set_defaults(func=benchmark_convert)
+
+    importtime_parser = subparsers.add_parser('importtime', help='模块导入和命令行 --help 的启动用时')
+    importtime_parser.add_argument('--modules', type=str, nargs='+', default=None,
+                                  help=f"要导入的模块（默认 {' '.join(IMPORTTIME_MODULES)}）")
+    importtime_parser.add_argument('--scripts', type=str, nargs='*', default=None,
+                                  help=f"要测 --help 用时的脚本（默认 {' '.join(IMPORTTIME_SCRIPTS)}）")
+    importtime_parser.add_argument('--runs', type=int, default=3, help='每个脚本的启动次数')
+    importtime_parser.add_argument('--max-ms', type=float, default=None,
+                                  help='用时上限（毫秒），超出时以非零状态退出')
+    importtime_parser.set_defaults(func=benchmark_importtime)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,6 @@
 import os
 import sys
 from pathlib import Path
-import torch
 
 # 设置 UTF-8 编码
 if sys.platform == 'win32':
@@ -40,7 +39,8 @@ def estimate_time():
         print("请先准备数据集，运行: python check_dataset.py")
         return
     
-    # 2. 检查硬件
+    # 2. 检查硬件（torch 导入较慢，确认有训练数据后再导入）
+    import torch
     has_gpu = torch.cuda.is_available()
     print(f"\n2. 硬件配置:")
     
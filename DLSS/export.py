@@ -0,0 +1,68 @@
+"""
+模型导出脚本
+将训练好的权重导出为部署格式
+
+使用方法:
+    python export.py --checkpoint ./checkpoints/best_model.pth --format onnx --output ./checkpoints/esrgan.onnx
+
+    # 只含推理权重的快速加载格式（去掉优化器等训练状态，加载时内存映射）
+    python export.py --checkpoint ./checkpoints/best_model.pth --format safetensors
+    python export.py --checkpoint ./checkpoints/best_model.pth --format pth
+"""
+
+import os
+import argparse
+
+
+# 默认输出文件名后缀（pth 加 _weights 以免覆盖训练检查点）
+OUTPUT_SUFFIXES = {
+    'onnx': '.onnx',
+    'safetensors': '.safetensors',
+    'pth': '_weights.pth'
+}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='ESRGAN 模型导出')
+    parser.add_argument('--checkpoint', type=str, default='./checkpoints/final_model.pth',
+                       help='模型权重路径')
+    parser.add_argument('--config', type=str, default='config.yaml', help='配置文件路径')
+    parser.add_argument('--format', type=str, default='onnx', choices=list(OUTPUT_SUFFIXES), help='导出格式')
+    parser.add_argument('--output', type=str, default=None,
+                       help='输出路径（默认与权重文件同名，按导出格式替换扩展名）')
+    parser.add_argument('--opset', type=int, default=17, help='ONNX opset 版本')
+
+    args = parser.parse_args()
+
+    if args.output is None:
+        args.output = os.path.splitext(args.checkpoint)[0] + OUTPUT_SUFFIXES[args.format]
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+
+    # 推理器和导出工具依赖 torch，解析参数后再导入
+    from inferencer import Inferencer
+    from utils.onnx_utils import export_onnx
+    from utils.checkpoint_utils import save_inference_weights
+
+    # 复用推理器的模型构建和权重键名转换
+    inferencer = Inferencer(
+        checkpoint_path=args.checkpoint,
+        config_path=args.config,
+        device='cpu',
+        precision='fp32',
+        backend='torch'
+    )
+
+    if args.format == 'onnx':
+        export_onnx(
+            inferencer.model,
+            args.output,
+            in_channels=inferencer.config['model']['num_channels'],
+            opset_version=args.opset
+        )
+    else:
+        save_inference_weights(inferencer.model, args.output, inferencer.config['model'])
+
+
+if __name__ == "__main__":
+    main()
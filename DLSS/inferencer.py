@@ -0,0 +1,765 @@
+"""
+ESRGAN 推理器
+用于使用训练好的模型进行图像和视频超分辨率处理（命令行入口见 inference.py）
+"""
+
+import os
+import contextlib
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import torch
+import yaml
+
+from models import ESRGAN, build_model
+from utils import load_image, save_image, image_to_tensor, tensor_to_image, calculate_psnr, tiled_forward
+from utils.quantization import bf16_supported, load_calibration_batches, quantize_int8
+from utils.onnx_utils import OnnxRuntimeModel
+from utils.checkpoint_utils import read_checkpoint, is_inference_weights, load_model_weights, build_model_from_weights
+from utils.inference_options import PRECISIONS, BACKENDS, VIDEO_EXTENSIONS
+
+
+class Inferencer:
+    """推理器类"""
+    
+    PRECISIONS = PRECISIONS
+    BACKENDS = BACKENDS
+    VIDEO_EXTENSIONS = VIDEO_EXTENSIONS
+    
+    def __init__(self, checkpoint_path, config_path='config.yaml', device=None,
+                 tile_size=None, tile_pad=None, tile_batch_size=None, precision=None,
+                 backend=None):
+        """
+        初始化推理器
+        
+        Args:
+            checkpoint_path: 模型权重文件路径
+            config_path: 配置文件路径
+            device: 计算设备 ('cuda' 或 'cpu')
+            tile_size: 分块推理的图块大小（LR 像素），0 表示整图推理；None 使用配置文件
+            tile_pad: 相邻图块的重叠边距；None 使用配置文件
+            tile_batch_size: 每次前向传播合并的图块数；None 使用配置文件
+            precision: 推理精度 ('fp32' / 'bf16' / 'int8')；None 使用配置文件
+            backend: 推理后端 ('torch' / 'onnxruntime')；onnxruntime 时 checkpoint_path 为 .onnx 文件
+        """
+        # 加载配置
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = yaml.safe_load(f)
+        
+        # 设置设备
+        if device is None:
+            device = self.config['inference']['device']
+        
+        self.device = torch.device(device if torch.cuda.is_available() else 'cpu')
+        print(f"使用设备: {self.device}")
+        
+        # 分块推理设置
+        inference_cfg = self.config['inference']
+        self.tile_size = tile_size if tile_size is not None else inference_cfg.get('tile_size', 0)
+        self.tile_pad = tile_pad if tile_pad is not None else inference_cfg.get('tile_pad', 16)
+        self.tile_batch_size = (tile_batch_size if tile_batch_size is not None
+                                else inference_cfg.get('tile_batch_size', 4))
+        
+        if self.tile_size:
+            print(f"分块推理: 图块 {self.tile_size}, 重叠 {self.tile_pad}, 批次 {self.tile_batch_size}")
+        
+        # 推理后端
+        if backend is None:
+            backend = inference_cfg.get('backend', 'torch')
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的推理后端: {backend}")
+        self.backend = backend
+        
+        # 推理精度
+        if precision is None:
+            precision = inference_cfg.get('precision', 'fp32')
+        
+        if backend == 'onnxruntime':
+            self._setup_onnxruntime(checkpoint_path)
+            if precision != 'fp32':
+                print(f"警告: ONNX Runtime 后端只支持 fp32，忽略精度设置 {precision}")
+            precision = 'fp32'
+        else:
+            # 只读取一次权重文件，按内容决定加载方式
+            checkpoint = read_checkpoint(checkpoint_path) if os.path.exists(checkpoint_path) else None
+            
+            if is_inference_weights(checkpoint):
+                # export.py 导出的推理权重: 直接用文件中的权重创建模型（不做随机初始化）
+                self.model = self._load_inference_weights(checkpoint_path, checkpoint)
+            else:
+                # 创建模型
+                self.model = self._create_model()
+                
+                # 加载权重
+                self._load_checkpoint(checkpoint_path, checkpoint)
+        
+        self._setup_precision(precision)
+        
+        # channels_last 内存布局（GPU 卷积通常更快；输入在设备上直接以该布局生成）
+        self.channels_last = (backend == 'torch' and self.precision != 'int8'
+                              and inference_cfg.get('channels_last', False))
+        if self.channels_last:
+            self.model = self.model.to(memory_format=torch.channels_last)
+            print("内存布局: channels_last")
+        
+        # 密集块使用预分配缓冲区代替反复拼接（int8 量化模型已转换为量化算子，不适用；缓冲区要求连续的 NCHW 输入）
+        if (backend == 'torch' and self.precision != 'int8' and not self.channels_last
+                and isinstance(self.model, ESRGAN) and inference_cfg.get('memory_efficient', True)):
+            self.model.set_memory_efficient(True)
+        
+        print("推理器初始化完成！")
+    
+    def _create_model(self):
+        """创建模型"""
+        model_cfg = self.config['model']
+        
+        model = build_model(model_cfg).to(self.device)
+        print(f"模型: {model_cfg.get('name', 'ESRGAN')}")
+        
+        model.eval()  # 设置为评估模式
+        
+        return model
+    
+    def _load_inference_weights(self, checkpoint_path, checkpoint):
+        """
+        快速加载 export.py 导出的推理权重（.safetensors / _weights.pth）
+        
+        Args:
+            checkpoint: read_checkpoint 读取的推理权重
+        
+        Returns:
+            模型
+        """
+        model, model_cfg = build_model_from_weights(checkpoint_path, self.config['model'], self.device,
+                                                    checkpoint=checkpoint)
+        
+        self.config['model'] = model_cfg
+        print(f"模型: {model_cfg.get('name', 'ESRGAN')}")
+        
+        model.eval()
+        return model
+    
+    def _load_checkpoint(self, checkpoint_path, checkpoint=None):
+        """加载模型权重（checkpoint 为已读取的检查点，避免重复反序列化）"""
+        if not os.path.exists(checkpoint_path):
+            print(f"警告: 权重文件不存在: {checkpoint_path}")
+            print("将使用随机初始化的权重（输出质量会很差）")
+            print("\n提示: 你可以:")
+            print("  1. 训练自己的模型: python train.py")
+            print("  2. 下载预训练模型并放到 checkpoints/ 目录")
+            return
+        
+        if not load_model_weights(self.model, checkpoint_path, self.device, checkpoint=checkpoint):
+            print("将使用随机初始化的权重")
+    
+    def _setup_onnxruntime(self, onnx_path):
+        """加载 ONNX 模型（由 export.py 导出），在 CPU 上用 onnxruntime 推理"""
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(f"ONNX 模型不存在: {onnx_path}（可用 python export.py --format onnx 导出）")
+        
+        if self.device.type != 'cpu':
+            print("警告: ONNX Runtime 后端只使用 CPU，切换到 CPU")
+            self.device = torch.device('cpu')
+        
+        inference_cfg = self.config['inference']
+        intra_threads = inference_cfg.get('ort_intra_threads', 0)
+        inter_threads = inference_cfg.get('ort_inter_threads', 0)
+        
+        self.model = OnnxRuntimeModel(onnx_path, intra_threads, inter_threads)
+        print(f"成功加载 ONNX 模型: {onnx_path}（intra 线程 {intra_threads or '默认'}, "
+              f"inter 线程 {inter_threads or '默认'}）")
+    
+    def _setup_precision(self, precision):
+        """
+        设置推理精度
+        
+        - fp32: 默认
+        - bf16: 自动混合精度（设备不支持时回退到 fp32）
+        - int8: 训练后静态量化，使用校准图像统计激活范围（仅 CPU）
+        
+        原 fp32 模型保存在 self.reference_model 中，用于精度对比
+        """
+        if precision not in self.PRECISIONS:
+            raise ValueError(f"不支持的推理精度: {precision}")
+        
+        self.reference_model = self.model
+        
+        if precision == 'bf16' and not bf16_supported(self.device):
+            print(f"警告: {self.device} 不支持高效的 bf16 运算，回退到 fp32")
+            precision = 'fp32'
+        
+        if precision == 'int8':
+            if self.device.type != 'cpu':
+                print("警告: int8 量化模型只能在 CPU 上运行，切换到 CPU")
+                self.device = torch.device('cpu')
+                self.model = self.model.cpu()
+            
+            inference_cfg = self.config['inference']
+            calibration_dir = inference_cfg.get('calibration_dir', self.config['data']['test_dir'])
+            batches = load_calibration_batches(
+                calibration_dir,
+                num_images=inference_cfg.get('calibration_images', 8)
+            )
+            
+            if not batches:
+                print(f"警告: 在 {calibration_dir} 中未找到校准图像，使用随机输入校准（精度可能较差）")
+                batches = [torch.rand(1, self.config['model']['num_channels'], 64, 64) for _ in range(4)]
+            
+            print(f"int8 量化校准: {len(batches)} 个样本")
+            self.model = quantize_int8(self.model, batches)
+        
+        self.precision = precision
+        print(f"推理精度: {self.precision}")
+    
+    def _to_tensor(self, image):
+        """uint8 图像 (H, W, C) 或 (B, H, W, C) 拷贝到设备后转换为模型输入"""
+        return image_to_tensor(image, normalize=True, device=self.device, channels_last=self.channels_last)
+    
+    def _to_images(self, sr_tensor):
+        """
+        模型输出拆分为逐张图像
+        GPU 上先在设备上量化为 uint8 再一次拷回；CPU 上返回各张 tensor，由编码/写出线程并行转换
+        """
+        if sr_tensor.device.type == 'cpu':
+            return list(sr_tensor)
+        
+        images = tensor_to_image(sr_tensor)
+        return [images] if sr_tensor.shape[0] == 1 else list(images)
+    
+    def _forward(self, lr_tensor, reference=False):
+        """
+        模型前向传播
+        设置了 tile_size 且输入大于图块时使用分块推理
+        
+        Args:
+            lr_tensor: 输入 tensor (B, C, H, W)
+            reference: 是否使用 fp32 参考模型（用于精度对比）
+        
+        Returns:
+            fp32 输出 tensor
+        """
+        model = self.reference_model if reference else self.model
+        
+        if self.precision == 'bf16' and not reference:
+            autocast = torch.autocast(device_type=self.device.type, dtype=torch.bfloat16)
+        else:
+            autocast = contextlib.nullcontext()
+        
+        with autocast:
+            return self._run_model(model, lr_tensor).float()
+    
+    def _run_model(self, model, lr_tensor):
+        """执行前向传播（必要时分块）"""
+        _, _, h, w = lr_tensor.shape
+        
+        if self.tile_size and max(h, w) > self.tile_size:
+            # 分块推理按单张图像进行
+            return torch.cat([
+                tiled_forward(
+                    model, lr_tensor[i:i + 1],
+                    scale=self.config['model']['scale'],
+                    tile_size=self.tile_size,
+                    tile_pad=self.tile_pad,
+                    batch_size=self.tile_batch_size
+                )
+                for i in range(lr_tensor.shape[0])
+            ])
+        
+        with torch.no_grad():
+            return model(lr_tensor)
+    
+    def report_precision(self, image_paths):
+        """
+        报告当前精度相对 fp32 的质量和速度
+        
+        Args:
+            image_paths: 测试图像路径列表
+        
+        Returns:
+            (平均 PSNR, fp32 平均用时, 当前精度平均用时)
+        """
+        print("\n" + "="*50)
+        print(f"精度对比: {self.precision} vs fp32")
+        print("="*50)
+        
+        psnrs, fp32_times, times = [], [], []
+        
+        for image_path in image_paths:
+            lr_image = load_image(image_path, mode='RGB')
+            lr_tensor = self._to_tensor(lr_image)
+            
+            # 预热一次，避免首次运行的初始化开销影响计时
+            self._forward(lr_tensor, reference=True)
+            start = time.time()
+            ref_image = tensor_to_image(self._forward(lr_tensor, reference=True))
+            fp32_times.append(time.time() - start)
+            
+            self._forward(lr_tensor)
+            start = time.time()
+            sr_image = tensor_to_image(self._forward(lr_tensor))
+            times.append(time.time() - start)
+            
+            psnr = calculate_psnr(sr_image, ref_image)
+            psnrs.append(psnr)
+            print(f"{os.path.basename(image_path)}: PSNR {psnr:.2f} dB, "
+                  f"fp32 {fp32_times[-1]*1000:.1f} ms, {self.precision} {times[-1]*1000:.1f} ms")
+        
+        avg_psnr = sum(psnrs) / len(psnrs)
+        avg_fp32 = sum(fp32_times) / len(fp32_times)
+        avg_time = sum(times) / len(times)
+        
+        print("-"*50)
+        print(f"平均 PSNR (相对 fp32): {avg_psnr:.2f} dB")
+        print(f"平均用时: fp32 {avg_fp32*1000:.1f} ms, {self.precision} {avg_time*1000:.1f} ms "
+              f"(加速 {avg_fp32 / avg_time:.2f}x)")
+        
+        return avg_psnr, avg_fp32, avg_time
+    
+    def upscale(self, image_path, output_path=None):
+        """
+        对单张图像进行超分辨率处理
+        
+        Args:
+            image_path: 输入图像路径
+            output_path: 输出图像路径（如果为 None，自动生成）
+        
+        Returns:
+            output_path: 输出图像的保存路径
+        """
+        print(f"\n处理图像: {image_path}")
+        
+        # 加载图像
+        try:
+            lr_image = load_image(image_path, mode='RGB')
+        except Exception as e:
+            print(f"无法加载图像: {e}")
+            return None
+        
+        print(f"输入尺寸: {lr_image.shape[1]}x{lr_image.shape[0]}")
+        
+        # 转换为 tensor
+        lr_tensor = self._to_tensor(lr_image)
+        
+        # 推理
+        start_time = time.time()
+        
+        sr_tensor = self._forward(lr_tensor)
+        
+        inference_time = time.time() - start_time
+        
+        # 转换回图像
+        sr_image = tensor_to_image(sr_tensor, denormalize=True)
+        
+        print(f"输出尺寸: {sr_image.shape[1]}x{sr_image.shape[0]}")
+        print(f"推理用时: {inference_time:.3f} 秒")
+        
+        # 保存图像
+        if output_path is None:
+            # 自动生成输出路径
+            output_dir = self.config['inference']['output_dir']
+            os.makedirs(output_dir, exist_ok=True)
+            
+            filename = os.path.basename(image_path)
+            name, ext = os.path.splitext(filename)
+            output_path = os.path.join(output_dir, f"{name}_sr{ext}")
+        else:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        
+        save_image(sr_image, output_path, mode='RGB')
+        
+        return output_path
+    
+    def upscale_batch(self, input_dir, output_dir=None, pipeline=None):
+        """
+        批量处理目录中的所有图像
+        
+        Args:
+            input_dir: 输入目录路径
+            output_dir: 输出目录路径
+            pipeline: 是否使用流水线模式（解码/推理/编码并行）；None 使用配置文件
+        """
+        if output_dir is None:
+            output_dir = self.config['inference']['output_dir']
+        
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # 获取所有图像文件
+        valid_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff']
+        image_files = []
+        
+        for file in os.listdir(input_dir):
+            ext = os.path.splitext(file)[1].lower()
+            if ext in valid_extensions:
+                image_files.append(os.path.join(input_dir, file))
+        
+        if len(image_files) == 0:
+            print(f"在 {input_dir} 中未找到图像文件")
+            return
+        
+        print(f"\n找到 {len(image_files)} 张图像")
+        print("="*50)
+        
+        if pipeline is None:
+            pipeline = self.config['inference'].get('pipeline', False)
+        
+        if pipeline:
+            jobs = [(path, os.path.join(output_dir, os.path.basename(path))) for path in image_files]
+            self._upscale_pipelined(jobs)
+            print(f"结果已保存到: {output_dir}")
+            return
+        
+        # 批量处理
+        for i, image_path in enumerate(image_files, 1):
+            print(f"\n[{i}/{len(image_files)}]")
+            
+            filename = os.path.basename(image_path)
+            output_path = os.path.join(output_dir, filename)
+            
+            self.upscale(image_path, output_path)
+        
+        print("\n" + "="*50)
+        print(f"批量处理完成！结果已保存到: {output_dir}")
+    
+    def _upscale_pipelined(self, jobs):
+        """
+        流水线批处理：解码、推理、编码三个阶段并行
+        
+        - 解码线程池提前读取图像，放入有界队列
+        - 推理循环把相同尺寸的图像合并为一个批次
+        - 编码线程池在后台转换并写出结果
+        
+        Args:
+            jobs: [(输入路径, 输出路径), ...]
+        """
+        inference_cfg = self.config['inference']
+        batch_size = inference_cfg.get('batch_size', 4)
+        decode_workers = inference_cfg.get('decode_workers', 4)
+        encode_workers = inference_cfg.get('encode_workers', 2)
+        prefetch = max(inference_cfg.get('prefetch', 16), batch_size)
+        
+        print(f"流水线模式: 批次 {batch_size}, 解码线程 {decode_workers}, "
+              f"编码线程 {encode_workers}, 预读 {prefetch}")
+        
+        decoded = queue.Queue(maxsize=prefetch)
+        end_marker = object()
+        stop = threading.Event()
+        
+        def put(item):
+            # 推理或编码出错退出时，读取线程不会一直阻塞在满队列上
+            while not stop.is_set():
+                try:
+                    decoded.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        def decode(job):
+            try:
+                return job, load_image(job[0], mode='RGB')
+            except Exception as e:
+                print(f"无法加载图像: {e}")
+                return job, None
+        
+        def decode_all():
+            # 保持最多 prefetch 个解码任务在途，结果按提交顺序放入队列
+            with ThreadPoolExecutor(max_workers=decode_workers) as pool:
+                futures = deque()
+                for job in jobs:
+                    if stop.is_set():
+                        break
+                    futures.append(pool.submit(decode, job))
+                    if len(futures) >= prefetch and not put(futures.popleft().result()):
+                        break
+                while futures and put(futures.popleft().result()):
+                    pass
+                for future in futures:
+                    future.cancel()
+            put(end_marker)
+        
+        def encode(sr_image, output_path):
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            save_image(sr_image, output_path, mode='RGB')
+        
+        encode_pool = ThreadPoolExecutor(max_workers=encode_workers)
+        encode_futures = deque()
+        stats = {'images': 0, 'batches': 0, 'failed': 0, 'infer_time': 0.0}
+        
+        def run_batch(items):
+            lr_tensor = self._to_tensor(np.stack([image for _, image in items]))
+            
+            start = time.time()
+            sr_images = self._to_images(self._forward(lr_tensor))
+            stats['infer_time'] += time.time() - start
+            stats['images'] += len(items)
+            stats['batches'] += 1
+            
+            for (job, _), sr_image in zip(items, sr_images):
+                encode_futures.append(encode_pool.submit(encode, sr_image, job[1]))
+            
+            # 限制在途的编码任务，避免输出积压占用内存
+            while len(encode_futures) > 2 * encode_workers * batch_size:
+                encode_futures.popleft().result()
+        
+        start_time = time.time()
+        reader = threading.Thread(target=decode_all, daemon=True)
+        reader.start()
+        
+        # 按尺寸分组等待凑满批次
+        pending = {}
+        num_pending = 0
+        
+        try:
+            while True:
+                item = decoded.get()
+                if item is end_marker:
+                    break
+                
+                job, image = item
+                if image is None:
+                    stats['failed'] += 1
+                    continue
+                
+                group = pending.setdefault(image.shape, [])
+                group.append(item)
+                num_pending += 1
+                
+                if len(group) >= batch_size:
+                    run_batch(pending.pop(image.shape))
+                    num_pending -= len(group)
+                elif num_pending >= prefetch:
+                    # 尺寸过于分散时，先处理最大的一组
+                    shape = max(pending, key=lambda k: len(pending[k]))
+                    group = pending.pop(shape)
+                    run_batch(group)
+                    num_pending -= len(group)
+            
+            for group in pending.values():
+                run_batch(group)
+            
+            while encode_futures:
+                encode_futures.popleft().result()
+        finally:
+            stop.set()
+            encode_pool.shutdown(wait=True)
+            reader.join()
+        
+        elapsed = time.time() - start_time
+        
+        print("\n" + "="*50)
+        print(f"处理图像: {stats['images']} 张（失败 {stats['failed']} 张），批次: {stats['batches']}")
+        print(f"总用时: {elapsed:.2f} 秒，其中推理 {stats['infer_time']:.2f} 秒")
+        if elapsed > 0:
+            print(f"吞吐量: {stats['images'] / elapsed:.2f} 张/秒")
+        
+        return stats
+    
+    def upscale_video(self, video_path, output_path=None, skip_threshold=None):
+        """
+        视频超分辨率：读取、推理、写出三个阶段并行，内存占用与视频长度无关
+        
+        - 读取线程用 cv2.VideoCapture 解码帧，放入有界队列
+        - 推理循环把连续的帧合并为批次
+        - 写出线程用 cv2.VideoWriter 编码输出帧（不含音轨）
+        - 与上一个推理过的帧几乎相同的帧直接复用其输出，不再推理
+        
+        Args:
+            video_path: 输入视频路径
+            output_path: 输出视频路径（如果为 None，自动生成）
+            skip_threshold: 与上一个推理帧的平均绝对差（0~255 灰度级）低于此值时复用输出，
+                            0 表示不跳过；None 使用配置文件
+        
+        Returns:
+            统计字典，失败时返回 None
+        """
+        inference_cfg = self.config['inference']
+        batch_size = inference_cfg.get('video_batch_size', 4)
+        queue_size = max(inference_cfg.get('video_queue_size', 16), batch_size)
+        if skip_threshold is None:
+            skip_threshold = inference_cfg.get('skip_threshold', 0.0)
+        scale = self.config['model']['scale']
+        
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            print(f"无法打开视频: {video_path}")
+            return None
+        
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        if output_path is None:
+            output_dir = inference_cfg['output_dir']
+            name, ext = os.path.splitext(os.path.basename(video_path))
+            output_path = os.path.join(output_dir, f"{name}_sr{ext}")
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        
+        fourcc = cv2.VideoWriter_fourcc(*inference_cfg.get('video_fourcc', 'mp4v'))
+        writer = cv2.VideoWriter(output_path, fourcc, fps, (width * scale, height * scale))
+        if not writer.isOpened():
+            capture.release()
+            print(f"无法创建输出视频: {output_path}（检查 video_fourcc 与扩展名是否匹配）")
+            return None
+        
+        print(f"\n处理视频: {video_path}")
+        print(f"输入: {width}x{height} @ {fps:.2f} fps, {total} 帧 -> 输出: {width * scale}x{height * scale}")
+        print(f"批次 {batch_size}, 队列 {queue_size}, 跳帧阈值 {skip_threshold or '关闭'}")
+        
+        frames = queue.Queue(maxsize=queue_size)
+        outputs = queue.Queue(maxsize=queue_size)
+        end_marker = object()
+        stop = threading.Event()
+        errors = []
+        
+        def put(q, item):
+            # 主循环出错退出时，读取线程不会一直阻塞在满队列上
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        def read_frames():
+            try:
+                while not stop.is_set():
+                    ok, frame = capture.read()
+                    if not ok:
+                        break
+                    if not put(frames, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)):
+                        break
+            except Exception as e:
+                errors.append(e)
+            finally:
+                put(frames, end_marker)
+        
+        def write_frames():
+            # 出错后继续取出队列中的帧，避免推理循环阻塞
+            while True:
+                frame = outputs.get()
+                if frame is end_marker:
+                    break
+                if errors:
+                    continue
+                try:
+                    if isinstance(frame, torch.Tensor):
+                        frame = tensor_to_image(frame, denormalize=True)
+                    writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+                except Exception as e:
+                    errors.append(e)
+        
+        stats = {'frames': 0, 'inferred': 0, 'skipped': 0, 'infer_time': 0.0}
+        
+        # 待推理的帧，以及每个输入帧对应的输出: 本批中的序号，或 None 表示上一批最后一个推理帧的输出
+        to_infer, plan = [], []
+        ref_frame, ref_slot, last_output = None, None, None
+        
+        def flush():
+            nonlocal last_output, ref_slot
+            sr_frames = []
+            if to_infer:
+                lr_tensor = self._to_tensor(np.stack(to_infer))
+                start = time.time()
+                sr_frames = self._to_images(self._forward(lr_tensor))
+                stats['infer_time'] += time.time() - start
+                stats['inferred'] += len(to_infer)
+            
+            for slot in plan:
+                outputs.put(last_output if slot is None else sr_frames[slot])
+            
+            if sr_frames:
+                last_output = sr_frames[-1]
+                ref_slot = None
+            stats['frames'] += len(plan)
+            to_infer.clear()
+            plan.clear()
+        
+        next_report = 100
+        start_time = time.time()
+        reader = threading.Thread(target=read_frames, daemon=True)
+        writer_thread = threading.Thread(target=write_frames, daemon=True)
+        reader.start()
+        writer_thread.start()
+        
+        try:
+            while not errors:
+                frame = frames.get()
+                if frame is end_marker:
+                    break
+                
+                if (skip_threshold and ref_frame is not None
+                        and cv2.absdiff(frame, ref_frame).mean() < skip_threshold):
+                    stats['skipped'] += 1
+                else:
+                    to_infer.append(frame)
+                    ref_frame, ref_slot = frame, len(to_infer) - 1
+                plan.append(ref_slot)
+                
+                # 连续跳帧时也定期写出，避免复用的帧在内存中堆积
+                if len(to_infer) >= batch_size or len(plan) >= queue_size:
+                    flush()
+                    
+                    if stats['frames'] >= next_report:
+                        elapsed = time.time() - start_time
+                        print(f"  已处理 {stats['frames']}/{total} 帧, {stats['frames'] / elapsed:.2f} fps")
+                        next_report += 100
+            
+            if not errors:
+                flush()
+        finally:
+            stop.set()
+            outputs.put(end_marker)
+            writer_thread.join()
+            reader.join()
+            capture.release()
+            writer.release()
+        
+        if errors:
+            print(f"视频处理出错: {errors[0]}")
+            return None
+        
+        elapsed = time.time() - start_time
+        
+        print("\n" + "="*50)
+        print(f"处理帧数: {stats['frames']}，推理 {stats['inferred']} 帧，复用 {stats['skipped']} 帧")
+        print(f"总用时: {elapsed:.2f} 秒，其中推理 {stats['infer_time']:.2f} 秒")
+        if elapsed > 0:
+            print(f"处理速度: {stats['frames'] / elapsed:.2f} fps")
+        print(f"输出视频: {output_path}")
+        
+        return stats
+    
+    def compare_quality(self, lr_image_path, hr_image_path):
+        """
+        比较超分辨率结果与原始高分辨率图像的质量
+        
+        Args:
+            lr_image_path: 低分辨率图像路径
+            hr_image_path: 高分辨率图像路径（ground truth）
+        """
+        # 加载图像
+        lr_image = load_image(lr_image_path, mode='RGB')
+        hr_image = load_image(hr_image_path, mode='RGB')
+        
+        # 推理
+        lr_tensor = self._to_tensor(lr_image)
+        
+        sr_tensor = self._forward(lr_tensor)
+        
+        sr_image = tensor_to_image(sr_tensor, denormalize=True)
+        
+        # 计算 PSNR
+        if sr_image.shape[:2] != hr_image.shape[:2]:
+            print("警告: 超分辨率图像和原始高分辨率图像尺寸不匹配")
+            print(f"SR: {sr_image.shape[:2]}, HR: {hr_image.shape[:2]}")
+        else:
+            psnr = calculate_psnr(sr_image, hr_image)
+            print(f"\nPSNR: {psnr:.2f} dB")
+        
+        return sr_image
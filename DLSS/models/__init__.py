@@ -1,10 +1,36 @@
 """
 深度学习模型模块
+
+模型类在首次访问时才导入（PEP 562），只需要 MODEL_NAMES 的命令行参数解析不会导入 torch
 """
 
-from .esrgan import ESRGAN, RRDBNet
+import importlib
+
+from .registry import build_model, MODEL_NAMES
+
+# 模型类 -> 所在子模块
+_LAZY_ATTRS = {
+    'ESRGAN': 'esrgan',
+    'RRDBNet': 'esrgan',
+    'SRVGGNetCompact': 'srvgg'
+}
 
 __all__ = [
     'ESRGAN',
-    'RRDBNet'
+    'RRDBNet',
+    'SRVGGNetCompact',
+    'build_model',
+    'MODEL_NAMES'
 ]
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_LAZY_ATTRS[name]}', __name__), name)
+    globals()[name] = value  # 之后的访问不再经过 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
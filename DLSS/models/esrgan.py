@@ -3,9 +3,11 @@ ESRGAN (Enhanced Super-Resolution Generative Adversarial Networks) 模型实现
 基于论文: https://arxiv.org/abs/1809.00219
 """
 
+import math
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.utils.checkpoint import checkpoint
 
 
 class ResidualDenseBlock(nn.Module):
@@ -22,19 +24,28 @@ class ResidualDenseBlock(nn.Module):
         
         self.lrelu = nn.LeakyReLU(negative_slope=0.2, inplace=True)
         
+        # 推理时使用预分配特征缓冲区代替反复拼接（见 _forward_buffer）
+        self.memory_efficient = False
+        
         # 初始化
         self._initialize_weights()
     
     def _initialize_weights(self):
         """权重初始化"""
         for m in self.modules():
-            if isinstance(m, nn.Conv2d):
+            # meta 设备上创建（随后直接载入权重）时跳过初始化
+            if isinstance(m, nn.Conv2d) and not m.weight.is_meta:
                 nn.init.kaiming_normal_(m.weight, mode='fan_out', nonlinearity='leaky_relu')
                 if m.bias is not None:
                     nn.init.constant_(m.bias, 0)
     
     def forward(self, x):
         """前向传播"""
+        # 缓冲区写入是原地操作，只能在不需要梯度时使用；导出/追踪时保持标准计算图
+        if (self.memory_efficient and not torch.is_grad_enabled()
+                and x.is_contiguous() and not torch.jit.is_tracing()):
+            return self._forward_buffer(x)
+        
         x1 = self.lrelu(self.conv1(x))
         x2 = self.lrelu(self.conv2(torch.cat((x, x1), 1)))
         x3 = self.lrelu(self.conv3(torch.cat((x, x1, x2), 1)))
@@ -43,6 +54,28 @@ class ResidualDenseBlock(nn.Module):
         
         # 残差缩放
         return x5 * 0.2 + x
+    
+    def _forward_buffer(self, x):
+        """
+        预分配 (B, nf + 4*gc, H, W) 特征缓冲区，每个卷积的增长特征直接写入对应通道，
+        后续卷积读取缓冲区前缀视图，避免 4 次 torch.cat 反复复制不断增长的特征栈。
+        与 forward 的计算完全相同，输出逐位一致
+        """
+        b, nf, h, w = x.shape
+        gc = self.conv1.out_channels
+        
+        features = x.new_empty((b, nf + 4 * gc, h, w))
+        features[:, :nf] = x
+        
+        channels = nf
+        for conv in (self.conv1, self.conv2, self.conv3, self.conv4):
+            features[:, channels:channels + gc] = self.lrelu(conv(features[:, :channels]))
+            channels += gc
+        
+        x5 = self.conv5(features)
+        
+        # 残差缩放
+        return x5 * 0.2 + x
 
 
 class RRDB(nn.Module):
@@ -78,7 +111,8 @@ class RRDBNet(nn.Module):
         num_features=64,
         num_blocks=23,
         num_grow_channels=32,
-        scale=4
+        scale=4,
+        checkpoint_every=0
     ):
         """
         Args:
@@ -88,10 +122,12 @@ class RRDBNet(nn.Module):
             num_blocks: RRDB 块数量
             num_grow_channels: 密集块增长通道数
             scale: 上采样倍数 (2, 4, 8)
+            checkpoint_every: 训练时每 N 个 RRDB 块做一次梯度检查点（0 表示关闭）
         """
         super(RRDBNet, self).__init__()
         
         self.scale = scale
+        self.checkpoint_every = checkpoint_every
         
         # 第一层卷积
         self.conv_first = nn.Conv2d(in_channels, num_features, 3, 1, 1)
@@ -118,7 +154,7 @@ class RRDBNet(nn.Module):
         layers = []
         
         if scale == 2 or scale == 4 or scale == 8:
-            for _ in range(int(torch.log2(torch.tensor(scale)).item())):
+            for _ in range(int(math.log2(scale))):
                 layers.append(nn.Conv2d(num_features, num_features * 4, 3, 1, 1))
                 layers.append(nn.PixelShuffle(2))
                 layers.append(nn.LeakyReLU(negative_slope=0.2, inplace=True))
@@ -141,7 +177,10 @@ class RRDBNet(nn.Module):
         feat = self.conv_first(x)
         
         # RRDB 主体
-        body_feat = self.rrdb_blocks(feat)
+        if self.checkpoint_every > 0 and self.training and torch.is_grad_enabled():
+            body_feat = self._checkpointed_blocks(feat)
+        else:
+            body_feat = self.rrdb_blocks(feat)
         body_feat = self.conv_body(body_feat)
         
         # 全局残差连接
@@ -154,6 +193,23 @@ class RRDBNet(nn.Module):
         out = self.conv_last(self.lrelu(self.conv_hr(feat)))
         
         return out
+    
+    def set_memory_efficient(self, enabled=True):
+        """推理时密集块使用预分配缓冲区（不改变权重和输出）"""
+        for module in self.modules():
+            if isinstance(module, ResidualDenseBlock):
+                module.memory_efficient = enabled
+    
+    def _checkpointed_blocks(self, feat):
+        """
+        梯度检查点：每段 checkpoint_every 个 RRDB 块只保存段输入，
+        段内的密集连接激活在反向传播时重新计算
+        """
+        blocks = self.rrdb_blocks
+        for start in range(0, len(blocks), self.checkpoint_every):
+            segment = blocks[start:start + self.checkpoint_every]
+            feat = checkpoint(segment, feat, use_reentrant=False)
+        return feat
 
 
 class ESRGAN(nn.Module):
@@ -168,7 +224,9 @@ class ESRGAN(nn.Module):
         out_channels=3,
         num_features=64,
         num_blocks=23,
-        scale=4
+        num_grow_channels=32,
+        scale=4,
+        checkpoint_every=0
     ):
         """
         Args:
@@ -176,7 +234,9 @@ class ESRGAN(nn.Module):
             out_channels: 输出通道数
             num_features: 特征通道数
             num_blocks: RRDB 块数量
+            num_grow_channels: 密集块增长通道数
             scale: 上采样倍数
+            checkpoint_every: 训练时每 N 个 RRDB 块做一次梯度检查点（0 表示关闭）
         """
         super(ESRGAN, self).__init__()
         
@@ -185,13 +245,19 @@ class ESRGAN(nn.Module):
             out_channels=out_channels,
             num_features=num_features,
             num_blocks=num_blocks,
-            scale=scale
+            num_grow_channels=num_grow_channels,
+            scale=scale,
+            checkpoint_every=checkpoint_every
         )
     
     def forward(self, x):
         """前向传播"""
         return self.generator(x)
     
+    def set_memory_efficient(self, enabled=True):
+        """推理时密集块使用预分配缓冲区（不改变权重和输出）"""
+        self.generator.set_memory_efficient(enabled)
+    
     def load_pretrained(self, checkpoint_path):
         """加载预训练权重"""
         checkpoint = torch.load(checkpoint_path, map_location='cpu')
@@ -0,0 +1,48 @@
+"""
+模型注册表
+根据 config.yaml 的 model.name 创建对应的生成器
+"""
+
+
+MODEL_NAMES = ('ESRGAN', 'SRVGGNetCompact')
+
+
+def build_model(model_cfg, checkpoint_every=0):
+    """
+    按配置创建模型
+
+    Args:
+        model_cfg: config.yaml 的 model 部分
+        checkpoint_every: ESRGAN 训练时的梯度检查点间隔（SRVGGNetCompact 不需要）
+
+    Returns:
+        模型
+    """
+    name = model_cfg.get('name', 'ESRGAN')
+
+    if name == 'ESRGAN':
+        from .esrgan import ESRGAN
+        return ESRGAN(
+            in_channels=model_cfg['num_channels'],
+            out_channels=model_cfg['num_channels'],
+            num_features=model_cfg['num_features'],
+            num_blocks=model_cfg['num_blocks'],
+            num_grow_channels=model_cfg.get('num_grow_channels', 32),
+            scale=model_cfg['scale'],
+            checkpoint_every=checkpoint_every
+        )
+
+    if name == 'SRVGGNetCompact':
+        if checkpoint_every:
+            print("警告: SRVGGNetCompact 激活很小，不使用梯度检查点")
+        from .srvgg import SRVGGNetCompact
+        return SRVGGNetCompact(
+            in_channels=model_cfg['num_channels'],
+            out_channels=model_cfg['num_channels'],
+            num_features=model_cfg['num_features'],
+            num_conv=model_cfg.get('num_conv', 16),
+            scale=model_cfg['scale'],
+            act_type=model_cfg.get('act_type', 'prelu')
+        )
+
+    raise ValueError(f"不支持的模型: {name}（可选: {', '.join(MODEL_NAMES)}）")
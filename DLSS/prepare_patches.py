@@ -0,0 +1,50 @@
+"""
+训练数据预处理脚本
+把训练图像切成重叠的 HR/LR 子图并存入内存映射文件，训练时无需再解码整张图像
+
+使用方法:
+    python prepare_patches.py --input ./data/train --output ./data/train_patches
+    然后在 config.yaml 中设置 data.patch_store: "./data/train_patches"
+"""
+
+import argparse
+import yaml
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='生成预处理图块库')
+    parser.add_argument('--config', type=str, default='config.yaml', help='配置文件路径')
+    parser.add_argument('--input', type=str, default=None, help='训练图像目录（默认 data.train_dir）')
+    parser.add_argument('--output', type=str, default=None, help='输出目录（默认 data.patch_store）')
+    parser.add_argument('--patch-size', type=int, default=None, help='HR 子图大小（默认 data.patch_size）')
+    parser.add_argument('--stride', type=int, default=None, help='子图步长（默认 data.patch_stride）')
+
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+
+    data_cfg = config['data']
+    input_dir = args.input or data_cfg['train_dir']
+    output_dir = args.output or data_cfg.get('patch_store') or './data/train_patches'
+    patch_size = args.patch_size or data_cfg.get('patch_size', 480)
+    stride = args.stride or data_cfg.get('patch_stride', patch_size // 2)
+
+    if patch_size < data_cfg['hr_size']:
+        print(f"警告: 子图大小 {patch_size} 小于训练裁剪大小 hr_size={data_cfg['hr_size']}，训练时将无法使用")
+
+    # torch / PIL 在解析参数后才导入，--help 和参数错误可以立即返回
+    from utils import build_patch_store
+
+    build_patch_store(
+        input_dir,
+        output_dir,
+        scale=config['model']['scale'],
+        patch_size=patch_size,
+        stride=stride
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+ESRGAN 结构化通道剪枝脚本
+在校准集上估计通道重要性，删除不重要的主干/增长通道，得到更小的稠密模型和对应的配置文件，
+可选用 Trainer 微调，并报告剪枝前后的 FLOPs、参数量、推理用时和 PSNR
+
+使用方法:
+    python prune.py --checkpoint ./checkpoints/best_model.pth --num-features 48 --num-grow-channels 16
+
+    # 剪枝后微调 5 个 epoch，并以原模型为教师做知识蒸馏
+    python prune.py --checkpoint ./checkpoints/best_model.pth --num-features 48 --num-grow-channels 16 \\
+        --finetune-epochs 5 --distill
+"""
+
+import os
+import copy
+import argparse
+import yaml
+
+from models import build_model
+from benchmark import time_call
+
+
+def load_calibration_pairs(image_dir, num_images, patch_size, scale, device):
+    """读取校准 HR 中心裁剪，并用双三次下采样生成对应的 LR"""
+    from utils.degradation import bicubic_downsample
+    from utils.quantization import load_calibration_batches
+
+    lr_batches, hr_batches = [], []
+
+    for hr in load_calibration_batches(image_dir, num_images=num_images, patch_size=patch_size):
+        h, w = hr.shape[2] // scale * scale, hr.shape[3] // scale * scale
+        hr = hr[:, :, :h, :w].to(device)
+        lr_batches.append(bicubic_downsample(hr, scale).clamp_(0, 1))
+        hr_batches.append(hr)
+
+    return lr_batches, hr_batches
+
+
+def evaluate(model, lr_batches, hr_batches, input_shape, runs):
+    """
+    统计参数量、FLOPs、推理用时和校准集平均 PSNR
+
+    Returns:
+        (参数量, GFLOPs, 用时 ms, PSNR dB)
+    """
+    import torch
+    from utils import tensor_to_image, calculate_psnr
+    from utils.pruning import count_conv_flops
+
+    model.eval()
+    device = next(model.parameters()).device
+    params = sum(p.numel() for p in model.parameters())
+    gflops = count_conv_flops(model, input_shape) / 1e9
+
+    x = torch.rand(input_shape, device=device)
+
+    def run():
+        model(x)
+        if device.type == 'cuda':
+            torch.cuda.synchronize()
+
+    with torch.no_grad():
+        elapsed = time_call(run, runs)
+
+        psnrs = [
+            calculate_psnr(tensor_to_image(model(lr).clamp(0, 1)), tensor_to_image(hr))
+            for lr, hr in zip(lr_batches, hr_batches)
+        ]
+
+    psnr = sum(psnrs) / len(psnrs) if psnrs else float('nan')
+    return params, gflops, elapsed * 1000, psnr
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='ESRGAN 结构化通道剪枝')
+    parser.add_argument('--checkpoint', type=str, default='./checkpoints/best_model.pth', help='模型权重路径')
+    parser.add_argument('--config', type=str, default='config.yaml', help='配置文件路径')
+    parser.add_argument('--num-features', type=int, required=True, help='剪枝后的特征通道数')
+    parser.add_argument('--num-grow-channels', type=int, required=True, help='剪枝后的密集块增长通道数')
+    parser.add_argument('--output', type=str, default='./checkpoints/pruned_model.pth',
+                       help='剪枝后的权重路径（同名 .yaml 为对应的配置文件）')
+    parser.add_argument('--calibration-dir', type=str, default=None,
+                       help='校准 HR 图像目录（默认 inference.calibration_dir）')
+    parser.add_argument('--calibration-images', type=int, default=16, help='校准图像数')
+    parser.add_argument('--patch-size', type=int, default=256, help='校准 HR 中心裁剪大小')
+    parser.add_argument('--finetune-epochs', type=int, default=0, help='剪枝后用 Trainer 微调的 epoch 数')
+    parser.add_argument('--distill', action='store_true', help='微调时以原模型为教师做知识蒸馏')
+    parser.add_argument('--height', type=int, default=180, help='测速输入高度（LR 像素）')
+    parser.add_argument('--width', type=int, default=320, help='测速输入宽度（LR 像素）')
+    parser.add_argument('--runs', type=int, default=3, help='测速次数')
+    parser.add_argument('--device', type=str, default=None, help='设备 (cuda/cpu)')
+
+    args = parser.parse_args()
+
+    # torch 在解析参数后才导入，--help 和参数错误可以立即返回
+    import torch
+    from utils.checkpoint_utils import load_model_weights
+    from utils.pruning import compute_channel_importance, prune_esrgan
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    model_cfg = config['model']
+
+    if model_cfg.get('name', 'ESRGAN') != 'ESRGAN':
+        raise ValueError("通道剪枝只支持 ESRGAN 模型")
+
+    device = torch.device(args.device or ('cuda' if torch.cuda.is_available() else 'cpu'))
+
+    model = build_model(model_cfg).to(device)
+    if not load_model_weights(model, args.checkpoint, device):
+        raise ValueError(f"无法加载模型权重: {args.checkpoint}")
+
+    scale = model_cfg['scale']
+    calibration_dir = args.calibration_dir or config.get('inference', {}).get(
+        'calibration_dir', config['data']['test_dir'])
+    lr_batches, hr_batches = load_calibration_pairs(
+        calibration_dir, args.calibration_images, args.patch_size, scale, device
+    )
+    if not lr_batches:
+        raise ValueError(f"在 {calibration_dir} 中未找到校准图像")
+    print(f"校准图像: {len(lr_batches)} 张（{calibration_dir}）")
+
+    input_shape = (1, model_cfg['num_channels'], args.height, args.width)
+    results = [('原模型', evaluate(model, lr_batches, hr_batches, input_shape, args.runs))]
+
+    # 估计通道重要性并剪枝
+    print("估计通道重要性...")
+    importance = compute_channel_importance(model, lr_batches, hr_batches)
+    pruned = prune_esrgan(model, importance, args.num_features, args.num_grow_channels)
+    results.append(('剪枝后', evaluate(pruned, lr_batches, hr_batches, input_shape, args.runs)))
+
+    # 剪枝后的配置: 只改变通道数
+    pruned_config = copy.deepcopy(config)
+    pruned_config['model']['num_features'] = args.num_features
+    pruned_config['model']['num_grow_channels'] = args.num_grow_channels
+    pruned_config.setdefault('inference', {})['checkpoint'] = args.output
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    config_path = os.path.splitext(args.output)[0] + '.yaml'
+
+    if args.finetune_epochs > 0:
+        from trainer import Trainer
+
+        if args.distill:
+            pruned_config['distill'] = dict(
+                pruned_config.get('distill') or {},
+                enabled=True,
+                teacher_checkpoint=args.checkpoint,
+                teacher_num_blocks=model_cfg['num_blocks'],
+                teacher_num_features=model_cfg['num_features'],
+                teacher_num_grow_channels=model_cfg.get('num_grow_channels', 32)
+            )
+
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(pruned_config, f, allow_unicode=True, sort_keys=False)
+
+        trainer = Trainer(config_path=config_path)
+        trainer.model.load_state_dict(pruned.state_dict())
+        trainer.train(num_epochs=args.finetune_epochs)
+
+        pruned = trainer.model.to(device)
+        results.append(('微调后', evaluate(pruned, lr_batches, hr_batches, input_shape, args.runs)))
+
+        # 部署配置不需要蒸馏
+        if args.distill:
+            pruned_config['distill']['enabled'] = False
+
+    torch.save({'model_state_dict': pruned.state_dict(), 'config': pruned_config}, args.output)
+    with open(config_path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(pruned_config, f, allow_unicode=True, sort_keys=False)
+
+    print("\n" + "="*70)
+    print(f"剪枝结果: num_features {model_cfg['num_features']} -> {args.num_features}, "
+          f"num_grow_channels {model_cfg.get('num_grow_channels', 32)} -> {args.num_grow_channels}")
+    print(f"测速输入: {args.width}x{args.height}, 设备: {device}")
+    print("="*70)
+    print(f"{'阶段':>8} {'参数量':>12} {'GFLOPs':>10} {'用时 (ms)':>12} {'PSNR (dB)':>10}")
+    for stage, (params, gflops, elapsed, psnr) in results:
+        print(f"{stage:>8} {params:>12,} {gflops:>10.2f} {elapsed:>12.1f} {psnr:>10.2f}")
+
+    print(f"\n剪枝后的权重: {args.output}")
+    print(f"剪枝后的配置: {config_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+超分辨率推理服务
+常驻进程保持模型已加载，并发请求在很短的等待窗口内动态合并为批次，大图自动分块推理
+
+使用方法:
+    python server.py --checkpoint ./checkpoints/best_model.pth --port 8000
+
+    # 请求（返回 PNG；?format=jpg 返回 JPEG）
+    curl --data-binary @image.png http://127.0.0.1:8000/upscale -o image_sr.png
+
+    # 队列深度、批次大小、延迟分位数
+    curl http://127.0.0.1:8000/metrics
+"""
+
+import argparse
+import json
+import queue
+from concurrent.futures import TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import yaml
+
+from utils.inference_options import BACKENDS, PRECISIONS
+
+
+# 输出格式 -> cv2 编码扩展名和 Content-Type
+OUTPUT_FORMATS = {
+    'png': ('.png', 'image/png'),
+    'jpg': ('.jpg', 'image/jpeg'),
+    'webp': ('.webp', 'image/webp')
+}
+
+
+class UpscaleHandler(BaseHTTPRequestHandler):
+    """
+    POST /upscale   请求体为图像文件内容，返回超分后的图像
+    GET  /metrics   统计信息（JSON）
+    GET  /health    存活检查
+    """
+
+    server_version = 'DLSS'
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data, headers=None):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), headers=headers)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif path == '/metrics':
+            batcher = self.server.batcher
+            self._send_json(200, batcher.metrics.snapshot(queue_depth=batcher.queue_depth))
+        else:
+            self._send_json(404, {'error': f'未知路径: {path}'})
+
+    def do_POST(self):
+        import cv2
+        import numpy as np
+
+        url = urlparse(self.path)
+        if url.path != '/upscale':
+            self._send_json(404, {'error': f'未知路径: {url.path}'})
+            return
+
+        output_format = parse_qs(url.query).get('format', ['png'])[0].lower()
+        if output_format not in OUTPUT_FORMATS:
+            self._send_json(400, {'error': f'不支持的输出格式: {output_format}'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        if length <= 0:
+            self._send_json(411, {'error': '需要 Content-Length 和图像内容'})
+            return
+        if length > self.server.max_upload_bytes:
+            self._send_json(413, {'error': '图像文件过大'})
+            return
+
+        image = cv2.imdecode(np.frombuffer(self.rfile.read(length), dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            self._send_json(400, {'error': '无法解码图像'})
+            return
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+        try:
+            future = self.server.batcher.submit(image)
+        except queue.Full:
+            self._send_json(503, {'error': '服务繁忙，请稍后重试'}, headers={'Retry-After': '1'})
+            return
+
+        try:
+            sr_image = future.result(timeout=self.server.request_timeout)
+        except TimeoutError:
+            self._send_json(504, {'error': '推理超时'})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': f'推理失败: {e}'})
+            return
+
+        ext, content_type = OUTPUT_FORMATS[output_format]
+        ok, encoded = cv2.imencode(ext, cv2.cvtColor(sr_image, cv2.COLOR_RGB2BGR))
+        if not ok:
+            self._send_json(500, {'error': '编码输出图像失败'})
+            return
+
+        self._send(200, encoded.tobytes(), content_type=content_type)
+
+    def log_message(self, format, *args):
+        # 每个请求都打印日志会拖慢高并发下的响应，统计信息见 /metrics
+        pass
+
+
+def create_server(inferencer, host='127.0.0.1', port=8000, server_cfg=None):
+    """
+    创建推理服务（调用 serve_forever() 开始处理请求）
+
+    Args:
+        inferencer: 推理器
+        host: 监听地址
+        port: 监听端口（0 表示随机空闲端口）
+        server_cfg: config.yaml 的 server 部分
+
+    Returns:
+        ThreadingHTTPServer，batcher 属性为动态批处理器
+    """
+    from utils.serving import DynamicBatcher
+
+    server_cfg = server_cfg or {}
+
+    batcher = DynamicBatcher(
+        inferencer._forward,
+        scale=inferencer.config['model']['scale'],
+        device=inferencer.device,
+        max_batch_size=server_cfg.get('max_batch_size', 4),
+        max_wait=server_cfg.get('max_wait_ms', 10) / 1000,
+        size_bucket=server_cfg.get('size_bucket', 32),
+        tile_size=inferencer.tile_size,
+        max_queue=server_cfg.get('max_queue', 64)
+    )
+
+    server = ThreadingHTTPServer((host, port), UpscaleHandler)
+    server.daemon_threads = True
+    server.batcher = batcher
+    server.request_timeout = server_cfg.get('request_timeout', 60)
+    server.max_upload_bytes = int(server_cfg.get('max_upload_mb', 32) * 1024**2)
+
+    return server
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='ESRGAN 超分辨率推理服务')
+    parser.add_argument('--checkpoint', type=str, default='./checkpoints/final_model.pth',
+                       help='模型权重路径')
+    parser.add_argument('--config', type=str, default='config.yaml', help='配置文件路径')
+    parser.add_argument('--host', type=str, default=None, help='监听地址（默认 server.host）')
+    parser.add_argument('--port', type=int, default=None, help='监听端口（默认 server.port）')
+    parser.add_argument('--device', type=str, default=None, choices=['cuda', 'cpu'], help='计算设备')
+    parser.add_argument('--max-batch-size', type=int, default=None, help='每批最多图像数')
+    parser.add_argument('--max-wait-ms', type=float, default=None, help='凑批次的最长等待时间（毫秒）')
+    parser.add_argument('--tile', type=int, default=None,
+                       help='超过此尺寸的图像分块推理（LR 像素，默认 server.tile_size）')
+    parser.add_argument('--backend', type=str, default=None, choices=BACKENDS,
+                       help='推理后端（torch / onnxruntime，后者 --checkpoint 指向 .onnx 文件）')
+    parser.add_argument('--precision', type=str, default=None, choices=PRECISIONS,
+                       help='推理精度（fp32 / bf16 / int8）')
+
+    args = parser.parse_args()
+
+    # 推理器依赖 torch，解析参数后再导入
+    from inferencer import Inferencer
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        server_cfg = dict(yaml.safe_load(f).get('server') or {})
+
+    if args.max_batch_size is not None:
+        server_cfg['max_batch_size'] = args.max_batch_size
+    if args.max_wait_ms is not None:
+        server_cfg['max_wait_ms'] = args.max_wait_ms
+
+    inferencer = Inferencer(
+        checkpoint_path=args.checkpoint,
+        config_path=args.config,
+        device=args.device,
+        tile_size=args.tile if args.tile is not None else server_cfg.get('tile_size', 512),
+        precision=args.precision,
+        backend=args.backend
+    )
+
+    host = args.host or server_cfg.get('host', '127.0.0.1')
+    port = args.port if args.port is not None else server_cfg.get('port', 8000)
+    server = create_server(inferencer, host, port, server_cfg)
+
+    batcher = server.batcher
+    print(f"推理服务: http://{host}:{server.server_address[1]}  "
+          f"(批次 {batcher.max_batch_size}, 等待 {batcher.max_wait * 1000:.0f} ms, "
+          f"尺寸分组 {batcher.size_bucket}, 分块 {inferencer.tile_size or '关闭'})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止服务...")
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+if __name__ == "__main__":
+    main()
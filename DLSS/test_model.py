@@ -149,6 +149,866 @@ def test_image_quality():
     print("✓ 噪声图像测试通过")
 
 
+def test_tiled_inference():
+    """测试分块推理"""
+    print("\n" + "="*60)
+    print("测试 5: 分块推理一致性")
+    print("="*60)
+    
+    from utils import tiled_forward
+    
+    torch.manual_seed(0)
+    model = ESRGAN(scale=4, num_blocks=2)
+    model.eval()
+    
+    # 尺寸不是图块大小的整数倍，覆盖边缘图块
+    x = torch.rand(1, 3, 50, 70)
+    
+    with torch.no_grad():
+        full = model(x)
+    
+    tiled = tiled_forward(model, x, scale=4, tile_size=24, tile_pad=16, batch_size=3)
+    
+    max_diff = (tiled - full).abs().max().item()
+    print(f"\n整图输出: {tuple(full.shape)}")
+    print(f"分块输出: {tuple(tiled.shape)}")
+    print(f"最大差异: {max_diff:.6f}")
+    
+    assert tiled.shape == full.shape, "分块输出尺寸错误"
+    assert max_diff < 1.0 / 255, f"分块推理与整图推理差异过大: {max_diff}"
+    print("✓ 分块推理结果与整图推理一致（差异小于 1 个灰度级）")
+
+
+def test_onnx_parity():
+    """测试 ONNX 导出与 onnxruntime 推理"""
+    print("\n" + "="*60)
+    print("测试 6: ONNX Runtime 一致性")
+    print("="*60)
+    
+    try:
+        import onnx  # noqa: F401
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        print("\n✗ 未安装 onnx / onnxruntime，跳过此测试")
+        return
+    
+    import os
+    import tempfile
+    from utils.onnx_utils import export_onnx, OnnxRuntimeModel
+    
+    torch.manual_seed(0)
+    model = ESRGAN(scale=4, num_blocks=1)
+    model.eval()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        onnx_path = os.path.join(tmp_dir, 'model.onnx')
+        export_onnx(model, onnx_path, sample_size=32)
+        ort_model = OnnxRuntimeModel(onnx_path)
+        
+        # 导出尺寸之外的批次和分辨率，验证动态维度
+        for size in [(1, 3, 32, 32), (2, 3, 40, 24)]:
+            x = torch.rand(size)
+            with torch.no_grad():
+                expected = model(x)
+            actual = ort_model(x)
+            
+            max_diff = (actual - expected).abs().max().item()
+            print(f"\n输入 {size}: 输出 {tuple(actual.shape)}, 最大差异 {max_diff:.2e}")
+            
+            assert actual.shape == expected.shape, "ONNX 输出尺寸错误"
+            assert max_diff < 1e-4, f"ONNX Runtime 与 PyTorch 差异过大: {max_diff}"
+    
+    print("✓ ONNX Runtime 输出与 PyTorch 一致")
+
+
+def test_patch_store():
+    """测试预处理图块库"""
+    print("\n" + "="*60)
+    print("测试 7: 预处理图块库")
+    print("="*60)
+    
+    import os
+    import tempfile
+    import numpy as np
+    import cv2
+    from utils import PatchDataset, build_patch_store
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_dir = os.path.join(tmp_dir, 'images')
+        os.makedirs(image_dir)
+        
+        # 平滑渐变图像，使 LR 裁剪与 HR 裁剪的下采样可以直接比较
+        yy, xx = np.mgrid[0:200, 0:300]
+        image = np.stack([xx * 255 // 300, yy * 255 // 200, (xx + yy) * 255 // 500], axis=-1).astype(np.uint8)
+        cv2.imwrite(os.path.join(image_dir, 'gradient.png'), image)
+        
+        store_dir = os.path.join(tmp_dir, 'store')
+        num_patches = build_patch_store(image_dir, store_dir, scale=4, patch_size=128, stride=64)
+        
+        dataset = PatchDataset(store_dir, scale=4, hr_size=64, augment=False)
+        assert len(dataset) == num_patches, "子图数量错误"
+        
+        lr_tensor, hr_tensor = dataset[len(dataset) // 2]
+        print(f"\n子图数量: {num_patches}, LR {tuple(lr_tensor.shape)}, HR {tuple(hr_tensor.shape)}")
+        assert lr_tensor.shape == (3, 16, 16) and hr_tensor.shape == (3, 64, 64), "裁剪尺寸错误"
+        
+        hr_image = (hr_tensor.permute(1, 2, 0).numpy() * 255).round().astype(np.uint8)
+        expected = cv2.resize(hr_image, (16, 16), interpolation=cv2.INTER_CUBIC).astype(np.float32) / 255
+        max_diff = np.abs(lr_tensor.permute(1, 2, 0).numpy() - expected)[2:-2, 2:-2].max()
+        print(f"LR 与 HR 下采样的最大差异: {max_diff:.4f}")
+        assert max_diff < 2.0 / 255, "LR/HR 裁剪未对齐"
+        
+        # EXIF 旋转的竖幅 JPEG（文件头尺寸为横幅）和需要先放大的小图
+        from PIL import Image
+        exif_dir = os.path.join(tmp_dir, 'exif')
+        os.makedirs(exif_dir)
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        Image.fromarray(image[:, :260]).save(os.path.join(exif_dir, 'rotated.jpg'), exif=exif)
+        cv2.imwrite(os.path.join(exif_dir, 'small.png'), image[:100, :150])
+        
+        # 旋转后为 260x200（高x宽）；小图放大到 129x193
+        from utils.tiling import tile_starts
+        expected = sum(len(tile_starts(h, 128, 64)) * len(tile_starts(w, 128, 64)) for h, w in [(260, 200), (129, 193)])
+        num_patches = build_patch_store(exif_dir, os.path.join(tmp_dir, 'exif_store'),
+                                        scale=4, patch_size=128, stride=64)
+        assert num_patches == expected, f"EXIF 旋转或放大后的子图数量错误: {num_patches} != {expected}"
+    
+    print("✓ 图块库 LR/HR 裁剪对齐，EXIF 旋转的图像正确切分")
+
+
+def test_device_degradation():
+    """测试设备端 LR 退化"""
+    print("\n" + "="*60)
+    print("测试 8: 设备端 LR 退化")
+    print("="*60)
+    
+    import numpy as np
+    import cv2
+    from utils.degradation import DeviceDegradation, jpeg_like
+    
+    torch.manual_seed(0)
+    rng = np.random.default_rng(0)
+    hr_images = rng.integers(0, 256, (2, 64, 64, 3), dtype=np.uint8)
+    hr_uint8 = torch.from_numpy(hr_images).permute(0, 3, 1, 2).contiguous()
+    
+    # 不启用额外退化时与 cv2 双三次下采样一致。设备端结果取整到 uint8 灰度级，
+    # 与未取整的浮点参照相比误差不超过半个灰度级（cv2 的 uint8 结果自身的取整误差可达 1）
+    lr, hr = DeviceDegradation(scale=4)(hr_uint8)
+    expected = np.stack([cv2.resize(img.astype(np.float32), (16, 16), interpolation=cv2.INTER_CUBIC)
+                         for img in hr_images]).clip(0, 255)
+    max_diff = (lr.permute(0, 2, 3, 1).numpy() * 255 - expected).__abs__().max()
+    print(f"\n双三次下采样与 cv2 的最大差异: {max_diff:.2f} 灰度级")
+    assert lr.shape == (2, 3, 16, 16) and hr.shape == (2, 3, 64, 64), "输出尺寸错误"
+    assert max_diff <= 0.5 + 1e-3, "设备端双三次下采样与 cv2 不一致"
+    
+    # 质量 100 的类 JPEG 压缩几乎无损，低质量时误差明显增大
+    x = hr_uint8.float() / 255
+    high = (jpeg_like(x, torch.full((2,), 100.0)) - x).abs().mean().item()
+    low = (jpeg_like(x, torch.full((2,), 10.0)) - x).abs().mean().item()
+    print(f"类 JPEG 平均误差: 质量 100 {high * 255:.2f}, 质量 10 {low * 255:.2f} 灰度级")
+    assert high < low, "JPEG 质量因子无效"
+    
+    degradation = DeviceDegradation(scale=4, blur_prob=1.0, noise_prob=1.0, jpeg_prob=1.0)
+    lr, _ = degradation(hr_uint8)
+    assert lr.shape == (2, 3, 16, 16) and 0 <= lr.min() and lr.max() <= 1, "退化输出异常"
+    
+    print("✓ 设备端退化结果正确")
+
+
+def test_gradient_checkpointing():
+    """测试梯度检查点"""
+    print("\n" + "="*60)
+    print("测试 9: 梯度检查点")
+    print("="*60)
+    
+    torch.manual_seed(0)
+    reference = ESRGAN(scale=4, num_blocks=3, num_features=16)
+    checkpointed = ESRGAN(scale=4, num_blocks=3, num_features=16, checkpoint_every=2)
+    checkpointed.load_state_dict(reference.state_dict())
+    reference.train()
+    checkpointed.train()
+    
+    x = torch.rand(2, 3, 16, 16)
+    for model in (reference, checkpointed):
+        model(x).mean().backward()
+    
+    max_diff = max(
+        (p1.grad - p2.grad).abs().max().item()
+        for p1, p2 in zip(reference.parameters(), checkpointed.parameters())
+    )
+    print(f"\n梯度最大差异: {max_diff:.2e}")
+    assert max_diff < 1e-6, f"梯度检查点的梯度与普通反向传播不一致: {max_diff}"
+    print("✓ 梯度检查点的梯度与普通反向传播一致")
+
+
+def test_memory_efficient_rdb():
+    """测试预分配缓冲区的残差密集块"""
+    print("\n" + "="*60)
+    print("测试 10: 预分配缓冲区的残差密集块")
+    print("="*60)
+    
+    torch.manual_seed(0)
+    model = ESRGAN(scale=4, num_blocks=2)
+    model.eval()
+    keys = list(model.state_dict().keys())
+    
+    x = torch.rand(2, 3, 24, 20)
+    with torch.no_grad():
+        expected = model(x)
+        model.set_memory_efficient(True)
+        actual = model(x)
+    
+    max_diff = (actual - expected).abs().max().item()
+    print(f"\n最大差异: {max_diff:.2e}")
+    assert max_diff == 0, f"缓冲区实现与 torch.cat 实现输出不一致: {max_diff}"
+    assert list(model.state_dict().keys()) == keys, "state_dict 键名发生变化"
+    print("✓ 输出逐位一致，state_dict 结构不变")
+
+
+def test_compact_model():
+    """测试紧凑模型"""
+    print("\n" + "="*60)
+    print("测试 11: SRVGGNetCompact 紧凑模型")
+    print("="*60)
+    
+    from models import build_model
+    
+    model_cfg = {'name': 'SRVGGNetCompact', 'num_channels': 3, 'num_features': 64,
+                 'num_conv': 16, 'scale': 4}
+    model = build_model(model_cfg)
+    model.eval()
+    
+    x = torch.rand(1, 3, 36, 52)
+    with torch.no_grad():
+        output = model(x)
+    
+    total, _ = model.count_parameters()
+    print(f"\n输出尺寸: {tuple(output.shape)}")
+    assert output.shape == (1, 3, 144, 208), "输出尺寸错误"
+    
+    # 键名与 Real-ESRGAN 官方 SRVGGNetCompact 一致（realesr-animevideov3 为 16 层卷积）
+    keys = set(model.state_dict().keys())
+    assert 'body.0.weight' in keys and 'body.1.weight' in keys and 'body.34.weight' in keys, "键名与官方实现不一致"
+    print("✓ 紧凑模型输出尺寸正确，键名与官方权重兼容")
+
+
+def test_teacher_cache():
+    """测试知识蒸馏的教师输出缓存"""
+    print("\n" + "="*60)
+    print("测试 12: 教师输出缓存")
+    print("="*60)
+    
+    import os
+    import tempfile
+    import numpy as np
+    import cv2
+    from utils import PatchDataset, build_patch_store
+    from utils.distillation import build_teacher_cache
+    
+    teacher = ESRGAN(num_features=16, num_blocks=1, scale=4).eval()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_dir = os.path.join(tmp_dir, 'images')
+        os.makedirs(image_dir)
+        cv2.imwrite(os.path.join(image_dir, 'noise.png'), np.random.randint(0, 256, (128, 192, 3), dtype=np.uint8))
+    
+        store_dir = os.path.join(tmp_dir, 'store')
+        build_patch_store(image_dir, store_dir, scale=4, patch_size=128, stride=64)
+    
+        teacher_path = os.path.join(tmp_dir, 'teacher.pth')
+        torch.save({'model_state_dict': teacher.state_dict()}, teacher_path)
+        cache_dir = build_teacher_cache(teacher, teacher_path, store_dir, os.path.join(tmp_dir, 'cache'), 'cpu')
+    
+        # 不裁剪（hr_size = 子图尺寸）时缓存与直接运行教师一致，只差 uint8 量化
+        dataset = PatchDataset(store_dir, scale=4, hr_size=128, augment=False, teacher_dir=cache_dir)
+        lr_tensor, hr_tensor, teacher_tensor = dataset[0]
+        with torch.no_grad():
+            expected = teacher(lr_tensor.unsqueeze(0)).clamp(0, 1)[0]
+    
+        max_diff = (teacher_tensor - expected).abs().max().item()
+        print(f"\n缓存与教师输出的最大差异: {max_diff * 255:.2f} 灰度级")
+        assert teacher_tensor.shape == hr_tensor.shape, "教师输出尺寸错误"
+        assert max_diff <= 0.5 / 255 + 1e-6, "教师输出缓存不一致"
+    
+    print("✓ 教师输出缓存与 LR/HR 对齐")
+
+def test_channel_pruning():
+    """测试结构化通道剪枝"""
+    print("\n" + "="*60)
+    print("测试 13: 结构化通道剪枝")
+    print("="*60)
+    
+    from utils.pruning import compute_channel_importance, prune_esrgan, count_conv_flops
+    
+    torch.manual_seed(0)
+    model = ESRGAN(scale=4, num_blocks=1, num_features=16, num_grow_channels=8)
+    model.eval()
+    generator = model.generator
+    
+    # 把部分通道的输出权重置零，使其对输出没有贡献；剪枝应恰好删除这些通道且输出不变
+    def kill(conv, channels, group=1):
+        rows = (channels[:, None] * group + torch.arange(group)).flatten()
+        conv.weight.data[rows] = 0
+        conv.bias.data[rows] = 0
+    
+    trunk_dead = torch.tensor([1, 5, 9, 12])
+    for conv in [generator.conv_first, generator.conv_body] + [
+            rdb.conv5 for rdb in (generator.rrdb_blocks[0].rdb1, generator.rrdb_blocks[0].rdb2,
+                                  generator.rrdb_blocks[0].rdb3)]:
+        kill(conv, trunk_dead)
+    for rdb in (generator.rrdb_blocks[0].rdb1, generator.rrdb_blocks[0].rdb2, generator.rrdb_blocks[0].rdb3):
+        for k in range(1, 5):
+            kill(getattr(rdb, f'conv{k}'), torch.randperm(8)[:3])
+    for i in (0, 3):
+        kill(generator.upsampler[i], torch.randperm(16)[:4], group=4)
+    kill(generator.conv_hr, torch.randperm(16)[:4])
+    
+    lr_batches = [torch.rand(1, 3, 16, 16) for _ in range(2)]
+    hr_batches = [torch.rand(1, 3, 64, 64) for _ in range(2)]
+    importance = compute_channel_importance(model, lr_batches, hr_batches)
+    pruned = prune_esrgan(model, importance, num_features=12, num_grow_channels=5).eval()
+    
+    x = torch.rand(1, 3, 20, 24)
+    with torch.no_grad():
+        max_diff = (pruned(x) - model(x)).abs().max().item()
+    
+    flops = count_conv_flops(model, x.shape)
+    pruned_flops = count_conv_flops(pruned, x.shape)
+    print(f"\nGFLOPs: {flops / 1e9:.3f} -> {pruned_flops / 1e9:.3f}, 最大差异: {max_diff:.2e}")
+    assert max_diff < 1e-5, f"剪枝删除了有效通道: {max_diff}"
+    
+    print("✓ 剪枝只删除无贡献的通道，输出不变")
+
+
+def test_batch_metrics():
+    """测试批量 PSNR / SSIM"""
+    print("\n" + "="*60)
+    print("测试 14: 批量 PSNR / SSIM")
+    print("="*60)
+    
+    import numpy as np
+    from utils import calculate_psnr, calculate_psnr_batch, calculate_ssim_batch
+    
+    hr_images = np.random.randint(0, 256, (3, 48, 64, 3), dtype=np.uint8)
+    noise = np.random.randint(-20, 21, hr_images.shape)
+    sr_images = np.clip(hr_images.astype(np.int32) + noise, 0, 255).astype(np.uint8)
+    
+    hr = torch.from_numpy(hr_images).permute(0, 3, 1, 2)
+    sr = torch.from_numpy(sr_images).permute(0, 3, 1, 2)
+    
+    # 与逐张计算的 NumPy 版本一致
+    psnr = calculate_psnr_batch(sr, hr)
+    expected = [calculate_psnr(sr_images[i], hr_images[i]) for i in range(3)]
+    max_diff = max(abs(psnr[i].item() - expected[i]) for i in range(3))
+    print(f"\n批量 PSNR: {[round(v, 2) for v in psnr.tolist()]}, 与逐张计算的最大差异 {max_diff:.2e}")
+    assert max_diff < 1e-3, "批量 PSNR 与 calculate_psnr 不一致"
+    
+    # 浮点输入按 uint8 量化后计算
+    psnr_float = calculate_psnr_batch(sr.float() / 255, hr.float() / 255, crop_border=4, y_channel=True)
+    psnr_uint8 = calculate_psnr_batch(sr, hr, crop_border=4, y_channel=True)
+    assert torch.allclose(psnr_float, psnr_uint8), "浮点与 uint8 输入的 PSNR 不一致"
+    
+    ssim_same = calculate_ssim_batch(hr, hr)
+    ssim_noisy = calculate_ssim_batch(sr, hr)
+    print(f"SSIM: 相同图像 {ssim_same.mean().item():.4f}, 加噪声 {ssim_noisy.mean().item():.4f}")
+    assert torch.allclose(ssim_same, torch.ones(3)), "相同图像的 SSIM 应为 1"
+    assert (ssim_noisy < 1).all(), "加噪声后 SSIM 应小于 1"
+    
+    print("✓ 批量 PSNR / SSIM 计算正确")
+
+
+def test_inference_weights():
+    """测试推理权重导出与快速加载"""
+    print("\n" + "="*60)
+    print("测试 15: 推理权重导出与快速加载")
+    print("="*60)
+    
+    import os
+    import argparse
+    import pickle
+    import tempfile
+    import yaml
+    from inferencer import Inferencer
+    from models import build_model
+    from utils.checkpoint_utils import (save_inference_weights, build_model_from_weights, load_model_weights,
+                                        read_checkpoint)
+    
+    model_cfg = {'name': 'ESRGAN', 'num_channels': 3, 'num_features': 16, 'num_blocks': 1,
+                 'num_grow_channels': 8, 'scale': 4}
+    model = build_model(model_cfg).eval()
+    x = torch.rand(1, 3, 16, 16)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        weights_path = os.path.join(tmp_dir, 'model_weights.pth')
+        save_inference_weights(model, weights_path, model_cfg)
+        
+        # 配置文件中的模型参数不同时，以权重文件中的配置为准
+        fast_model, used_cfg = build_model_from_weights(weights_path, dict(model_cfg, num_features=64))
+        assert used_cfg == model_cfg, "应使用权重文件中的模型配置"
+        fast_model.eval()
+        
+        # 普通加载路径同样可以读取（键名已规范化，不做转换）
+        loaded_model = build_model(model_cfg).eval()
+        assert load_model_weights(loaded_model, weights_path), "普通加载推理权重失败"
+        
+        # 训练检查点不是推理权重格式
+        checkpoint_path = os.path.join(tmp_dir, 'checkpoint.pth')
+        torch.save({'epoch': 1, 'model_state_dict': model.state_dict()}, checkpoint_path)
+        assert build_model_from_weights(checkpoint_path, model_cfg)[0] is None
+        
+        # 推理器只反序列化一次训练检查点
+        with open('config.yaml', 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+        config['model'].update(model_cfg)
+        config['inference'].update(device='cpu')
+        config_path = os.path.join(tmp_dir, 'config.yaml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f)
+        
+        load_calls = []
+        original_load = torch.load
+        torch.load = lambda *args, **kwargs: load_calls.append(args[0]) or original_load(*args, **kwargs)
+        try:
+            inferencer = Inferencer(checkpoint_path, config_path=config_path)
+        finally:
+            torch.load = original_load
+        assert load_calls == [checkpoint_path], f"检查点被读取了 {len(load_calls)} 次"
+        
+        # 含有 weights_only 不允许的对象时报错，不回退到不安全的完整反序列化
+        unsafe_path = os.path.join(tmp_dir, 'unsafe.pth')
+        torch.save({'model_state_dict': model.state_dict(), 'args': argparse.Namespace(lr=1e-4)}, unsafe_path)
+        try:
+            read_checkpoint(unsafe_path)
+        except pickle.UnpicklingError:
+            pass
+        else:
+            raise AssertionError("含有任意对象的检查点应拒绝加载")
+    
+    with torch.no_grad():
+        expected = model(x)
+        fast_diff = (fast_model(x) - expected).abs().max().item()
+        loaded_diff = (loaded_model(x) - expected).abs().max().item()
+        inferencer_diff = (inferencer.model(x) - expected).abs().max().item()
+    
+    print(f"\n快速加载输出差异: {fast_diff:.2e}, 普通加载输出差异: {loaded_diff:.2e}")
+    assert fast_diff == 0 and loaded_diff == 0, "加载后的输出与原模型不一致"
+    assert inferencer_diff == 0, "推理器加载训练检查点后的输出与原模型不一致"
+    
+    print("✓ 推理权重导出与加载正确")
+
+
+def test_dynamic_batching():
+    """测试推理服务的动态批处理"""
+    print("\n" + "="*60)
+    print("测试 16: 动态批处理")
+    print("="*60)
+    
+    import numpy as np
+    import torch.nn.functional as F
+    from utils.serving import DynamicBatcher
+    
+    # 逐像素的前向函数，填充不影响裁剪后的输出
+    batch_sizes = []
+    
+    def forward(x):
+        batch_sizes.append(x.shape[0])
+        return F.interpolate(x, scale_factor=2, mode='nearest')
+    
+    batcher = DynamicBatcher(forward, scale=2, device=torch.device('cpu'), max_batch_size=4,
+                             max_wait=0.2, size_bucket=16, tile_size=64)
+    
+    shapes = [(30, 40), (32, 32), (20, 28), (17, 31), (80, 24)]
+    images = [np.random.randint(0, 256, (h, w, 3), dtype=np.uint8) for h, w in shapes]
+    futures = [batcher.submit(image) for image in images]
+    results = [future.result(timeout=30) for future in futures]
+    batcher.close()
+    
+    for image, result in zip(images, results):
+        expected = image.repeat(2, axis=0).repeat(2, axis=1)
+        assert result.shape == expected.shape, f"输出尺寸错误: {result.shape}"
+        assert np.array_equal(result, expected), "填充后裁剪的输出不正确"
+    
+    stats = batcher.metrics.snapshot()
+    print(f"\n请求尺寸: {shapes}")
+    print(f"批次大小: {batch_sizes}, 延迟 p50 {stats['latency_p50_ms']:.1f} ms")
+    
+    # (30,40) 为 32x48 分组，(32,32)/(20,28)/(17,31) 合并为 32x32 分组，(80,24) 超过图块尺寸单独推理
+    assert sorted(batch_sizes) == [1, 1, 3], f"分组错误: {batch_sizes}"
+    assert stats['requests'] == 5 and stats['images'] == 5 and stats['failed'] == 0
+    
+    print("✓ 相近尺寸合并为批次，输出正确")
+
+
+def test_video_pipeline():
+    """测试视频超分流水线"""
+    print("\n" + "="*60)
+    print("测试 17: 视频超分流水线")
+    print("="*60)
+    
+    import os
+    import tempfile
+    import cv2
+    import numpy as np
+    import yaml
+    from inferencer import Inferencer
+    
+    with open('config.yaml', 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['model'].update(num_features=16, num_blocks=1, num_grow_channels=8)
+    config['inference'].update(device='cpu', video_batch_size=2, video_queue_size=4, video_fourcc='MJPG')
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, 'config.yaml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f)
+        
+        # 3 个场景，每个场景重复 4 帧（平滑图像，MJPG 压缩后重复帧仍几乎相同）
+        video_path = os.path.join(tmp_dir, 'input.avi')
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (24, 16))
+        gradient = np.linspace(0, 60, 24, dtype=np.float32)[None, :, None]
+        for color in (40, 120, 200):
+            frame = np.broadcast_to(color + gradient, (16, 24, 3)).astype(np.uint8)
+            for _ in range(4):
+                writer.write(frame)
+        writer.release()
+        
+        inferencer = Inferencer(os.path.join(tmp_dir, 'missing.pth'), config_path=config_path)
+        output_path = os.path.join(tmp_dir, 'output.avi')
+        
+        stats = inferencer.upscale_video(video_path, output_path, skip_threshold=0)
+        assert stats['frames'] == 12 and stats['inferred'] == 12 and stats['skipped'] == 0
+        
+        stats = inferencer.upscale_video(video_path, output_path, skip_threshold=1.0)
+        print(f"\n跳帧: 推理 {stats['inferred']} 帧，复用 {stats['skipped']} 帧")
+        assert stats['frames'] == 12 and stats['inferred'] == 3, "相同的帧应复用上一个推理帧的输出"
+        
+        capture = cv2.VideoCapture(output_path)
+        num_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        capture.release()
+    
+    scale = config['model']['scale']
+    assert num_frames == 12 and size == (24 * scale, 16 * scale), f"输出视频错误: {num_frames} 帧, {size}"
+    
+    print("✓ 视频帧数、尺寸和跳帧正确")
+
+
+def test_tensor_conversion():
+    """测试图像与 tensor 的格式转换"""
+    print("\n" + "="*60)
+    print("测试 18: 图像与 tensor 格式转换")
+    print("="*60)
+    
+    import numpy as np
+    from utils import image_to_tensor, tensor_to_image
+    
+    devices = ['cpu'] + (['cuda'] if torch.cuda.is_available() else [])
+    image = np.random.randint(0, 256, (37, 53, 3), dtype=np.uint8)
+    expected = torch.from_numpy(np.transpose(image.astype(np.float32) / 255.0, (2, 0, 1))).unsqueeze(0)
+    
+    for device in devices:
+        tensor = image_to_tensor(image, device=device)
+        tensor_cl = image_to_tensor(image, device=device, channels_last=True)
+        assert tensor.is_contiguous() and tensor_cl.is_contiguous(memory_format=torch.channels_last)
+        assert torch.equal(tensor.cpu(), expected) and torch.equal(tensor_cl.cpu(), expected), \
+            f"{device}: 输入转换与 NumPy 实现不一致"
+        
+        # 超出 [0, 1] 的输出先裁剪，再按截断量化（与 NumPy astype 一致）
+        output = (torch.randn(1, 3, 40, 50) * 0.6 + 0.5).to(device)
+        reference = np.clip(np.transpose(output[0].cpu().numpy(), (1, 2, 0)) * 255.0, 0, 255).astype(np.uint8)
+        assert np.array_equal(tensor_to_image(output), reference), f"{device}: 输出转换与 NumPy 实现不一致"
+        assert np.array_equal(tensor_to_image(output.to(memory_format=torch.channels_last)), reference)
+        print(f"\n{device}: 输入/输出转换与 NumPy 实现逐位一致")
+    
+    # 批量转换
+    batch = np.stack([image, image[::-1]])
+    assert image_to_tensor(batch).shape == (2, 3, 37, 53)
+    assert tensor_to_image(image_to_tensor(batch)).shape == (2, 37, 53, 3)
+    assert np.array_equal(tensor_to_image(image_to_tensor(batch))[1], image[::-1])
+    
+    # 浮点输入不会被原地修改
+    float_image = image.astype(np.float32)
+    image_to_tensor(float_image)
+    assert np.array_equal(float_image, image.astype(np.float32)), "输入数组被修改"
+    
+    print("✓ 格式转换正确")
+
+
+def test_lazy_imports():
+    """测试包的延迟导入"""
+    print("\n" + "="*60)
+    print("测试 19: 延迟导入")
+    print("="*60)
+    
+    import os
+    import subprocess
+    import sys
+    import utils
+    
+    # 新进程中导入包和命令行参数用到的名称，不应导入 torch / cv2 / PIL
+    code = (
+        "import sys, utils, models\n"
+        "from models import MODEL_NAMES\n"
+        "import benchmark, export, prepare_patches, inference, train, server, prune\n"
+        "print(' '.join(m for m in ('torch', 'cv2', 'PIL') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    heavy = result.stdout.strip()
+    assert not heavy, f"导入包时加载了较慢的依赖: {heavy}"
+    
+    # 首次访问时导入子模块，之后直接返回同一对象
+    from utils.image_utils import load_image
+    from models.esrgan import RRDBNet
+    import models
+    assert utils.load_image is load_image and models.RRDBNet is RRDBNet
+    assert set(utils.__all__) <= set(dir(utils))
+    try:
+        utils.no_such_name
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("未知名称应抛出 AttributeError")
+    
+    # 入口脚本的 Inferencer / Trainer 仍可按原名称导入
+    import inference
+    import train
+    from inferencer import Inferencer
+    from trainer import Trainer
+    assert inference.Inferencer is Inferencer and train.Trainer is Trainer
+    
+    # 入口脚本解析参数之后才导入 torch，--help 立即返回（导入 torch 约需 2 秒）
+    from benchmark import _measure_help
+    for script in ('inference.py', 'train.py', 'server.py', 'prune.py'):
+        help_time, heavy = _measure_help(script, runs=1)
+        print(f"{script} --help: {help_time * 1000:.0f} ms")
+        assert not heavy, f"{script} --help 加载了较慢的依赖: {', '.join(heavy)}"
+        assert help_time < 1.0, f"{script} --help 用时过长: {help_time:.2f} 秒"
+    
+    print("\n✓ 导入 utils / models 和命令行脚本不加载 torch")
+
+
+def test_pipelined_batch():
+    """测试流水线批处理"""
+    print("\n" + "="*60)
+    print("测试 20: 流水线批处理")
+    print("="*60)
+    
+    import os
+    import tempfile
+    import threading
+    import numpy as np
+    import yaml
+    from inferencer import Inferencer
+    from utils import load_image, save_image
+    
+    with open('config.yaml', 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['model'].update(num_features=16, num_blocks=1, num_grow_channels=8)
+    config['inference'].update(device='cpu', tile_size=0, pipeline=True, batch_size=2,
+                               prefetch=2, decode_workers=2, encode_workers=1)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, 'config.yaml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f)
+        
+        # 混合尺寸：相同尺寸的图像合并为批次，尺寸分散时按最大分组先处理
+        input_dir = os.path.join(tmp_dir, 'input')
+        os.makedirs(input_dir)
+        rng = np.random.default_rng(0)
+        sizes = [(16, 16), (20, 24), (16, 16), (12, 20), (16, 16), (20, 24), (12, 20)]
+        for i, (h, w) in enumerate(sizes):
+            save_image(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), os.path.join(input_dir, f'{i}.png'))
+        
+        inferencer = Inferencer(os.path.join(tmp_dir, 'missing.pth'), config_path=config_path)
+        sequential_dir = os.path.join(tmp_dir, 'sequential')
+        pipelined_dir = os.path.join(tmp_dir, 'pipelined')
+        inferencer.upscale_batch(input_dir, sequential_dir, pipeline=False)
+        inferencer.upscale_batch(input_dir, pipelined_dir)
+        
+        scale = config['model']['scale']
+        for i, (h, w) in enumerate(sizes):
+            expected = load_image(os.path.join(sequential_dir, f'{i}.png'))
+            actual = load_image(os.path.join(pipelined_dir, f'{i}.png'))
+            assert actual.shape == (h * scale, w * scale, 3), f"{i}.png 输出尺寸错误"
+            diff = np.abs(actual.astype(np.int16) - expected.astype(np.int16)).max()
+            assert diff <= 1, f"{i}.png 流水线输出与逐张推理不一致（最大差异 {diff}）"
+        print("\n✓ 流水线输出与逐张推理一致")
+        
+        # 推理中途出错：读取线程不能阻塞在满的预读队列上，原异常应传给调用方
+        for i in range(8):
+            save_image(rng.integers(0, 256, (16, 16, 3), dtype=np.uint8), os.path.join(input_dir, f'extra_{i}.png'))
+        
+        forward = inferencer._forward
+        calls = []
+        
+        def failing_forward(lr_tensor, **kwargs):
+            calls.append(len(lr_tensor))
+            if len(calls) == 2:
+                raise RuntimeError("模拟推理失败")
+            return forward(lr_tensor, **kwargs)
+        
+        inferencer._forward = failing_forward
+        errors = []
+        
+        def run():
+            try:
+                inferencer.upscale_batch(input_dir, os.path.join(tmp_dir, 'failed'))
+            except Exception as e:
+                errors.append(e)
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout=60)
+        assert not thread.is_alive(), "推理出错后流水线没有退出（读取线程阻塞）"
+        assert len(errors) == 1 and str(errors[0]) == "模拟推理失败", f"异常未传给调用方: {errors}"
+    
+    print("✓ 推理出错时流水线正常退出并抛出原异常")
+
+
+def test_inference_precision():
+    """测试 bf16 / int8 推理精度"""
+    print("\n" + "="*60)
+    print("测试 21: bf16 / int8 推理精度")
+    print("="*60)
+    
+    import io
+    import os
+    import math
+    import tempfile
+    import contextlib
+    import yaml
+    import inferencer as inferencer_module
+    from models import build_model
+    from utils.quantization import quantize_int8
+    
+    def psnr(a, b):
+        mse = ((a.clamp(0, 1) - b.clamp(0, 1)) ** 2).mean().item()
+        return 10 * math.log10(1.0 / max(mse, 1e-12))
+    
+    torch.manual_seed(0)
+    model_cfg = {'name': 'ESRGAN', 'num_channels': 3, 'num_features': 16, 'num_blocks': 1,
+                 'num_grow_channels': 8, 'scale': 4}
+    model = build_model(model_cfg).eval()
+    x = torch.rand(1, 3, 24, 20)
+    
+    # int8: 随机校准输入
+    quantized = quantize_int8(model, [torch.rand(1, 3, 32, 32) for _ in range(4)])
+    with torch.no_grad():
+        expected = model(x)
+        actual = quantized(x)
+    int8_psnr = psnr(actual, expected)
+    print(f"\nint8 相对 fp32 的 PSNR: {int8_psnr:.2f} dB")
+    assert actual.shape == expected.shape == (1, 3, 96, 80), f"int8 输出尺寸错误: {tuple(actual.shape)}"
+    assert int8_psnr > 30, "int8 量化误差过大"
+    
+    with open('config.yaml', 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['model'].update(num_features=16, num_blocks=1, num_grow_channels=8)
+    config['inference'].update(device='cpu', tile_size=0)
+    
+    original_supported = inferencer_module.bf16_supported
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_path = os.path.join(tmp_dir, 'config.yaml')
+            with open(config_path, 'w', encoding='utf-8') as f:
+                yaml.safe_dump(config, f)
+            checkpoint_path = os.path.join(tmp_dir, 'missing.pth')
+            
+            # 不支持 bf16 的设备回退到 fp32 并给出警告
+            inferencer_module.bf16_supported = lambda device: False
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                inferencer = inferencer_module.Inferencer(checkpoint_path, config_path=config_path, precision='bf16')
+            assert inferencer.precision == 'fp32', "不支持 bf16 时应回退到 fp32"
+            assert "回退到 fp32" in output.getvalue(), "回退时没有给出警告"
+            assert inferencer._forward(x).shape == (1, 3, 96, 80)
+            
+            # 支持 bf16 时使用自动混合精度，输出仍为 fp32
+            inferencer_module.bf16_supported = lambda device: True
+            inferencer = inferencer_module.Inferencer(checkpoint_path, config_path=config_path, precision='bf16')
+            assert inferencer.precision == 'bf16'
+            sr = inferencer._forward(x)
+            reference = inferencer._forward(x, reference=True)
+            bf16_psnr = psnr(sr, reference)
+            print(f"bf16 相对 fp32 的 PSNR: {bf16_psnr:.2f} dB")
+            assert sr.dtype == torch.float32 and sr.shape == reference.shape
+            assert bf16_psnr > 35, "bf16 误差过大"
+    finally:
+        inferencer_module.bf16_supported = original_supported
+    
+    print("✓ int8 / bf16 输出正确，不支持 bf16 时回退到 fp32")
+
+
+def test_trainer():
+    """测试训练器（梯度累积、分阶段计时、性能追踪、验证和恢复训练）"""
+    print("\n" + "="*60)
+    print("测试 22: 训练与恢复")
+    print("="*60)
+    
+    import os
+    import tempfile
+    import cv2
+    import numpy as np
+    import yaml
+    from trainer import Trainer
+    
+    with open('config.yaml', 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    
+    config['train'].update(epochs=1, batch_size=1, num_workers=0, save_interval=1, accumulation_steps=2,
+                           channels_last=True, profile_steps=1, profile_wait=0, profile_dir='runs/profile')
+    config['model'].update(num_features=8, num_blocks=1, num_grow_channels=4)
+    config['data'].update(train_dir='train', test_dir='test', hr_size=32, lr_size=8, patch_store='')
+    config['validation'].update(enabled=True, hr_size=32, batch_size=2)
+    
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rng = np.random.default_rng(0)
+        for name, count in (('train', 4), ('test', 2)):
+            os.makedirs(os.path.join(tmp_dir, name))
+            for i in range(count):
+                cv2.imwrite(os.path.join(tmp_dir, name, f'{i}.png'),
+                            rng.integers(0, 256, (40, 40, 3), dtype=np.uint8))
+        with open(os.path.join(tmp_dir, 'config.yaml'), 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f)
+        
+        # 检查点和 TensorBoard 日志写入当前目录
+        os.chdir(tmp_dir)
+        try:
+            torch.manual_seed(0)
+            trainer = Trainer(config_path='config.yaml')
+            trainer.train()
+            
+            # 4 个批次，每 2 步更新一次参数
+            optimizer_steps = {int(state['step']) for state in trainer.optimizer.state.values()}
+            timing = trainer.step_timer.summary()
+            assert trainer.global_step == 4 and optimizer_steps == {2}, \
+                f"梯度累积步数错误: {trainer.global_step} 步, 参数更新 {optimizer_steps} 次"
+            assert timing['total'] > 0 and timing['samples_per_sec'] > 0, "分阶段计时无效"
+            assert os.listdir('runs/profile'), "性能追踪文件未写入"
+            assert trainer.best_metric is not None and os.path.exists('checkpoints/best_model.pth'), \
+                "验证后未保存最佳模型"
+            print(f"\n训练 {trainer.global_step} 步，最佳 PSNR {trainer.best_metric:.2f} dB")
+            
+            # 从最终检查点恢复，继续训练 1 个 epoch
+            resumed = Trainer(config_path='config.yaml')
+            resumed.load_checkpoint('checkpoints/final_model.pth')
+            assert resumed.epoch == 1 and resumed.global_step == 4, "恢复的训练进度错误"
+            assert resumed.best_metric == trainer.best_metric, "恢复的最佳指标错误"
+            for p, q in zip(trainer.model.parameters(), resumed.model.parameters()):
+                assert torch.equal(p, q), "恢复的模型参数不一致"
+            
+            resumed.train(num_epochs=2)
+            assert resumed.epoch == 2 and resumed.global_step == 8, "恢复后继续训练的进度错误"
+        finally:
+            os.chdir(cwd)
+    
+    print("✓ 训练、验证与恢复训练正常")
+
+
 def run_all_tests():
     """运行所有测试"""
     print("\n" + "#"*60)
@@ -168,6 +1028,60 @@ def run_all_tests():
         # 测试 4: 图像质量
         test_image_quality()
         
+        # 测试 5: 分块推理
+        test_tiled_inference()
+        
+        # 测试 6: ONNX Runtime
+        test_onnx_parity()
+        
+        # 测试 7: 预处理图块库
+        test_patch_store()
+        
+        # 测试 8: 设备端 LR 退化
+        test_device_degradation()
+        
+        # 测试 9: 梯度检查点
+        test_gradient_checkpointing()
+        
+        # 测试 10: 预分配缓冲区的残差密集块
+        test_memory_efficient_rdb()
+        
+        # 测试 11: 紧凑模型
+        test_compact_model()
+        
+        # 测试 12: 教师输出缓存
+        test_teacher_cache()
+        
+        # 测试 13: 结构化通道剪枝
+        test_channel_pruning()
+        
+        # 测试 14: 批量 PSNR / SSIM
+        test_batch_metrics()
+        
+        # 测试 15: 推理权重导出与快速加载
+        test_inference_weights()
+        
+        # 测试 16: 动态批处理
+        test_dynamic_batching()
+        
+        # 测试 17: 视频超分流水线
+        test_video_pipeline()
+        
+        # 测试 18: 图像与 tensor 格式转换
+        test_tensor_conversion()
+        
+        # 测试 19: 延迟导入
+        test_lazy_imports()
+        
+        # 测试 20: 流水线批处理
+        test_pipelined_batch()
+        
+        # 测试 21: bf16 / int8 推理精度
+        test_inference_precision()
+        
+        # 测试 22: 训练与恢复
+        test_trainer()
+        
         # 总结
         print("\n" + "="*60)
         print("测试完成！")
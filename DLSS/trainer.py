@@ -0,0 +1,838 @@
+"""
+ESRGAN 训练器（命令行入口见 train.py）
+"""
+
+import os
+import contextlib
+import yaml
+import torch
+import torch.distributed as dist
+import torch.nn as nn
+import torch.optim as optim
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader, DistributedSampler
+from torch.utils.tensorboard import SummaryWriter
+from tqdm import tqdm
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from models import ESRGAN, build_model
+from utils import ImageDataset, PatchDataset, ValidationSet, calculate_psnr_batch, calculate_ssim_batch
+from utils.checkpoint_utils import load_model_weights
+from utils.degradation import DeviceDegradation
+from utils.distillation import build_teacher_cache
+from utils.profiling import StepTimer, create_profiler
+from utils.quantization import bf16_supported
+
+
+class PerceptualLoss(nn.Module):
+    """
+    感知损失 (Perceptual Loss)
+    使用 VGG 网络提取的特征计算损失
+    """
+    
+    def __init__(self):
+        super(PerceptualLoss, self).__init__()
+        # 这里可以加载 VGG 网络，为简化暂时使用 L1 损失
+        self.criterion = nn.L1Loss()
+    
+    def forward(self, pred, target):
+        return self.criterion(pred, target)
+
+
+class Trainer:
+    """训练器类"""
+    
+    def __init__(self, config_path='config.yaml'):
+        """
+        初始化训练器
+        
+        Args:
+            config_path: 配置文件路径
+        """
+        # 加载配置
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = yaml.safe_load(f)
+        
+        # 分布式训练（torchrun 启动时）与设备
+        self._setup_distributed()
+        self._log(f"使用设备: {self.device}")
+        
+        if self.device.type == 'cpu':
+            self._log("警告: 未检测到 GPU，训练将非常缓慢。建议使用 NVIDIA GPU。")
+        
+        # 创建模型
+        self.model = self._create_model()
+        
+        # 混合精度 / channels_last / torch.compile
+        self._setup_performance()
+        
+        # 设备端 LR 退化：数据加载进程只传输 uint8 HR 裁剪
+        degradation_cfg = self.config.get('degradation') or {}
+        self.degradation = None
+        if degradation_cfg.get('on_device', False):
+            self.degradation = DeviceDegradation.from_config(self.config)
+            self._log("LR 退化在训练设备上批量生成")
+        elif any(degradation_cfg.get(k, 0) > 0 for k in ('blur_prob', 'noise_prob', 'jpeg_prob')):
+            self._log("警告: 模糊/噪声/JPEG 退化需要设置 degradation.on_device: true，当前只使用双三次下采样")
+        
+        # 知识蒸馏：冻结的 ESRGAN 教师模型
+        self._setup_distillation()
+        
+        # 创建数据加载器
+        self.train_loader = self._create_dataloader()
+        
+        # 验证集（解码后缓存在设备上）
+        self.val_set = self._create_validation_set()
+        
+        # 损失函数
+        self.pixel_loss = nn.L1Loss()
+        self.perceptual_loss = PerceptualLoss()
+        
+        # 优化器
+        self.optimizer = self._create_optimizer()
+        
+        # 学习率调度器
+        self.scheduler = optim.lr_scheduler.StepLR(
+            self.optimizer, 
+            step_size=50, 
+            gamma=0.5
+        )
+        
+        # TensorBoard（分布式训练时只由 rank 0 写入）
+        self.writer = SummaryWriter('runs/esrgan_training') if self.is_main else None
+        
+        # 训练状态
+        self.epoch = 0
+        self.global_step = 0
+        self.best_metric = None
+        
+        self._log("训练器初始化完成！")
+    
+    def _setup_distributed(self):
+        """
+        多进程数据并行（DistributedDataParallel）
+        
+        由 torchrun 设置的 WORLD_SIZE / RANK / LOCAL_RANK 环境变量启用：
+        每个进程一个设备（GPU 上为 cuda:LOCAL_RANK，CPU 上各进程共享 CPU），
+        每个进程读取数据集的不同分片，反向传播时自动平均梯度。
+        后端由 train.dist_backend 指定，auto 时 GPU 用 nccl，CPU 用 gloo
+        """
+        self.world_size = int(os.environ.get('WORLD_SIZE', 1))
+        self.rank = int(os.environ.get('RANK', 0))
+        self.local_rank = int(os.environ.get('LOCAL_RANK', 0))
+        self.distributed = self.world_size > 1
+        self.is_main = self.rank == 0
+        
+        if not torch.cuda.is_available():
+            self.device = torch.device('cpu')
+        elif self.distributed:
+            self.device = torch.device('cuda', self.local_rank)
+            torch.cuda.set_device(self.device)
+        else:
+            self.device = torch.device('cuda')
+        
+        if not self.distributed:
+            return
+        
+        backend = self.config['train'].get('dist_backend', 'auto')
+        if backend == 'auto':
+            backend = 'nccl' if self.device.type == 'cuda' and dist.is_nccl_available() else 'gloo'
+        
+        if not dist.is_initialized():
+            dist.init_process_group(backend=backend)
+        
+        self._log(f"分布式训练: rank {self.rank}/{self.world_size}, 后端 {backend}, "
+              f"每进程 {torch.get_num_threads()} 个线程")
+    
+    def _log(self, *args, **kwargs):
+        """只在 rank 0 打印训练日志（各进程的日志相同）"""
+        if self.is_main:
+            print(*args, **kwargs)
+    
+    def _create_model(self):
+        """创建模型"""
+        model_cfg = self.config['model']
+        
+        model = build_model(
+            model_cfg,
+            checkpoint_every=self.config['train'].get('checkpoint_every', 0)
+        ).to(self.device)
+        self._log(f"模型: {model_cfg.get('name', 'ESRGAN')}")
+        
+        # 统计参数
+        total, trainable = model.count_parameters()
+        
+        return model
+    
+    def _setup_performance(self):
+        """
+        训练性能选项（config.yaml 的 train 部分）
+        
+        - amp: CUDA 上 fp16 自动混合精度 + GradScaler，CPU 上 bf16 自动混合精度
+        - channels_last: 模型和输入使用 NHWC 内存布局（Tensor Core / oneDNN 卷积更快）
+        - compile: 用 torch.compile 编译生成器，前向和反向都使用编译后的模型
+        """
+        train_cfg = self.config['train']
+        
+        self.amp_dtype = None
+        if train_cfg.get('amp', False):
+            if self.device.type == 'cuda':
+                self.amp_dtype = torch.float16
+            elif bf16_supported(self.device):
+                self.amp_dtype = torch.bfloat16
+            else:
+                self._log("警告: CPU 不支持高效的 bf16 运算，混合精度训练已关闭")
+        
+        # 只有 fp16 需要损失缩放，bf16 的指数范围与 fp32 相同
+        scaler_enabled = self.amp_dtype == torch.float16
+        if hasattr(torch.amp, 'GradScaler'):
+            self.scaler = torch.amp.GradScaler('cuda', enabled=scaler_enabled)
+        else:
+            self.scaler = torch.cuda.amp.GradScaler(enabled=scaler_enabled)
+        
+        self.channels_last = train_cfg.get('channels_last', False)
+        if self.channels_last:
+            self.model = self.model.to(memory_format=torch.channels_last)
+        
+        # 保存检查点时始终使用未包装、未编译的 self.model，键名不变
+        self.train_model = self.model
+        if self.distributed:
+            self.train_model = DistributedDataParallel(
+                self.model,
+                device_ids=[self.local_rank] if self.device.type == 'cuda' else None
+            )
+        self.ddp_model = self.train_model
+        
+        if train_cfg.get('compile', False):
+            if hasattr(torch, 'compile'):
+                self.train_model = torch.compile(self.train_model)
+            else:
+                self._log("警告: 当前 PyTorch 版本不支持 torch.compile，已忽略")
+        
+        # 梯度累积：等效批次 = batch_size * accumulation_steps，显存只与 batch_size 有关
+        self.accumulation_steps = max(1, train_cfg.get('accumulation_steps', 1))
+        
+        # 每步分阶段计时（数据等待 / 拷贝 / 前向 / 反向 / 优化器）
+        self.step_timer = StepTimer(self.device, synchronize=train_cfg.get('timing_sync', True))
+        self.profiler = None
+        
+        amp_name = {torch.float16: 'fp16', torch.bfloat16: 'bf16'}.get(self.amp_dtype, '关闭')
+        self._log(f"混合精度: {amp_name}, channels_last: {self.channels_last}, "
+              f"torch.compile: {self.train_model is not self.ddp_model}")
+        self._log(f"梯度检查点: 每 {train_cfg.get('checkpoint_every', 0) or '-'} 个 RRDB 块, "
+              f"梯度累积: {self.accumulation_steps} 步 "
+              f"(等效批次 {train_cfg['batch_size'] * self.accumulation_steps * self.world_size})")
+    
+    def _log_performance(self, step_times, num_samples):
+        """记录每步各阶段用时、吞吐量和内存占用到 TensorBoard"""
+        self.writer.add_scalar('Perf/step_time_ms', step_times['total'] * 1000, self.global_step)
+        self.writer.add_scalar('Perf/samples_per_sec', num_samples / step_times['total'], self.global_step)
+        for phase in StepTimer.PHASES:
+            self.writer.add_scalar(f'Perf/{phase}_ms', step_times[phase] * 1000, self.global_step)
+        
+        if self.device.type == 'cuda':
+            self.writer.add_scalar('Perf/memory_allocated_mb',
+                                   torch.cuda.memory_allocated(self.device) / 1024**2, self.global_step)
+            self.writer.add_scalar('Perf/max_memory_allocated_mb',
+                                   torch.cuda.max_memory_allocated(self.device) / 1024**2, self.global_step)
+        elif resource is not None:
+            # Linux 上 ru_maxrss 单位为 KB
+            self.writer.add_scalar('Perf/max_rss_mb',
+                                   resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, self.global_step)
+    
+    def _report_step_timing(self, epoch):
+        """打印并记录本 epoch 的平均每步用时拆分，判断训练受数据加载还是计算限制"""
+        timing = self.step_timer.summary()
+        
+        print(f"  Step: {timing['total']*1000:.1f} ms "
+              f"(数据 {timing['data']*1000:.1f} / 拷贝 {timing['h2d']*1000:.1f} / "
+              f"前向 {timing['forward']*1000:.1f} / 反向 {timing['backward']*1000:.1f} / "
+              f"优化器 {timing['optimizer']*1000:.1f} ms), {timing['samples_per_sec']:.1f} 样本/秒")
+        
+        if timing['data_fraction'] > 0.2:
+            print(f"  提示: {timing['data_fraction']:.0%} 的时间在等待数据，训练受数据加载限制。"
+                  f"可增加 num_workers、使用预处理图块库或设备端退化")
+        
+        for phase in StepTimer.PHASES:
+            self.writer.add_scalar(f'Epoch/{phase}_ms', timing[phase] * 1000, epoch)
+        self.writer.add_scalar('Epoch/data_wait_fraction', timing['data_fraction'], epoch)
+        self.writer.add_scalar('Epoch/samples_per_sec', timing['samples_per_sec'], epoch)
+    
+    def _setup_distillation(self):
+        """
+        知识蒸馏（config.yaml 的 distill 部分）
+        
+        - 教师: 冻结的 ESRGAN，按 distill.teacher_* 创建，权重键名转换与 Inferencer 相同
+        - 学生: model 部分配置的模型（更少的块数/特征数，或 SRVGGNetCompact）
+        - 输出蒸馏: 学生输出与教师输出的 L1 损失
+        - 特征蒸馏: 学生与教师进入上采样层前的主干特征的 L1 损失（学生为 ESRGAN 时可用）
+        - 缓存: 配合图块库按子图缓存教师输出，之后的 epoch 不再运行教师模型
+        """
+        distill_cfg = self.config.get('distill') or {}
+        self.teacher = None
+        self.teacher_dir = None
+        self.feature_adapter = None
+        
+        if not distill_cfg.get('enabled', False):
+            return
+        
+        teacher_cfg = dict(self.config['model'])
+        teacher_cfg.update(
+            name='ESRGAN',
+            num_blocks=distill_cfg.get('teacher_num_blocks', 23),
+            num_features=distill_cfg.get('teacher_num_features', 64),
+            num_grow_channels=distill_cfg.get('teacher_num_grow_channels', 32)
+        )
+        teacher = build_model(teacher_cfg).to(self.device)
+        
+        teacher_checkpoint = distill_cfg.get('teacher_checkpoint', '')
+        if not load_model_weights(teacher, teacher_checkpoint, self.device):
+            raise ValueError(f"无法加载教师模型权重: {teacher_checkpoint}")
+        
+        teacher.eval()
+        teacher.requires_grad_(False)
+        teacher.set_memory_efficient(True)
+        if self.channels_last:
+            teacher = teacher.to(memory_format=torch.channels_last)
+        self.teacher = teacher
+        
+        self.output_distill_weight = distill_cfg.get('output_weight', 1.0)
+        self.feature_distill_weight = distill_cfg.get('feature_weight', 0.0)
+        
+        if self.feature_distill_weight > 0 and not isinstance(self.model, ESRGAN):
+            self._log("警告: 特征蒸馏需要学生模型为 ESRGAN，已关闭")
+            self.feature_distill_weight = 0.0
+        
+        if self.feature_distill_weight > 0:
+            # 通过上采样层的前置钩子取得主干特征
+            self._features = {}
+            
+            def save_features(name):
+                def hook(module, inputs):
+                    self._features[name] = inputs[0]
+                return hook
+            
+            self.model.generator.upsampler.register_forward_pre_hook(save_features('student'))
+            teacher.generator.upsampler.register_forward_pre_hook(save_features('teacher'))
+            
+            student_features = self.config['model']['num_features']
+            teacher_features = teacher_cfg['num_features']
+            if student_features != teacher_features:
+                # 1x1 卷积把学生特征映射到教师特征通道数，随学生一起训练
+                self.feature_adapter = nn.Conv2d(student_features, teacher_features, 1).to(self.device)
+                self.train_adapter = self.feature_adapter
+                if self.distributed:
+                    self.train_adapter = DistributedDataParallel(self.feature_adapter)
+        
+        # 教师输出缓存
+        cache_dir = distill_cfg.get('cache_dir')
+        patch_store = self.config['data'].get('patch_store')
+        if cache_dir:
+            if not patch_store or not os.path.exists(os.path.join(patch_store, 'meta.json')):
+                self._log("警告: 教师输出缓存需要预处理图块库 (data.patch_store)，改为每步运行教师模型")
+            elif self.degradation is not None:
+                self._log("警告: 设备端退化的 LR 每次随机生成，无法缓存教师输出，改为每步运行教师模型")
+            elif self.feature_distill_weight > 0:
+                self._log("警告: 特征蒸馏需要每步运行教师模型，忽略教师输出缓存")
+            else:
+                # 分布式训练时由 rank 0 生成缓存，其他进程等待后直接复用
+                if self.distributed and not self.is_main:
+                    dist.barrier()
+                self.teacher_dir = build_teacher_cache(
+                    teacher, teacher_checkpoint, patch_store, cache_dir, self.device,
+                    batch_size=self.config['train']['batch_size']
+                )
+                if self.distributed and self.is_main:
+                    dist.barrier()
+        
+        self._log(f"知识蒸馏: 教师 ESRGAN ({teacher_cfg['num_blocks']} 块, {teacher_cfg['num_features']} 通道), "
+              f"输出权重 {self.output_distill_weight}, 特征权重 {self.feature_distill_weight}, "
+              f"教师输出{'使用缓存' if self.teacher_dir else '每步计算'}")
+    
+    def _distillation_losses(self, lr_imgs, sr_imgs, teacher_imgs):
+        """
+        计算蒸馏损失（已乘权重）
+        
+        Args:
+            lr_imgs: 学生输入
+            sr_imgs: 学生输出
+            teacher_imgs: 缓存的教师输出（None 时运行教师模型）
+        
+        Returns:
+            {名称: 损失}
+        """
+        if teacher_imgs is None:
+            with torch.no_grad():
+                teacher_imgs = self.teacher(lr_imgs)
+        
+        losses = {}
+        if self.output_distill_weight > 0:
+            losses['distill_output'] = self.output_distill_weight * self.pixel_loss(sr_imgs, teacher_imgs)
+        
+        if self.feature_distill_weight > 0:
+            student_features = self._features['student']
+            if self.feature_adapter is not None:
+                student_features = self.train_adapter(student_features)
+            losses['distill_feature'] = self.feature_distill_weight * self.pixel_loss(
+                student_features, self._features['teacher']
+            )
+        
+        return losses
+    
+    def _create_dataloader(self):
+        """创建数据加载器"""
+        train_cfg = self.config['train']
+        data_cfg = self.config['data']
+        
+        patch_store = data_cfg.get('patch_store')
+        if patch_store and os.path.exists(os.path.join(patch_store, 'meta.json')):
+            # 使用 prepare_patches.py 生成的预处理图块库
+            dataset = PatchDataset(
+                store_dir=patch_store,
+                scale=self.config['model']['scale'],
+                hr_size=data_cfg['hr_size'],
+                augment=True,
+                hr_only=self.degradation is not None,
+                teacher_dir=self.teacher_dir
+            )
+        else:
+            if patch_store:
+                self._log(f"警告: 图块库不存在: {patch_store}，改为直接读取图像")
+                self._log("  可运行 python prepare_patches.py 生成图块库")
+            dataset = ImageDataset(
+                image_dir=data_cfg['train_dir'],
+                scale=self.config['model']['scale'],
+                hr_size=data_cfg['hr_size'],
+                augment=True,
+                hr_only=self.degradation is not None
+            )
+        
+        if len(dataset) == 0:
+            print("错误: 训练数据集为空！")
+            print(f"请将训练图像放入: {data_cfg['train_dir']}")
+            print("支持的格式: .jpg, .png, .bmp, .tif")
+            raise ValueError("训练数据集为空")
+        
+        # 分布式训练时每个进程只读取自己的分片，batch_size 为每个进程的批次大小
+        self.train_sampler = None
+        if self.distributed:
+            self.train_sampler = DistributedSampler(
+                dataset, num_replicas=self.world_size, rank=self.rank, shuffle=True
+            )
+        
+        dataloader = DataLoader(
+            dataset,
+            batch_size=train_cfg['batch_size'],
+            shuffle=self.train_sampler is None,
+            sampler=self.train_sampler,
+            num_workers=train_cfg['num_workers'],
+            pin_memory=True if self.device.type == 'cuda' else False
+        )
+        
+        self._log(f"训练数据集大小: {len(dataset)}")
+        self._log(f"批次数量: {len(dataloader)}" + (f"（每个进程，共 {self.world_size} 个进程）"
+                                              if self.distributed else ""))
+        
+        return dataloader
+    
+    def _create_validation_set(self):
+        """
+        加载验证集（config.yaml 的 validation 部分，图像来自 data.test_dir）
+        
+        分布式训练时只由 rank 0 验证
+        """
+        val_cfg = self.config.get('validation') or {}
+        if not val_cfg.get('enabled', False) or not self.is_main:
+            return None
+        
+        val_set = ValidationSet(
+            image_dir=self.config['data']['test_dir'],
+            scale=self.config['model']['scale'],
+            hr_size=val_cfg.get('hr_size', 0),
+            max_images=val_cfg.get('max_images', 0),
+            device=self.device
+        )
+        
+        if len(val_set) == 0:
+            print(f"警告: 验证集为空（{self.config['data']['test_dir']}），跳过验证")
+            return None
+        
+        self.val_metric = val_cfg.get('metric', 'psnr')
+        if self.val_metric not in ('psnr', 'ssim'):
+            raise ValueError(f"不支持的验证指标: {self.val_metric}（可选: psnr, ssim）")
+        
+        # 验证时（no_grad）密集块使用预分配缓冲区，训练不受影响
+        if hasattr(self.model, 'set_memory_efficient'):
+            self.model.set_memory_efficient(True)
+        
+        print(f"验证集: {len(val_set)} 张图像，按 {self.val_metric.upper()} 保存最佳模型")
+        return val_set
+    
+    @torch.no_grad()
+    def validate(self):
+        """
+        在缓存的验证集上批量推理，在设备上计算 PSNR / SSIM
+        
+        Returns:
+            {'psnr': 平均 PSNR, 'ssim': 平均 SSIM}
+        """
+        val_cfg = self.config.get('validation') or {}
+        batch_size = val_cfg.get('batch_size', 8)
+        crop_border = val_cfg.get('crop_border', self.config['model']['scale'])
+        y_channel = val_cfg.get('y_channel', True)
+        
+        self.model.eval()
+        psnrs, ssims = [], []
+        
+        for lr_uint8, hr_uint8 in self.val_set.batches(batch_size):
+            lr_imgs = lr_uint8.float().div_(255.0)
+            if self.channels_last:
+                lr_imgs = lr_imgs.contiguous(memory_format=torch.channels_last)
+            
+            with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype,
+                                enabled=self.amp_dtype is not None):
+                sr_imgs = self.model(lr_imgs)
+            
+            psnrs.append(calculate_psnr_batch(sr_imgs, hr_uint8, crop_border, y_channel))
+            ssims.append(calculate_ssim_batch(sr_imgs, hr_uint8, crop_border, y_channel))
+        
+        self.model.train()
+        
+        # 只在最后同步一次设备
+        return {
+            'psnr': torch.cat(psnrs).mean().item(),
+            'ssim': torch.cat(ssims).mean().item()
+        }
+    
+    def _run_validation(self, epoch):
+        """验证、记录指标，指标提升时保存 best_model.pth（未启用验证时也不做进程同步）"""
+        val_cfg = self.config.get('validation') or {}
+        interval = val_cfg.get('interval', 1)
+        if not val_cfg.get('enabled', False) or (epoch + 1) % interval != 0:
+            return
+        
+        if self.val_set is not None:
+            start = time.perf_counter()
+            metrics = self.validate()
+            
+            print(f"  Val PSNR: {metrics['psnr']:.2f} dB, SSIM: {metrics['ssim']:.4f} "
+                  f"({time.perf_counter() - start:.1f} 秒)")
+            self.writer.add_scalar('Val/psnr', metrics['psnr'], epoch)
+            self.writer.add_scalar('Val/ssim', metrics['ssim'], epoch)
+            
+            value = metrics[self.val_metric]
+            if self.best_metric is None or value > self.best_metric:
+                self.best_metric = value
+                self.save_checkpoint('best_model.pth')
+        
+        # 其他进程等待 rank 0 验证完成
+        if self.distributed:
+            dist.barrier()
+    
+    def _create_optimizer(self):
+        """创建优化器"""
+        train_cfg = self.config['train']
+        opt_cfg = self.config['optimizer']
+        
+        parameters = list(self.model.parameters())
+        if self.feature_adapter is not None:
+            parameters += list(self.feature_adapter.parameters())
+        
+        optimizer = optim.Adam(
+            parameters,
+            lr=train_cfg['learning_rate'],
+            betas=opt_cfg['betas']
+        )
+        
+        return optimizer
+    
+    def _prepare_batch(self, batch):
+        """
+        把一个批次移到训练设备
+        
+        Returns:
+            (lr_imgs, hr_imgs, teacher_imgs) 浮点 tensor，没有缓存的教师输出时 teacher_imgs 为 None
+        """
+        teacher_imgs = None
+        
+        if self.degradation is not None:
+            # uint8 HR 的传输量约为浮点 LR+HR 的 1/4
+            hr_uint8 = batch.to(self.device, non_blocking=True)
+            lr_imgs, hr_imgs = self.degradation(hr_uint8)
+        elif len(batch) == 3:
+            lr_imgs, hr_imgs, teacher_imgs = (t.to(self.device) for t in batch)
+        else:
+            lr_imgs, hr_imgs = batch
+            lr_imgs, hr_imgs = lr_imgs.to(self.device), hr_imgs.to(self.device)
+        
+        if self.channels_last:
+            lr_imgs = lr_imgs.contiguous(memory_format=torch.channels_last)
+            hr_imgs = hr_imgs.contiguous(memory_format=torch.channels_last)
+            if teacher_imgs is not None:
+                teacher_imgs = teacher_imgs.contiguous(memory_format=torch.channels_last)
+        
+        return lr_imgs, hr_imgs, teacher_imgs
+    
+    def _grad_sync(self, should_step):
+        """梯度累积的中间批次跳过 DDP 的梯度同步，只在更新参数前同步一次"""
+        stack = contextlib.ExitStack()
+        if self.distributed and not should_step:
+            stack.enter_context(self.ddp_model.no_sync())
+            if self.feature_adapter is not None:
+                stack.enter_context(self.train_adapter.no_sync())
+        return stack
+    
+    def train_epoch(self):
+        """训练一个 epoch"""
+        self.model.train()
+        
+        epoch_pixel_loss = 0.0
+        epoch_perceptual_loss = 0.0
+        epoch_total_loss = 0.0
+        
+        # 分布式训练时每个 epoch 使用不同的随机分片
+        if self.train_sampler is not None:
+            self.train_sampler.set_epoch(self.epoch)
+        
+        # 进度条（分布式训练时只在 rank 0 显示）
+        pbar = tqdm(self.train_loader, desc=f"Epoch {self.epoch+1}", disable=not self.is_main)
+        
+        num_batches = len(self.train_loader)
+        self.optimizer.zero_grad()
+        self.step_timer.reset()
+        
+        for batch_idx, batch in enumerate(pbar):
+            self.step_timer.mark('data')
+            
+            # 数据移到设备（必要时在设备上生成 LR）
+            lr_imgs, hr_imgs, teacher_imgs = self._prepare_batch(batch)
+            self.step_timer.mark('h2d')
+            
+            should_step = (batch_idx + 1) % self.accumulation_steps == 0 or batch_idx + 1 == num_batches
+            
+            with self._grad_sync(should_step):
+                with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype,
+                                    enabled=self.amp_dtype is not None):
+                    # 前向传播
+                    sr_imgs = self.train_model(lr_imgs)
+                    
+                    # 计算损失
+                    loss_cfg = self.config['loss']
+                    
+                    pixel_loss = self.pixel_loss(sr_imgs, hr_imgs)
+                    perceptual_loss = self.perceptual_loss(sr_imgs, hr_imgs)
+                    
+                    total_loss = (
+                        loss_cfg['pixel_weight'] * pixel_loss +
+                        loss_cfg['perceptual_weight'] * perceptual_loss
+                    )
+                    
+                    # 知识蒸馏
+                    distill_losses = {}
+                    if self.teacher is not None:
+                        distill_losses = self._distillation_losses(lr_imgs, sr_imgs, teacher_imgs)
+                        total_loss = total_loss + sum(distill_losses.values())
+                self.step_timer.mark('forward')
+                
+                # 反向传播（未启用 fp16 时 GradScaler 不做任何缩放）
+                # 梯度累积时损失按累积步数平均，使梯度与大批次一致
+                self.scaler.scale(total_loss / self.accumulation_steps).backward()
+                self.step_timer.mark('backward')
+            
+            if should_step:
+                self.scaler.step(self.optimizer)
+                self.scaler.update()
+                self.optimizer.zero_grad()
+            self.step_timer.mark('optimizer')
+            
+            # 统计
+            epoch_pixel_loss += pixel_loss.item()
+            epoch_perceptual_loss += perceptual_loss.item()
+            epoch_total_loss += total_loss.item()
+            
+            num_samples = lr_imgs.shape[0] * self.world_size
+            step_times = self.step_timer.end_step(num_samples)
+            
+            # 更新进度条
+            pbar.set_postfix({
+                'loss': f"{total_loss.item():.4f}",
+                'pixel': f"{pixel_loss.item():.4f}",
+                'percep': f"{perceptual_loss.item():.4f}"
+            })
+            
+            # TensorBoard 记录
+            if self.writer is not None and self.global_step % 10 == 0:
+                self.writer.add_scalar('Loss/pixel', pixel_loss.item(), self.global_step)
+                self.writer.add_scalar('Loss/perceptual', perceptual_loss.item(), self.global_step)
+                self.writer.add_scalar('Loss/total', total_loss.item(), self.global_step)
+                for name, loss in distill_losses.items():
+                    self.writer.add_scalar(f'Loss/{name}', loss.item(), self.global_step)
+            
+            if self.writer is not None and self.global_step % 10 == 0:
+                self._log_performance(step_times, num_samples)
+            
+            if self.profiler is not None:
+                self.profiler.step()
+            
+            self.global_step += 1
+            
+            # 日志记录不计入下一步的数据等待时间
+            self.step_timer.skip()
+        
+        # 计算平均损失（分布式训练时对所有进程取平均）
+        avg_losses = torch.tensor(
+            [epoch_pixel_loss, epoch_perceptual_loss, epoch_total_loss], device=self.device
+        ) / num_batches
+        if self.distributed:
+            dist.all_reduce(avg_losses)
+            avg_losses /= self.world_size
+        avg_pixel_loss, avg_perceptual_loss, avg_total_loss = avg_losses.tolist()
+        
+        return avg_pixel_loss, avg_perceptual_loss, avg_total_loss
+    
+    def save_checkpoint(self, filename='checkpoint.pth'):
+        """保存检查点（分布式训练时各进程参数相同，只由 rank 0 写入）"""
+        if not self.is_main:
+            return
+        
+        checkpoint_dir = './checkpoints'
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        
+        checkpoint_path = os.path.join(checkpoint_dir, filename)
+        
+        checkpoint = {
+            'epoch': self.epoch,
+            'global_step': self.global_step,
+            'model_state_dict': self.model.state_dict(),
+            'optimizer_state_dict': self.optimizer.state_dict(),
+            'scheduler_state_dict': self.scheduler.state_dict(),
+            'scaler_state_dict': self.scaler.state_dict(),
+            'best_metric': self.best_metric,
+            'config': self.config
+        }
+        
+        if self.feature_adapter is not None:
+            checkpoint['feature_adapter_state_dict'] = self.feature_adapter.state_dict()
+        
+        torch.save(checkpoint, checkpoint_path)
+        print(f"检查点已保存: {checkpoint_path}")
+    
+    def load_checkpoint(self, checkpoint_path):
+        """
+        加载检查点
+        
+        分布式训练时每个进程都加载同一个文件（映射到自己的设备），参数和优化器状态保持一致
+        """
+        checkpoint = torch.load(checkpoint_path, map_location=self.device, weights_only=False)
+        
+        self.model.load_state_dict(checkpoint['model_state_dict'])
+        self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        self.scheduler.load_state_dict(checkpoint['scheduler_state_dict'])
+        if 'scaler_state_dict' in checkpoint:
+            self.scaler.load_state_dict(checkpoint['scaler_state_dict'])
+        if self.feature_adapter is not None and 'feature_adapter_state_dict' in checkpoint:
+            self.feature_adapter.load_state_dict(checkpoint['feature_adapter_state_dict'])
+        self.epoch = checkpoint['epoch']
+        self.global_step = checkpoint['global_step']
+        self.best_metric = checkpoint.get('best_metric')
+        
+        self._log(f"成功加载检查点: {checkpoint_path}")
+        self._log(f"从 epoch {self.epoch + 1} 继续训练")
+    
+    def train(self, num_epochs=None):
+        """
+        开始训练
+        
+        Args:
+            num_epochs: 训练轮数，如果为 None 则使用配置文件中的值
+        """
+        if num_epochs is None:
+            num_epochs = self.config['train']['epochs']
+        
+        save_interval = self.config['train']['save_interval']
+        
+        self._log("\n" + "="*50)
+        self._log(f"开始训练 {self.config['model'].get('name', 'ESRGAN')} 模型")
+        self._log("="*50)
+        self._log(f"总 epoch 数: {num_epochs}")
+        self._log(f"保存间隔: 每 {save_interval} epoch")
+        self._log(f"设备: {self.device}" + (f" x {self.world_size} 进程" if self.distributed else ""))
+        self._log("="*50 + "\n")
+        
+        # torch.profiler 追踪窗口（只在 rank 0 记录）
+        train_cfg = self.config['train']
+        profile_steps = train_cfg.get('profile_steps', 0)
+        if profile_steps > 0 and self.is_main:
+            profile_dir = train_cfg.get('profile_dir', './runs/profile')
+            self.profiler = create_profiler(
+                profile_dir, profile_steps,
+                wait_steps=train_cfg.get('profile_wait', 5),
+                device=self.device
+            )
+            self.profiler.start()
+            print(f"性能追踪: 跳过 {train_cfg.get('profile_wait', 5)} 步后记录 {profile_steps} 步，写入 {profile_dir}")
+        
+        start_time = time.time()
+        
+        try:
+            for epoch in range(self.epoch, num_epochs):
+                self.epoch = epoch
+                
+                # 训练一个 epoch
+                pixel_loss, perceptual_loss, total_loss = self.train_epoch()
+                
+                # 更新学习率
+                self.scheduler.step()
+                current_lr = self.optimizer.param_groups[0]['lr']
+                
+                # 检查点记录下一个要训练的 epoch，恢复时不会重复训练已完成的 epoch
+                self.epoch = epoch + 1
+                
+                if self.is_main:
+                    # 打印信息
+                    print(f"\nEpoch {epoch+1}/{num_epochs}:")
+                    print(f"  Pixel Loss: {pixel_loss:.4f}")
+                    print(f"  Perceptual Loss: {perceptual_loss:.4f}")
+                    print(f"  Total Loss: {total_loss:.4f}")
+                    print(f"  Learning Rate: {current_lr:.6f}")
+                    self._report_step_timing(epoch)
+                    
+                    # TensorBoard
+                    self.writer.add_scalar('Epoch/pixel_loss', pixel_loss, epoch)
+                    self.writer.add_scalar('Epoch/perceptual_loss', perceptual_loss, epoch)
+                    self.writer.add_scalar('Epoch/total_loss', total_loss, epoch)
+                    self.writer.add_scalar('Epoch/learning_rate', current_lr, epoch)
+                
+                # 验证并保存最佳模型
+                self._run_validation(epoch)
+                
+                # 定期保存
+                if (epoch + 1) % save_interval == 0:
+                    self.save_checkpoint(f'checkpoint_epoch_{epoch+1}.pth')
+            
+            # 训练完成
+            elapsed_time = time.time() - start_time
+            if self.is_main:
+                print("\n" + "="*50)
+                print("训练完成！")
+                print(f"总用时: {elapsed_time/3600:.2f} 小时")
+                print("="*50)
+            
+            # 保存最终模型
+            self.save_checkpoint('final_model.pth')
+            
+        except KeyboardInterrupt:
+            self._log("\n训练被中断！")
+            self.save_checkpoint('interrupted_checkpoint.pth')
+        
+        finally:
+            if self.profiler is not None:
+                self.profiler.stop()
+                self.profiler = None
+            if self.writer is not None:
+                self.writer.close()
@@ -1,15 +1,38 @@
 """
 工具函数模块
+
+子模块在首次访问对应名称时才导入（PEP 562），
+只用到部分工具的脚本不必为 torch / cv2 / PIL 等依赖付出启动开销
 """
 
-from .image_utils import load_image, save_image, tensor_to_image, image_to_tensor, calculate_psnr
-from .dataset import ImageDataset
-
-__all__ = [
-    'load_image',
-    'save_image',
-    'tensor_to_image',
-    'image_to_tensor',
-    'calculate_psnr',
-    'ImageDataset'
-]
+import importlib
+
+# 公开名称 -> 所在子模块
+_LAZY_ATTRS = {
+    'load_image': 'image_utils',
+    'save_image': 'image_utils',
+    'tensor_to_image': 'image_utils',
+    'image_to_tensor': 'image_utils',
+    'calculate_psnr': 'image_utils',
+    'calculate_psnr_batch': 'metrics',
+    'calculate_ssim_batch': 'metrics',
+    'ImageDataset': 'dataset',
+    'ValidationSet': 'dataset',
+    'PatchDataset': 'patch_store',
+    'build_patch_store': 'patch_store',
+    'tiled_forward': 'tiling'
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_LAZY_ATTRS[name]}', __name__), name)
+    globals()[name] = value  # 之后的访问不再经过 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,235 @@
+"""
+权重加载工具
+统一处理本项目检查点、Real-ESRGAN / BasicSR 等不同格式的权重文件和键名，
+以及只含推理权重的快速格式（safetensors / 推理用 .pth）的导出和内存映射加载
+"""
+
+import os
+import json
+import zipfile
+import torch
+import torch.nn as nn
+
+try:
+    import safetensors.torch
+except ImportError:  # 可选依赖，只有 .safetensors 文件需要
+    safetensors = None
+
+
+def extract_state_dict(checkpoint: dict) -> dict:
+    """
+    从不同格式的权重文件中取出 state_dict
+
+    - 本项目检查点: model_state_dict
+    - Real-ESRGAN: params_ema / params
+    - 其他: 直接是 state_dict
+    """
+    if 'model_state_dict' in checkpoint:
+        return checkpoint['model_state_dict']
+    elif 'params_ema' in checkpoint:
+        # Real-ESRGAN 格式
+        return checkpoint['params_ema']
+    elif 'params' in checkpoint:
+        return checkpoint['params']
+    return checkpoint
+
+
+# Real-ESRGAN / 原版 ESRGAN 的层名 -> 本项目 RRDBNet 的层名
+_LAYER_NAME_MAP = [
+    ('conv_up1.', 'upsampler.0.'),
+    ('conv_up2.', 'upsampler.3.'),
+    ('conv_up3.', 'upsampler.6.'),
+    ('upconv1.', 'upsampler.0.'),
+    ('upconv2.', 'upsampler.3.'),
+    ('upconv3.', 'upsampler.6.'),
+    ('HRconv.', 'conv_hr.'),
+]
+
+
+def convert_esrgan_keys(state_dict: dict) -> dict:
+    """
+    把各种命名的 RRDBNet 权重键名转换为本项目 ESRGAN 的键名（generator.xxx）
+
+    Args:
+        state_dict: 原始 state_dict
+
+    Returns:
+        转换后的 state_dict
+    """
+    converted_state_dict = {}
+
+    for k, v in state_dict.items():
+        new_k = k
+
+        # 移除 DataParallel / DDP 的 module 前缀和 generator 前缀
+        if new_k.startswith('module.'):
+            new_k = new_k[len('module.'):]
+        if new_k.startswith('generator.'):
+            new_k = new_k[len('generator.'):]
+
+        # 转换 body -> rrdb_blocks
+        if new_k.startswith('body.'):
+            new_k = 'rrdb_blocks.' + new_k[len('body.'):]
+
+        # 转换上采样层和重建层
+        for old, new in _LAYER_NAME_MAP:
+            if new_k.startswith(old):
+                new_k = new + new_k[len(old):]
+                break
+
+        converted_state_dict['generator.' + new_k] = v
+
+    return converted_state_dict
+
+
+def _require_safetensors():
+    if safetensors is None:
+        raise ImportError("读写 .safetensors 文件需要安装 safetensors: pip install safetensors")
+
+
+def read_checkpoint(checkpoint_path: str) -> dict:
+    """
+    读取权重文件（不复制到设备）
+
+    - .safetensors: 内存映射，一次打开同时读取张量和元数据
+    - 其他: torch.load(weights_only=True)，zip 格式使用 mmap，优化器状态等不用的张量不会被读入；
+      旧版（非 zip）格式不能内存映射，直接读取
+
+    含有 weights_only 不允许的对象或文件损坏时抛出异常，不会回退到不安全的完整反序列化
+
+    Returns:
+        检查点字典；.safetensors 文件返回 {'model_state_dict', 'model_config', 'normalized_keys'}
+    """
+    if checkpoint_path.endswith('.safetensors'):
+        _require_safetensors()
+        with safetensors.safe_open(checkpoint_path, framework='pt', device='cpu') as f:
+            metadata = f.metadata() or {}
+            state_dict = {k: f.get_tensor(k) for k in f.keys()}
+        return {
+            'model_state_dict': state_dict,
+            'model_config': json.loads(metadata['model_config']) if 'model_config' in metadata else None,
+            'normalized_keys': metadata.get('normalized_keys') == 'true'
+        }
+
+    return torch.load(checkpoint_path, map_location='cpu', mmap=zipfile.is_zipfile(checkpoint_path),
+                      weights_only=True)
+
+
+def is_inference_weights(checkpoint) -> bool:
+    """检查点是否为 save_inference_weights 导出的推理权重格式"""
+    return isinstance(checkpoint, dict) and bool(checkpoint.get('normalized_keys'))
+
+
+def save_inference_weights(model: nn.Module, output_path: str, model_config: dict):
+    """
+    导出只含推理权重的文件：键名已规范化（加载时无需转换），不含优化器等训练状态，
+    附带模型配置，可用 build_model_from_weights 直接创建模型
+
+    Args:
+        model: 已加载权重的模型
+        output_path: 输出路径（.safetensors 使用 safetensors 格式，否则为 torch 格式）
+        model_config: config.yaml 的 model 部分
+    """
+    # safetensors 不允许共享存储的张量，统一复制为独立的连续张量
+    state_dict = {k: v.detach().cpu().contiguous().clone() for k, v in model.state_dict().items()}
+
+    if output_path.endswith('.safetensors'):
+        _require_safetensors()
+        metadata = {'model_config': json.dumps(model_config), 'normalized_keys': 'true'}
+        safetensors.torch.save_file(state_dict, output_path, metadata=metadata)
+    else:
+        torch.save({
+            'model_state_dict': state_dict,
+            'model_config': dict(model_config),
+            'normalized_keys': True
+        }, output_path)
+
+    size_mb = os.path.getsize(output_path) / 1024**2
+    print(f"推理权重已导出: {output_path} ({size_mb:.1f} MB)")
+
+
+def build_model_from_weights(checkpoint_path: str, model_config: dict, device=None, checkpoint=None):
+    """
+    从 save_inference_weights 导出的文件快速创建模型
+
+    模型先在 meta 设备上创建（跳过随机初始化），再直接把内存映射的权重作为参数（assign），
+    CPU 上不复制权重
+
+    Args:
+        checkpoint_path: 权重文件路径
+        model_config: config.yaml 的 model 部分（文件中带有模型配置时以文件为准）
+        device: 目标设备
+        checkpoint: 已用 read_checkpoint 读取的检查点（避免重复反序列化），为 None 时读取 checkpoint_path
+
+    Returns:
+        (模型, 实际使用的模型配置)；文件不是推理权重格式时返回 (None, model_config)
+    """
+    from models import build_model
+
+    if checkpoint is None:
+        checkpoint = read_checkpoint(checkpoint_path)
+    if not is_inference_weights(checkpoint):
+        return None, model_config
+
+    file_config = checkpoint.get('model_config')
+    if file_config and file_config != model_config:
+        print("提示: 使用权重文件中的模型配置（与配置文件不同）")
+        model_config = file_config
+
+    with torch.device('meta'):
+        model = build_model(model_config)
+    model.load_state_dict(checkpoint['model_state_dict'], strict=True, assign=True)
+
+    print(f"成功加载推理权重: {checkpoint_path}")
+    return model.to(device or 'cpu'), model_config
+
+
+def load_model_weights(model: nn.Module, checkpoint_path: str, device=None, checkpoint=None) -> bool:
+    """
+    加载模型权重，键名不完全匹配时回退到非严格加载
+
+    Args:
+        model: 模型（ESRGAN 会做键名转换，其他模型按原键名加载）
+        checkpoint_path: 权重文件路径
+        device: 加载到的设备
+        checkpoint: 已用 read_checkpoint 读取的检查点（避免重复反序列化），为 None 时读取 checkpoint_path
+
+    Returns:
+        是否成功加载
+    """
+    from models import ESRGAN
+
+    if not os.path.exists(checkpoint_path):
+        print(f"警告: 权重文件不存在: {checkpoint_path}")
+        return False
+
+    try:
+        if checkpoint is None:
+            checkpoint = read_checkpoint(checkpoint_path)
+        state_dict = extract_state_dict(checkpoint)
+
+        # 智能转换键名（SRVGGNetCompact 键名与 Real-ESRGAN 官方一致，无需转换；导出的推理权重已规范化）
+        if isinstance(model, ESRGAN) and not checkpoint.get('normalized_keys'):
+            state_dict = convert_esrgan_keys(state_dict)
+
+        # 尝试加载权重
+        try:
+            model.load_state_dict(state_dict, strict=True)
+            print(f"成功加载模型权重: {checkpoint_path}")
+        except RuntimeError:
+            # 如果严格模式失败，尝试非严格模式
+            print(f"警告: 权重部分不匹配，尝试非严格加载...")
+            missing_keys, unexpected_keys = model.load_state_dict(state_dict, strict=False)
+
+            if missing_keys:
+                print(f"  缺失的键 ({len(missing_keys)}): {missing_keys[:5]}...")
+            if unexpected_keys:
+                print(f"  意外的键 ({len(unexpected_keys)}): {unexpected_keys[:5]}...")
+
+            print("已加载兼容的权重部分")
+
+        return True
+
+    except Exception as e:
+        print(f"加载权重时出错: {e}")
+        return False
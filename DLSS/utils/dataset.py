@@ -23,7 +23,8 @@ class ImageDataset(Dataset):
         image_dir: str, 
         scale: int = 4,
         hr_size: int = 256,
-        augment: bool = True
+        augment: bool = True,
+        hr_only: bool = False
     ):
         """
         Args:
@@ -31,12 +32,14 @@ class ImageDataset(Dataset):
             scale: 放大倍数
             hr_size: 高分辨率图像裁剪大小
             augment: 是否进行数据增强
+            hr_only: 只返回 uint8 HR 裁剪，LR 在训练设备上生成（见 utils.degradation）
         """
         self.image_dir = image_dir
         self.scale = scale
         self.hr_size = hr_size
         self.lr_size = hr_size // scale
         self.augment = augment
+        self.hr_only = hr_only
         
         # 获取所有图像文件
         self.image_files = self._get_image_files()
@@ -73,6 +76,7 @@ class ImageDataset(Dataset):
         Returns:
             lr_tensor: 低分辨率图像 tensor (C, H, W)
             hr_tensor: 高分辨率图像 tensor (C, H, W)
+            （hr_only 时只返回 uint8 HR tensor (C, H, W)）
         """
         # 加载图像
         img_path = self.image_files[idx]
@@ -85,6 +89,9 @@ class ImageDataset(Dataset):
         if self.augment:
             hr_img = self._augment(hr_img)
         
+        if self.hr_only:
+            return torch.from_numpy(np.ascontiguousarray(hr_img.transpose(2, 0, 1)))
+        
         # 生成低分辨率图像
         lr_img = self._generate_lr(hr_img)
         
@@ -141,6 +148,77 @@ class ImageDataset(Dataset):
         return lr_img
 
 
+class ValidationSet:
+    """
+    验证集
+    图像只解码一次，按尺寸分组后以 uint8 tensor 缓存在指定设备上，之后每个 epoch 直接按批次读取
+    """
+    
+    def __init__(
+        self,
+        image_dir: str,
+        scale: int = 4,
+        hr_size: int = 0,
+        max_images: int = 0,
+        device: torch.device = torch.device('cpu')
+    ):
+        """
+        Args:
+            image_dir: 验证图像目录
+            scale: 放大倍数
+            hr_size: HR 中心裁剪大小（0 表示整图，只裁到 scale 的整数倍）
+            max_images: 最多使用的图像数（0 表示全部）
+            device: 缓存所在的设备
+        """
+        self.scale = scale
+        
+        image_files = ImageDataset(image_dir, scale=scale, augment=False).image_files
+        if max_images > 0:
+            image_files = image_files[:max_images]
+        
+        groups = {}
+        for image_file in image_files:
+            hr_img = self._center_crop(load_image(image_file, mode='RGB'), hr_size)
+            h, w = hr_img.shape[:2]
+            
+            # 与 ImageDataset 相同的双三次下采样
+            lr_img = resize_image(hr_img, (w // scale, h // scale), cv2.INTER_CUBIC)
+            groups.setdefault((h, w), []).append((lr_img, hr_img))
+        
+        # 相同尺寸的图像合并为一个 tensor，按批次切片即可，无需再拼接
+        self.groups = []
+        for pairs in groups.values():
+            lr = torch.from_numpy(np.stack([lr for lr, _ in pairs])).permute(0, 3, 1, 2)
+            hr = torch.from_numpy(np.stack([hr for _, hr in pairs])).permute(0, 3, 1, 2)
+            self.groups.append((lr.contiguous().to(device), hr.contiguous().to(device)))
+        
+        self.num_images = sum(len(lr) for lr, _ in self.groups)
+    
+    def _center_crop(self, image: np.ndarray, size: int) -> np.ndarray:
+        """中心裁剪，并保证尺寸是 scale 的整数倍"""
+        h, w = image.shape[:2]
+        crop_h, crop_w = (min(size, h), min(size, w)) if size > 0 else (h, w)
+        crop_h -= crop_h % self.scale
+        crop_w -= crop_w % self.scale
+        
+        top, left = (h - crop_h) // 2, (w - crop_w) // 2
+        return image[top:top + crop_h, left:left + crop_w]
+    
+    def __len__(self):
+        return self.num_images
+    
+    def batches(self, batch_size: int):
+        """
+        按批次遍历验证集
+        
+        Yields:
+            (lr_uint8, hr_uint8)，形状 (B, C, H, W)
+        """
+        for lr, hr in self.groups:
+            for start in range(0, len(lr), batch_size):
+                yield lr[start:start + batch_size], hr[start:start + batch_size]
+
+
 class SingleImageDataset(Dataset):
     """
     单图像测试数据集
@@ -0,0 +1,232 @@
+"""
+设备端低分辨率退化
+数据加载进程只传输 uint8 HR 裁剪，双三次下采样以及可选的模糊 / 噪声 / 类 JPEG 压缩
+在训练设备上按批次完成（Real-ESRGAN 风格的一阶退化）
+"""
+
+import math
+import torch
+import torch.nn.functional as F
+from typing import Sequence, Tuple
+
+
+# JPEG 标准量化表（质量 50）
+JPEG_LUMA_TABLE = [
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+]
+
+JPEG_CHROMA_TABLE = [
+    17, 18, 24, 47, 99, 99, 99, 99,
+    18, 21, 26, 66, 99, 99, 99, 99,
+    24, 26, 56, 99, 99, 99, 99, 99,
+    47, 66, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+]
+
+
+def bicubic_downsample(images: torch.Tensor, scale: int) -> torch.Tensor:
+    """
+    双三次下采样，与 cv2.resize(..., cv2.INTER_CUBIC) 结果一致
+
+    Args:
+        images: (B, C, H, W) 浮点 tensor
+        scale: 缩小倍数
+
+    Returns:
+        (B, C, H/scale, W/scale)
+    """
+    return F.interpolate(images, scale_factor=1.0 / scale, mode='bicubic', align_corners=False, antialias=False)
+
+
+def gaussian_blur(images: torch.Tensor, sigmas: torch.Tensor, kernel_size: int) -> torch.Tensor:
+    """
+    逐样本各向同性高斯模糊（每个样本使用自己的 sigma）
+
+    Args:
+        images: (B, C, H, W)
+        sigmas: (B,) 模糊标准差（像素）
+        kernel_size: 卷积核大小（奇数）
+    """
+    b, c, h, w = images.shape
+    radius = kernel_size // 2
+
+    coords = torch.arange(kernel_size, device=images.device, dtype=images.dtype) - radius
+    kernel_1d = torch.exp(-coords[None] ** 2 / (2 * sigmas[:, None] ** 2))
+    kernel_1d = kernel_1d / kernel_1d.sum(dim=1, keepdim=True)
+
+    # 可分离卷积：把批次并入通道维度做分组卷积
+    x = F.pad(images.reshape(1, b * c, h, w), (radius, radius, radius, radius), mode='reflect')
+    weight = kernel_1d.repeat_interleave(c, dim=0)
+    x = F.conv2d(x, weight[:, None, None, :], groups=b * c)
+    x = F.conv2d(x, weight[:, None, :, None], groups=b * c)
+
+    return x.reshape(b, c, h, w)
+
+
+def _dct_matrix(size: int, device, dtype) -> torch.Tensor:
+    """正交 DCT-II 矩阵"""
+    n = torch.arange(size, device=device, dtype=dtype)
+    matrix = torch.cos(math.pi * (2 * n[None] + 1) * n[:, None] / (2 * size)) * math.sqrt(2.0 / size)
+    matrix[0] /= math.sqrt(2.0)
+    return matrix
+
+
+def _quality_scale(quality: torch.Tensor) -> torch.Tensor:
+    """IJG 质量因子 -> 量化表缩放系数"""
+    quality = quality.clamp(1, 100)
+    return torch.where(quality < 50, 50.0 / quality, (200.0 - 2 * quality) / 100.0)
+
+
+def jpeg_like(images: torch.Tensor, qualities: torch.Tensor) -> torch.Tensor:
+    """
+    类 JPEG 压缩：YCbCr 8x8 块 DCT 量化后重建（不做色度下采样和熵编码）
+    产生与 JPEG 相同类型的块效应和振铃伪影
+
+    Args:
+        images: (B, 3, H, W)，取值 [0, 1]
+        qualities: (B,) JPEG 质量因子 (1~100)
+    """
+    b, c, h, w = images.shape
+    device, dtype = images.device, images.dtype
+
+    pad_h, pad_w = (-h) % 8, (-w) % 8
+    x = F.pad(images, (0, pad_w, 0, pad_h), mode='replicate') * 255.0
+
+    # RGB -> YCbCr（JFIF）
+    r, g, bl = x[:, 0], x[:, 1], x[:, 2]
+    y = 0.299 * r + 0.587 * g + 0.114 * bl
+    cb = -0.168736 * r - 0.331264 * g + 0.5 * bl
+    cr = 0.5 * r - 0.418688 * g - 0.081312 * bl
+    x = torch.stack([y - 128.0, cb, cr], dim=1)
+
+    # 切分为 8x8 块: (B, C, H/8, W/8, 8, 8)
+    hb, wb = x.shape[2] // 8, x.shape[3] // 8
+    blocks = x.reshape(b, c, hb, 8, wb, 8).permute(0, 1, 2, 4, 3, 5)
+
+    dct = _dct_matrix(8, device, dtype)
+    coeffs = dct @ blocks @ dct.T
+
+    tables = torch.stack([
+        torch.tensor(JPEG_LUMA_TABLE, device=device, dtype=dtype),
+        torch.tensor(JPEG_CHROMA_TABLE, device=device, dtype=dtype),
+        torch.tensor(JPEG_CHROMA_TABLE, device=device, dtype=dtype),
+    ]).reshape(1, 3, 1, 1, 8, 8)
+    q = torch.clamp(torch.floor(tables * _quality_scale(qualities).reshape(b, 1, 1, 1, 1, 1) + 0.5), min=1.0)
+
+    blocks = dct.T @ (torch.round(coeffs / q) * q) @ dct
+    x = blocks.permute(0, 1, 2, 4, 3, 5).reshape(b, c, hb * 8, wb * 8)
+
+    # YCbCr -> RGB
+    y, cb, cr = x[:, 0] + 128.0, x[:, 1], x[:, 2]
+    r = y + 1.402 * cr
+    g = y - 0.344136 * cb - 0.714136 * cr
+    bl = y + 1.772 * cb
+    x = torch.stack([r, g, bl], dim=1) / 255.0
+
+    return x[:, :, :h, :w]
+
+
+class DeviceDegradation:
+    """
+    批量生成 LR 图像：模糊 -> 双三次下采样 -> 噪声 -> 类 JPEG 压缩 -> 量化到 8 位
+    各项退化按概率逐样本启用，概率全为 0 时等价于 ImageDataset._generate_lr 的双三次下采样
+    """
+
+    def __init__(
+        self,
+        scale: int = 4,
+        blur_prob: float = 0.0,
+        blur_sigma: Sequence[float] = (0.2, 3.0),
+        blur_kernel_size: int = 21,
+        noise_prob: float = 0.0,
+        noise_sigma: Sequence[float] = (1.0, 30.0),
+        jpeg_prob: float = 0.0,
+        jpeg_quality: Sequence[float] = (30.0, 95.0)
+    ):
+        """
+        Args:
+            scale: 放大倍数
+            blur_prob: 高斯模糊概率
+            blur_sigma: 模糊标准差范围（HR 像素）
+            blur_kernel_size: 模糊卷积核大小
+            noise_prob: 高斯噪声概率
+            noise_sigma: 噪声标准差范围（0~255 灰度级）
+            jpeg_prob: 类 JPEG 压缩概率
+            jpeg_quality: JPEG 质量因子范围
+        """
+        self.scale = scale
+        self.blur_prob = blur_prob
+        self.blur_sigma = blur_sigma
+        self.blur_kernel_size = blur_kernel_size | 1
+        self.noise_prob = noise_prob
+        self.noise_sigma = noise_sigma
+        self.jpeg_prob = jpeg_prob
+        self.jpeg_quality = jpeg_quality
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'DeviceDegradation':
+        """从配置文件的 degradation 部分创建"""
+        cfg = config.get('degradation') or {}
+        return cls(
+            scale=config['model']['scale'],
+            blur_prob=cfg.get('blur_prob', 0.0),
+            blur_sigma=cfg.get('blur_sigma', (0.2, 3.0)),
+            blur_kernel_size=cfg.get('blur_kernel_size', 21),
+            noise_prob=cfg.get('noise_prob', 0.0),
+            noise_sigma=cfg.get('noise_sigma', (1.0, 30.0)),
+            jpeg_prob=cfg.get('jpeg_prob', 0.0),
+            jpeg_quality=cfg.get('jpeg_quality', (30.0, 95.0))
+        )
+
+    @staticmethod
+    def _sample(batch_size, prob, value_range, device):
+        """逐样本抽取是否启用以及参数值"""
+        enabled = torch.rand(batch_size, device=device) < prob
+        low, high = value_range
+        values = low + (high - low) * torch.rand(batch_size, device=device)
+        return enabled, values
+
+    def __call__(self, hr_uint8: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Args:
+            hr_uint8: (B, C, H, W) uint8 HR 图像（已在训练设备上）
+
+        Returns:
+            lr: (B, C, H/scale, W/scale) 浮点 LR 图像，取值 [0, 1]
+            hr: (B, C, H, W) 浮点 HR 图像，取值 [0, 1]
+        """
+        hr = hr_uint8.float().div_(255.0)
+        b, device = hr.shape[0], hr.device
+        x = hr
+
+        if self.blur_prob > 0:
+            enabled, sigmas = self._sample(b, self.blur_prob, self.blur_sigma, device)
+            if enabled.any():
+                x = torch.where(enabled[:, None, None, None], gaussian_blur(x, sigmas, self.blur_kernel_size), x)
+
+        x = bicubic_downsample(x, self.scale)
+
+        if self.noise_prob > 0:
+            enabled, sigmas = self._sample(b, self.noise_prob, self.noise_sigma, device)
+            noise = torch.randn_like(x) * (sigmas * enabled / 255.0)[:, None, None, None]
+            x = x + noise
+
+        if self.jpeg_prob > 0 and x.shape[1] == 3:
+            enabled, qualities = self._sample(b, self.jpeg_prob, self.jpeg_quality, device)
+            if enabled.any():
+                x = torch.where(enabled[:, None, None, None], jpeg_like(x.clamp(0, 1), qualities), x)
+
+        # 与保存为 8 位图像后再读取一致
+        lr = torch.round(x.clamp(0, 1) * 255.0) / 255.0
+
+        return lr, hr
@@ -0,0 +1,94 @@
+"""
+知识蒸馏工具
+教师模型输出缓存：对图块库中的每个 LR 子图运行一次教师模型，
+结果以 uint8 存入内存映射文件，训练时与 LR/HR 使用相同的裁剪和增强
+"""
+
+import os
+import json
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+def _teacher_signature(teacher_checkpoint: str, store_meta: dict) -> dict:
+    """缓存有效性标识：教师权重文件和图块库任一变化都需要重建"""
+    stat = os.stat(teacher_checkpoint)
+    return {
+        'teacher_checkpoint': os.path.abspath(teacher_checkpoint),
+        'teacher_size': stat.st_size,
+        'teacher_mtime': stat.st_mtime,
+        'num_patches': store_meta['num_patches'],
+        'patch_size': store_meta['patch_size'],
+        'scale': store_meta['scale'],
+        'source_dir': store_meta['source_dir'],
+    }
+
+
+def build_teacher_cache(
+    teacher: nn.Module,
+    teacher_checkpoint: str,
+    store_dir: str,
+    cache_dir: str,
+    device: torch.device,
+    batch_size: int = 4
+) -> str:
+    """
+    生成（或复用）教师输出缓存
+
+    Args:
+        teacher: 已加载权重的教师模型
+        teacher_checkpoint: 教师权重路径（用于判断缓存是否过期）
+        store_dir: 图块库目录（build_patch_store 的输出）
+        cache_dir: 缓存目录
+        device: 教师模型所在设备
+        batch_size: 每次前向传播的子图数
+
+    Returns:
+        缓存目录（传给 PatchDataset 的 teacher_dir）
+    """
+    with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+        store_meta = json.load(f)
+
+    signature = _teacher_signature(teacher_checkpoint, store_meta)
+    meta_path = os.path.join(cache_dir, 'meta.json')
+
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == signature:
+                print(f"使用已有的教师输出缓存: {cache_dir}")
+                return cache_dir
+        print("教师权重或图块库已变化，重新生成教师输出缓存")
+
+    lr_store = np.load(os.path.join(store_dir, 'lr.npy'), mmap_mode='r')
+    num_patches, patch_size = store_meta['num_patches'], store_meta['patch_size']
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # 先删除旧的标识，生成中断时不会误用不完整的缓存
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    outputs = np.lib.format.open_memmap(
+        os.path.join(cache_dir, 'teacher.npy'), mode='w+', dtype=np.uint8,
+        shape=(num_patches, patch_size, patch_size, 3)
+    )
+
+    print(f"生成教师输出缓存: {num_patches} 个子图")
+    teacher.eval()
+    with torch.no_grad():
+        for start in range(0, num_patches, batch_size):
+            lr = torch.from_numpy(np.ascontiguousarray(lr_store[start:start + batch_size]))
+            lr = lr.permute(0, 3, 1, 2).float().div_(255.0).to(device)
+
+            sr = teacher(lr).clamp_(0, 1).mul_(255.0).round_().byte()
+            outputs[start:start + len(lr)] = sr.permute(0, 2, 3, 1).cpu().numpy()
+
+            done = min(start + batch_size, num_patches)
+            if done % (batch_size * 50) < batch_size or done == num_patches:
+                print(f"  [{done}/{num_patches}]")
+
+    outputs.flush()
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(signature, f, indent=2, ensure_ascii=False)
+
+    return cache_dir
@@ -63,28 +63,38 @@ def save_image(image: Union[np.ndarray, torch.Tensor], save_path: str, mode: str
         raise
 
 
-def image_to_tensor(image: np.ndarray, normalize: bool = True) -> torch.Tensor:
+def image_to_tensor(image: np.ndarray, normalize: bool = True, device=None,
+                    channels_last: bool = False) -> torch.Tensor:
     """
     将图像转换为 PyTorch tensor
     
+    uint8 数据原样拷贝到设备（传输量为 float32 的 1/4），转换维度和归一化都在设备上进行。
+    HWC 数据转为 NCHW 视图后本身就是 channels_last 布局，channels_last=True 时不再复制
+    
     Args:
-        image: numpy 图像数组 (H, W, C), 范围 [0, 255]
+        image: numpy 图像数组 (H, W, C) 或 (B, H, W, C), 范围 [0, 255]
         normalize: 是否归一化到 [0, 1]
+        device: 目标设备（None 为 CPU）
+        channels_last: 是否返回 channels_last 内存布局（否则为连续的 NCHW）
     
     Returns:
-        tensor (1, C, H, W)
+        tensor (1, C, H, W) 或 (B, C, H, W)，float32
     """
-    # 转换为 float32
-    img = image.astype(np.float32)
+    tensor = torch.from_numpy(np.ascontiguousarray(image))
+    if device is not None:
+        tensor = tensor.to(device, non_blocking=True)
     
-    if normalize:
-        img = img / 255.0
+    # 转换维度: (B, H, W, C) -> (B, C, H, W)，只改变步长不复制
+    if tensor.dim() == 3:
+        tensor = tensor.unsqueeze(0)
+    tensor = tensor.permute(0, 3, 1, 2)
     
-    # 转换维度: (H, W, C) -> (C, H, W)
-    img = np.transpose(img, (2, 0, 1))
+    # 转换为 float32 和目标内存布局（一次复制，不与输入数组共享内存）
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
+    tensor = tensor.to(dtype=torch.float32, memory_format=memory_format, copy=True)
     
-    # 转换为 tensor 并添加 batch 维度
-    tensor = torch.from_numpy(img).unsqueeze(0)
+    if normalize:
+        tensor.div_(255.0)
     
     return tensor
 
@@ -93,22 +103,31 @@ def tensor_to_image(tensor: torch.Tensor, denormalize: bool = True) -> np.ndarra
     """
     将 PyTorch tensor 转换为图像
     
+    tensor 在 GPU 上时，先在设备上量化为 uint8 并转为 HWC，只把 uint8 结果拷回主机（传输量为 float32 的 1/4）
+    
     Args:
         tensor: PyTorch tensor (B, C, H, W) 或 (C, H, W)
         denormalize: 是否从 [0, 1] 反归一化到 [0, 255]
     
     Returns:
-        numpy 图像数组 (H, W, C)
+        numpy 图像数组 (H, W, C)；B 大于 1 时为 (B, H, W, C)
     """
-    # 移除 batch 维度（如果有）
-    if tensor.dim() == 4:
+    tensor = tensor.detach()
+    
+    # 移除 batch 维度（如果只有一张）
+    if tensor.dim() == 4 and tensor.shape[0] == 1:
         tensor = tensor.squeeze(0)
     
-    # 转移到 CPU 并转换为 numpy
-    img = tensor.detach().cpu().numpy()
+    if tensor.device.type != 'cpu':
+        if denormalize:
+            tensor = tensor * 255.0
+        
+        # 裁剪、量化（截断小数，与 NumPy astype 一致）并转换维度 (C, H, W) -> (H, W, C)
+        tensor = tensor.clamp(0, 255).to(torch.uint8).movedim(-3, -1).contiguous()
+        return tensor.cpu().numpy()
     
-    # 转换维度: (C, H, W) -> (H, W, C)
-    img = np.transpose(img, (1, 2, 0))
+    # CPU 上 NumPy 的逐元素运算更快；转换维度只改变步长，不复制
+    img = np.moveaxis(tensor.numpy(), -3, -1)
     
     if denormalize:
         img = img * 255.0
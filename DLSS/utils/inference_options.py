@@ -0,0 +1,9 @@
+"""
+推理选项
+推理器和命令行脚本共用，不依赖 torch，解析参数时可以直接导入
+"""
+
+
+PRECISIONS = ('fp32', 'bf16', 'int8')
+BACKENDS = ('torch', 'onnxruntime')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
@@ -0,0 +1,118 @@
+"""
+批量图像质量指标
+PSNR / SSIM 直接在设备上对 (B, C, H, W) tensor 计算，不经过 NumPy
+"""
+
+import torch
+import torch.nn.functional as F
+
+
+def rgb_to_y(images: torch.Tensor) -> torch.Tensor:
+    """
+    RGB 转 YCbCr 的 Y 通道（ITU-R BT.601，与 MATLAB rgb2ycbcr 一致）
+
+    Args:
+        images: (B, 3, H, W)，取值 [0, 255]
+
+    Returns:
+        (B, 1, H, W)，取值 [16, 235]
+    """
+    weights = images.new_tensor([65.481, 128.553, 24.966]).view(1, 3, 1, 1) / 255.0
+    return (images * weights).sum(dim=1, keepdim=True) + 16.0
+
+
+def _prepare(sr: torch.Tensor, hr: torch.Tensor, crop_border: int, y_channel: bool):
+    """统一到 [0, 255] 浮点，SR 量化为整数灰度级（与保存为 uint8 图像后计算一致）"""
+    if sr.dtype == torch.uint8:
+        sr = sr.float()
+    else:
+        sr = (sr.float().clamp(0, 1) * 255.0).round()
+
+    hr = hr.float() if hr.dtype == torch.uint8 else hr.float() * 255.0
+
+    if crop_border > 0:
+        sr = sr[..., crop_border:-crop_border, crop_border:-crop_border]
+        hr = hr[..., crop_border:-crop_border, crop_border:-crop_border]
+
+    if y_channel:
+        sr, hr = rgb_to_y(sr), rgb_to_y(hr)
+
+    return sr, hr
+
+
+def calculate_psnr_batch(
+    sr: torch.Tensor,
+    hr: torch.Tensor,
+    crop_border: int = 0,
+    y_channel: bool = False
+) -> torch.Tensor:
+    """
+    批量计算 PSNR
+
+    Args:
+        sr: 模型输出 (B, C, H, W)，浮点 [0, 1] 或 uint8
+        hr: 参考图像 (B, C, H, W)，浮点 [0, 1] 或 uint8
+        crop_border: 计算前裁掉的边缘像素数（超分评估通常取放大倍数）
+        y_channel: 是否只在 Y 通道上计算
+
+    Returns:
+        每张图像的 PSNR (B,)，完全相同时为 inf
+    """
+    sr, hr = _prepare(sr, hr, crop_border, y_channel)
+    mse = ((sr - hr) ** 2).mean(dim=(1, 2, 3))
+    return 10.0 * torch.log10(255.0 ** 2 / mse)
+
+
+def _gaussian_window(window_size: int, sigma: float, channels: int, device) -> torch.Tensor:
+    """(C, 1, K, 1) 的一维高斯核，分别沿高和宽做可分离卷积"""
+    coords = torch.arange(window_size, dtype=torch.float32, device=device) - window_size // 2
+    kernel = torch.exp(-coords ** 2 / (2 * sigma ** 2))
+    kernel = kernel / kernel.sum()
+    return kernel.view(1, 1, -1, 1).repeat(channels, 1, 1, 1)
+
+
+def calculate_ssim_batch(
+    sr: torch.Tensor,
+    hr: torch.Tensor,
+    crop_border: int = 0,
+    y_channel: bool = False,
+    window_size: int = 11,
+    sigma: float = 1.5
+) -> torch.Tensor:
+    """
+    批量计算 SSIM（11x11 高斯窗口，sigma 1.5，只统计完整窗口内的像素，与 BasicSR 的实现一致）
+
+    Args:
+        sr: 模型输出 (B, C, H, W)，浮点 [0, 1] 或 uint8
+        hr: 参考图像 (B, C, H, W)，浮点 [0, 1] 或 uint8
+        crop_border: 计算前裁掉的边缘像素数
+        y_channel: 是否只在 Y 通道上计算
+        window_size: 高斯窗口大小
+        sigma: 高斯窗口标准差
+
+    Returns:
+        每张图像的 SSIM (B,)（多通道时取通道平均）
+    """
+    sr, hr = _prepare(sr, hr, crop_border, y_channel)
+    channels = sr.shape[1]
+
+    # float64 避免方差 E[x^2] - E[x]^2 的相减误差
+    sr, hr = sr.double(), hr.double()
+    window = _gaussian_window(window_size, sigma, channels, sr.device).double()
+
+    def filter2d(x):
+        x = F.conv2d(x, window, groups=channels)
+        return F.conv2d(x, window.transpose(2, 3), groups=channels)
+
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+
+    mu_sr, mu_hr = filter2d(sr), filter2d(hr)
+    sigma_sr = filter2d(sr * sr) - mu_sr ** 2
+    sigma_hr = filter2d(hr * hr) - mu_hr ** 2
+    sigma_cross = filter2d(sr * hr) - mu_sr * mu_hr
+
+    ssim_map = ((2 * mu_sr * mu_hr + c1) * (2 * sigma_cross + c2)) / (
+        (mu_sr ** 2 + mu_hr ** 2 + c1) * (sigma_sr + sigma_hr + c2)
+    )
+    return ssim_map.mean(dim=(1, 2, 3)).float()
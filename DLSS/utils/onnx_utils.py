@@ -0,0 +1,87 @@
+"""
+ONNX 工具
+导出动态尺寸的 ONNX 模型，以及基于 onnxruntime CPU 的推理封装
+"""
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+def export_onnx(
+    model: nn.Module,
+    output_path: str,
+    in_channels: int = 3,
+    sample_size: int = 64,
+    opset_version: int = 17
+):
+    """
+    导出 ONNX 模型，batch / height / width 均为动态维度
+
+    Args:
+        model: PyTorch 模型
+        output_path: 输出 .onnx 文件路径
+        in_channels: 输入通道数
+        sample_size: 导出时使用的示例输入尺寸
+        opset_version: ONNX opset 版本
+    """
+    model = model.cpu().eval()
+    dummy = torch.rand(1, in_channels, sample_size, sample_size)
+
+    dynamic_axes = {
+        'input': {0: 'batch', 2: 'height', 3: 'width'},
+        'output': {0: 'batch', 2: 'height', 3: 'width'},
+    }
+    kwargs = dict(
+        input_names=['input'],
+        output_names=['output'],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset_version,
+    )
+
+    with torch.no_grad():
+        try:
+            # 新版 PyTorch 默认使用 dynamo 导出器，这里固定使用 TorchScript 导出器
+            torch.onnx.export(model, dummy, output_path, dynamo=False, **kwargs)
+        except TypeError:
+            # PyTorch < 2.5 没有 dynamo 参数
+            torch.onnx.export(model, dummy, output_path, **kwargs)
+
+    print(f"ONNX 模型已导出: {output_path}")
+
+
+class OnnxRuntimeModel:
+    """
+    onnxruntime 推理封装
+    调用方式与 PyTorch 模型相同: output = model(input_tensor)
+    """
+
+    def __init__(self, onnx_path: str, intra_op_threads: int = 0, inter_op_threads: int = 0):
+        """
+        Args:
+            onnx_path: .onnx 文件路径
+            intra_op_threads: 单个算子内部的并行线程数（0 表示 onnxruntime 默认）
+            inter_op_threads: 算子之间的并行线程数（0 表示 onnxruntime 默认）
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("使用 ONNX Runtime 后端需要安装: pip install onnxruntime")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads > 0:
+            options.inter_op_num_threads = inter_op_threads
+
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        inputs = x.detach().cpu().numpy().astype(np.float32, copy=False)
+        output = self.session.run(None, {self.input_name: inputs})[0]
+        return torch.from_numpy(output)
+
+    def eval(self):
+        return self
@@ -0,0 +1,267 @@
+"""
+预处理图块库
+离线把训练图像切成相互重叠的 HR 子图及其双三次下采样 LR 子图，
+存入内存映射的 uint8 数组（.npy），训练时直接按切片读取，无需反复解码整张图像
+"""
+
+import os
+import json
+import random
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import Dataset
+from typing import Tuple
+import cv2
+
+from .image_utils import load_image, resize_image
+from .tiling import tile_starts
+
+
+VALID_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff']
+
+# EXIF 方向为 5~8 时图像需旋转 90°，cv2.imread 解码后宽高互换
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def _list_images(image_dir: str):
+    """递归列出目录中的图像文件"""
+    image_files = []
+    for root, _, files in os.walk(image_dir):
+        for file in files:
+            if os.path.splitext(file)[1].lower() in VALID_EXTENSIONS:
+                image_files.append(os.path.join(root, file))
+    return sorted(image_files)
+
+
+def _image_size(path: str) -> Tuple[int, int]:
+    """只读取文件头获取 (height, width)，与 cv2.imread 一样按 EXIF 方向旋转"""
+    with Image.open(path) as img:
+        width, height = img.size
+        if img.getexif().get(0x0112, 1) in _TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+    return height, width
+
+
+def _upscaled_size(height: int, width: int, patch_size: int) -> Tuple[int, int]:
+    """小于子图的图像先放大（与 ImageDataset._random_crop 相同），返回放大后的 (height, width)"""
+    if height >= patch_size and width >= patch_size:
+        return height, width
+    ratio = max(patch_size / height, patch_size / width)
+    return int(height * ratio) + 1, int(width * ratio) + 1
+
+
+def _patch_positions(height: int, width: int, patch_size: int, stride: int):
+    """放大后尺寸为 (height, width) 的图像上各子图的左上角坐标"""
+    return [(y, x) for y in tile_starts(height, patch_size, stride)
+            for x in tile_starts(width, patch_size, stride)]
+
+
+def build_patch_store(
+    image_dir: str,
+    output_dir: str,
+    scale: int = 4,
+    patch_size: int = 480,
+    stride: int = 240
+) -> int:
+    """
+    生成图块库
+
+    输出目录包含:
+        hr.npy   - (N, patch_size, patch_size, 3) uint8
+        lr.npy   - (N, patch_size/scale, patch_size/scale, 3) uint8
+        meta.json
+
+    Args:
+        image_dir: 高分辨率训练图像目录
+        output_dir: 输出目录
+        scale: 放大倍数
+        patch_size: HR 子图大小（需为 scale 的整数倍）
+        stride: 相邻子图的步长，小于 patch_size 时子图相互重叠
+
+    Returns:
+        子图数量
+    """
+    if patch_size % scale != 0:
+        raise ValueError(f"patch_size ({patch_size}) 必须是 scale ({scale}) 的整数倍")
+
+    image_files = _list_images(image_dir)
+    if not image_files:
+        raise ValueError(f"在 {image_dir} 中未找到图像文件")
+
+    # 先只读取文件头统计子图数量，以便一次性分配内存映射文件
+    sizes = [_image_size(path) for path in image_files]
+    positions = [_patch_positions(*_upscaled_size(h, w, patch_size), patch_size, stride) for h, w in sizes]
+
+    num_patches = sum(len(p) for p in positions)
+    lr_size = patch_size // scale
+    total_bytes = num_patches * 3 * (patch_size ** 2 + lr_size ** 2)
+    print(f"{len(image_files)} 张图像 -> {num_patches} 个子图, 约 {total_bytes / 1024**3:.2f} GB")
+
+    os.makedirs(output_dir, exist_ok=True)
+    hr_store = np.lib.format.open_memmap(
+        os.path.join(output_dir, 'hr.npy'), mode='w+', dtype=np.uint8,
+        shape=(num_patches, patch_size, patch_size, 3)
+    )
+    lr_store = np.lib.format.open_memmap(
+        os.path.join(output_dir, 'lr.npy'), mode='w+', dtype=np.uint8,
+        shape=(num_patches, lr_size, lr_size, 3)
+    )
+
+    index = 0
+    for i, (path, size, expected_positions) in enumerate(zip(image_files, sizes, positions), 1):
+        image = load_image(path, mode='RGB')
+        h, w = image.shape[:2]
+        if (h, w) != size:
+            raise ValueError(f"{path}: 解码尺寸 {w}x{h} 与文件头尺寸 {size[1]}x{size[0]} 不一致")
+
+        target_h, target_w = _upscaled_size(h, w, patch_size)
+        if (target_h, target_w) != (h, w):
+            image = resize_image(image, (target_w, target_h))
+
+        # 按放大后的实际尺寸计算子图位置，必须与预先分配的数量一致
+        image_positions = _patch_positions(*image.shape[:2], patch_size, stride)
+        if image_positions != expected_positions:
+            raise ValueError(f"{path}: 子图位置与预先统计的不一致")
+
+        for y, x in image_positions:
+            hr_patch = image[y:y + patch_size, x:x + patch_size]
+            hr_store[index] = hr_patch
+            lr_store[index] = resize_image(hr_patch, (lr_size, lr_size), cv2.INTER_CUBIC)
+            index += 1
+
+        if i % 50 == 0 or i == len(image_files):
+            print(f"  [{i}/{len(image_files)}] 已写入 {index} 个子图")
+
+    hr_store.flush()
+    lr_store.flush()
+
+    meta = {
+        'num_patches': num_patches,
+        'scale': scale,
+        'patch_size': patch_size,
+        'stride': stride,
+        'source_dir': os.path.abspath(image_dir),
+        'num_images': len(image_files),
+    }
+    with open(os.path.join(output_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+
+    print(f"图块库已保存到: {output_dir}")
+    return num_patches
+
+
+class PatchDataset(Dataset):
+    """
+    图块库数据集
+    从内存映射的子图中随机裁剪 LR/HR 对，输出与 ImageDataset 相同
+    """
+
+    def __init__(
+        self,
+        store_dir: str,
+        scale: int = 4,
+        hr_size: int = 256,
+        augment: bool = True,
+        hr_only: bool = False,
+        teacher_dir: str = None
+    ):
+        """
+        Args:
+            store_dir: build_patch_store 的输出目录
+            scale: 放大倍数（需与图块库一致）
+            hr_size: 高分辨率图像裁剪大小（不超过子图大小）
+            augment: 是否进行数据增强
+            hr_only: 只返回 uint8 HR 裁剪，LR 在训练设备上生成（见 utils.degradation）
+            teacher_dir: 教师输出缓存目录（见 utils.distillation），设置后额外返回教师输出裁剪
+        """
+        with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        if self.meta['scale'] != scale:
+            raise ValueError(f"图块库的放大倍数为 {self.meta['scale']}，与配置 {scale} 不一致")
+        if hr_size > self.meta['patch_size']:
+            raise ValueError(f"hr_size ({hr_size}) 大于图块库子图大小 ({self.meta['patch_size']})")
+
+        self.store_dir = store_dir
+        self.scale = scale
+        self.hr_size = hr_size
+        self.lr_size = hr_size // scale
+        self.augment = augment
+        self.hr_only = hr_only
+        self.teacher_dir = teacher_dir
+
+        # 内存映射在每个数据加载进程中首次访问时打开，避免随 Dataset 一起被序列化
+        self._hr = None
+        self._lr = None
+        self._teacher = None
+
+        print(f"加载了图块库: {self.meta['num_patches']} 个子图（来自 {self.meta['num_images']} 张图像）")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_hr'] = None
+        state['_lr'] = None
+        state['_teacher'] = None
+        return state
+
+    def _open(self):
+        self._hr = np.load(os.path.join(self.store_dir, 'hr.npy'), mmap_mode='r')
+        self._lr = np.load(os.path.join(self.store_dir, 'lr.npy'), mmap_mode='r')
+        if self.teacher_dir:
+            self._teacher = np.load(os.path.join(self.teacher_dir, 'teacher.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return self.meta['num_patches']
+
+    def __getitem__(self, idx: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        获取一对低分辨率和高分辨率图像
+
+        Returns:
+            lr_tensor: 低分辨率图像 tensor (C, H, W)
+            hr_tensor: 高分辨率图像 tensor (C, H, W)
+            （hr_only 时只返回 uint8 HR tensor (C, H, W)；
+             设置 teacher_dir 时额外返回教师输出 tensor (C, H, W)）
+        """
+        if self._hr is None:
+            self._open()
+
+        # 在 LR 网格上随机选择裁剪位置，保证 LR/HR 对齐
+        lr_patch_size = self._lr.shape[1]
+        top = random.randint(0, lr_patch_size - self.lr_size)
+        left = random.randint(0, lr_patch_size - self.lr_size)
+
+        # 内存映射切片只读取裁剪区域对应的页面
+        hr_top, hr_left = top * self.scale, left * self.scale
+        hr_img = self._hr[idx, hr_top:hr_top + self.hr_size, hr_left:hr_left + self.hr_size]
+
+        if self.hr_only:
+            if self.augment:
+                hr_img, = self._augment(hr_img)
+            return torch.from_numpy(np.ascontiguousarray(hr_img.transpose(2, 0, 1)))
+
+        images = [self._lr[idx, top:top + self.lr_size, left:left + self.lr_size], hr_img]
+        if self._teacher is not None:
+            images.append(self._teacher[idx, hr_top:hr_top + self.hr_size, hr_left:hr_left + self.hr_size])
+
+        if self.augment:
+            images = self._augment(*images)
+
+        return tuple(
+            torch.from_numpy(np.ascontiguousarray(image.transpose(2, 0, 1))).float().div_(255.0)
+            for image in images
+        )
+
+    def _augment(self, *images: np.ndarray):
+        """数据增强：LR/HR（以及教师输出）同步随机翻转和旋转"""
+        if random.random() > 0.5:
+            images = [np.fliplr(image) for image in images]
+
+        if random.random() > 0.5:
+            images = [np.flipud(image) for image in images]
+
+        if random.random() > 0.5:
+            images = [np.rot90(image) for image in images]
+
+        return tuple(images)
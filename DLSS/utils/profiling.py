@@ -0,0 +1,133 @@
+"""
+训练性能分析工具
+每步用时按阶段拆分（数据等待 / 拷贝到设备 / 前向 / 反向 / 优化器），以及 torch.profiler 追踪窗口
+"""
+
+import os
+import time
+import torch
+from typing import Dict, Optional
+
+
+class StepTimer:
+    """
+    训练步分阶段计时
+
+    每个阶段结束时调用 mark(阶段名)，记录与上一次 mark 的时间差。
+    CUDA 上计算是异步的，mark 前会同步设备，使时间归属到正确的阶段
+    （会略微降低 CPU/GPU 的并行度，可在配置中关闭）
+    """
+
+    PHASES = ('data', 'h2d', 'forward', 'backward', 'optimizer')
+
+    def __init__(self, device: torch.device, synchronize: bool = True):
+        """
+        Args:
+            device: 训练设备
+            synchronize: CUDA 上每个阶段结束时是否同步设备
+        """
+        self.synchronize = synchronize and device.type == 'cuda'
+        self.device = device
+        self.step_times = {}
+        self.totals = {phase: 0.0 for phase in self.PHASES}
+        self.num_steps = 0
+        self.num_samples = 0
+        self._last = time.perf_counter()
+
+    def reset(self):
+        """开始新的 epoch"""
+        self.totals = {phase: 0.0 for phase in self.PHASES}
+        self.num_steps = 0
+        self.num_samples = 0
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str):
+        """结束一个阶段"""
+        if self.synchronize:
+            torch.cuda.synchronize(self.device)
+        now = time.perf_counter()
+        self.step_times[phase] = now - self._last
+        self._last = now
+
+    def skip(self):
+        """丢弃上一次 mark 之后的时间（例如日志记录），不计入任何阶段"""
+        self._last = time.perf_counter()
+
+    def end_step(self, num_samples: int) -> Dict[str, float]:
+        """
+        结束一步并累计到 epoch 统计
+
+        Args:
+            num_samples: 本步处理的样本数（分布式训练时为所有进程之和）
+
+        Returns:
+            本步各阶段用时（秒），含 'total'
+        """
+        step_times = {phase: self.step_times.get(phase, 0.0) for phase in self.PHASES}
+        step_times['total'] = sum(step_times.values())
+
+        for phase in self.PHASES:
+            self.totals[phase] += step_times[phase]
+        self.num_steps += 1
+        self.num_samples += num_samples
+        self.step_times = {}
+
+        return step_times
+
+    def summary(self) -> Dict[str, float]:
+        """
+        当前 epoch 的统计
+
+        Returns:
+            各阶段平均用时（秒）、'total'、'data_fraction'（数据等待占比）和 'samples_per_sec'
+        """
+        steps = max(1, self.num_steps)
+        result = {phase: self.totals[phase] / steps for phase in self.PHASES}
+
+        total = sum(self.totals.values())
+        result['total'] = total / steps
+        result['data_fraction'] = self.totals['data'] / total if total > 0 else 0.0
+        result['samples_per_sec'] = self.num_samples / total if total > 0 else 0.0
+
+        return result
+
+
+def create_profiler(
+    output_dir: str,
+    active_steps: int,
+    wait_steps: int = 5,
+    warmup_steps: int = 1,
+    device: Optional[torch.device] = None
+):
+    """
+    创建只在一个窗口内记录的 torch.profiler
+
+    跳过前 wait_steps 步（数据加载进程启动、cudnn 选择算法等），预热 warmup_steps 步后
+    记录 active_steps 步，结果写入 output_dir，可用 TensorBoard（torch-tb-profiler 插件）
+    或 chrome://tracing / Perfetto 打开
+
+    Args:
+        output_dir: 追踪文件目录
+        active_steps: 记录的步数
+        wait_steps: 开始前跳过的步数
+        warmup_steps: 预热步数（不记录）
+        device: 训练设备（CUDA 时同时记录 GPU 活动）
+
+    Returns:
+        torch.profiler.profile（需要 start()/stop()，每步调用 step()）
+    """
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if device is not None and device.type == 'cuda':
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    return torch.profiler.profile(
+        activities=activities,
+        schedule=torch.profiler.schedule(
+            wait=wait_steps, warmup=warmup_steps, active=active_steps, repeat=1
+        ),
+        on_trace_ready=torch.profiler.tensorboard_trace_handler(output_dir),
+        record_shapes=True,
+        profile_memory=True
+    )
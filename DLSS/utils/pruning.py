@@ -0,0 +1,204 @@
+"""
+ESRGAN 结构化通道剪枝
+在校准集上用一阶泰勒展开 |激活 × 梯度| 估计每个通道的重要性，
+再按重要性保留通道，把权重切片复制到更窄的稠密 ESRGAN（只改变 num_features / num_grow_channels）
+"""
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from typing import Dict, List
+
+from models import ESRGAN
+from models.esrgan import ResidualDenseBlock
+
+
+def count_conv_flops(model: nn.Module, input_shape) -> int:
+    """
+    统计卷积层的浮点运算次数（乘加按 2 次计）
+
+    Args:
+        model: 模型
+        input_shape: 输入尺寸 (B, C, H, W)
+
+    Returns:
+        FLOPs
+    """
+    flops = [0]
+
+    def hook(module, inputs, output):
+        kernel_ops = module.in_channels // module.groups * module.kernel_size[0] * module.kernel_size[1]
+        flops[0] += 2 * output.numel() * kernel_ops
+
+    handles = [m.register_forward_hook(hook) for m in model.modules() if isinstance(m, nn.Conv2d)]
+    try:
+        param = next(model.parameters())
+        with torch.no_grad():
+            model(torch.zeros(input_shape, device=param.device, dtype=param.dtype))
+    finally:
+        for handle in handles:
+            handle.remove()
+
+    return flops[0]
+
+
+def compute_channel_importance(
+    model: ESRGAN,
+    lr_batches: List[torch.Tensor],
+    hr_batches: List[torch.Tensor]
+) -> Dict[str, torch.Tensor]:
+    """
+    在校准集上估计各通道空间的通道重要性
+
+    通道空间:
+        'trunk': 主干特征（conv_first、所有 RRDB 残差和 conv_body 共享同一组通道）
+        '<rdb>.convK': 每个密集块第 K 个卷积的增长通道（K = 1..4）
+        'upsampler.N': 每级 PixelShuffle 之后的特征
+        'conv_hr': 重建卷积的输出
+
+    Args:
+        model: ESRGAN 模型
+        lr_batches: LR 输入列表
+        hr_batches: 对应的 HR 目标列表
+
+    Returns:
+        {通道空间: 每通道重要性 (C,)}
+    """
+    generator = model.generator
+    importance = {}
+    handles = []
+
+    def watch(key, tensor):
+        def accumulate(grad):
+            # 泰勒展开: 去掉该通道时损失变化约为 |sum_hw(a * g)|，按样本取绝对值后累加
+            score = (tensor.detach() * grad).float().sum(dim=(2, 3)).abs().sum(0)
+            importance[key] = importance.get(key, 0) + score.cpu()
+        tensor.register_hook(accumulate)
+
+    def output_hook(key):
+        return lambda module, inputs, output: watch(key, output)
+
+    # conv_first 的输出、每个 RRDB 的输出和上采样层的输入都属于主干通道
+    handles.append(generator.conv_first.register_forward_hook(output_hook('trunk')))
+    for block in generator.rrdb_blocks:
+        handles.append(block.register_forward_hook(output_hook('trunk')))
+    handles.append(generator.upsampler.register_forward_pre_hook(
+        lambda module, inputs: watch('trunk', inputs[0])
+    ))
+
+    for name, module in generator.named_modules():
+        if isinstance(module, ResidualDenseBlock):
+            for k in range(1, 5):
+                conv = getattr(module, f'conv{k}')
+                handles.append(conv.register_forward_hook(output_hook(f'{name}.conv{k}')))
+        elif isinstance(module, nn.PixelShuffle):
+            handles.append(module.register_forward_hook(output_hook(name)))
+    handles.append(generator.conv_hr.register_forward_hook(output_hook('conv_hr')))
+
+    # 原地 LeakyReLU 会改写被记录的激活，统计期间临时关闭
+    inplace_modules = [m for m in model.modules() if isinstance(m, nn.LeakyReLU) and m.inplace]
+    for m in inplace_modules:
+        m.inplace = False
+
+    was_training = model.training
+    model.eval()
+
+    try:
+        for lr, hr in zip(lr_batches, hr_batches):
+            model.zero_grad(set_to_none=True)
+            loss = F.l1_loss(model(lr), hr)
+            loss.backward()
+    finally:
+        for handle in handles:
+            handle.remove()
+        for m in inplace_modules:
+            m.inplace = True
+        model.zero_grad(set_to_none=True)
+        model.train(was_training)
+
+    return importance
+
+
+def _select(score: torch.Tensor, num_keep: int) -> torch.Tensor:
+    """保留最重要的 num_keep 个通道（按原顺序）"""
+    if num_keep > score.numel():
+        raise ValueError(f"保留通道数 {num_keep} 超过原通道数 {score.numel()}")
+    return torch.topk(score, num_keep).indices.sort().values
+
+
+def _copy_conv(dst: nn.Conv2d, src: nn.Conv2d, out_idx: torch.Tensor, in_idx: torch.Tensor):
+    """按输出/输入通道索引复制卷积权重"""
+    out_idx = out_idx.to(src.weight.device)
+    in_idx = in_idx.to(src.weight.device)
+    dst.weight.data.copy_(src.weight.data[out_idx][:, in_idx])
+    dst.bias.data.copy_(src.bias.data[out_idx])
+
+
+def prune_esrgan(
+    model: ESRGAN,
+    importance: Dict[str, torch.Tensor],
+    num_features: int,
+    num_grow_channels: int
+) -> ESRGAN:
+    """
+    按通道重要性物理删除通道，生成更窄的稠密 ESRGAN
+
+    Args:
+        model: 原模型（不会被修改）
+        importance: compute_channel_importance 的结果
+        num_features: 剪枝后的特征通道数（主干、上采样和重建层）
+        num_grow_channels: 剪枝后的密集块增长通道数
+
+    Returns:
+        剪枝后的模型（与原模型在同一设备上）
+    """
+    src = model.generator
+    nf = src.conv_first.out_channels
+    gc = src.rrdb_blocks[0].rdb1.conv1.out_channels
+
+    pruned = ESRGAN(
+        in_channels=src.conv_first.in_channels,
+        out_channels=src.conv_last.out_channels,
+        num_features=num_features,
+        num_blocks=len(src.rrdb_blocks),
+        num_grow_channels=num_grow_channels,
+        scale=src.scale
+    ).to(src.conv_first.weight.device)
+    dst = pruned.generator
+
+    all_in = torch.arange(src.conv_first.in_channels)
+    all_out = torch.arange(src.conv_last.out_channels)
+
+    trunk = _select(importance['trunk'], num_features)
+    _copy_conv(dst.conv_first, src.conv_first, trunk, all_in)
+
+    # 密集块: 第 K 个卷积的输入是 [主干, x1, ..., x(K-1)] 的拼接，按拼接偏移映射保留的增长通道
+    for name, src_rdb in src.named_modules():
+        if not isinstance(src_rdb, ResidualDenseBlock):
+            continue
+        dst_rdb = dst.get_submodule(name)
+
+        in_idx = trunk
+        for k in range(1, 5):
+            grow = _select(importance[f'{name}.conv{k}'], num_grow_channels)
+            _copy_conv(getattr(dst_rdb, f'conv{k}'), getattr(src_rdb, f'conv{k}'), grow, in_idx)
+            in_idx = torch.cat([in_idx, grow + nf + (k - 1) * gc])
+        _copy_conv(dst_rdb.conv5, src_rdb.conv5, trunk, in_idx)
+
+    _copy_conv(dst.conv_body, src.conv_body, trunk, trunk)
+
+    # 上采样: PixelShuffle(2) 的输出通道 c 来自卷积输出通道 4c..4c+3
+    prev = trunk
+    for i, layer in enumerate(src.upsampler):
+        if not isinstance(layer, nn.Conv2d):
+            continue
+        keep = _select(importance[f'upsampler.{i + 1}'], num_features)
+        out_idx = (keep[:, None] * 4 + torch.arange(4)).flatten()
+        _copy_conv(dst.upsampler[i], layer, out_idx, prev)
+        prev = keep
+
+    hr = _select(importance['conv_hr'], num_features)
+    _copy_conv(dst.conv_hr, src.conv_hr, hr, prev)
+    _copy_conv(dst.conv_last, src.conv_last, all_out, hr)
+
+    return pruned
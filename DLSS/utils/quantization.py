@@ -0,0 +1,114 @@
+"""
+推理精度工具
+bf16 自动混合精度检测，以及卷积网络的训练后静态 int8 量化
+"""
+
+import os
+import copy
+import torch
+import torch.nn as nn
+from typing import List
+
+from .image_utils import load_image, image_to_tensor
+
+
+def bf16_supported(device: torch.device) -> bool:
+    """
+    检查设备是否能高效运行 bf16
+
+    Args:
+        device: 计算设备
+
+    Returns:
+        是否支持
+    """
+    if device.type == 'cuda':
+        return torch.cuda.is_bf16_supported()
+
+    # CPU 需要 AVX512-BF16 / AMX 等指令集，否则 bf16 反而比 fp32 慢
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def load_calibration_batches(
+    image_dir: str,
+    num_images: int = 8,
+    patch_size: int = 64
+) -> List[torch.Tensor]:
+    """
+    从目录中读取校准图像，取中心区域作为校准输入
+
+    Args:
+        image_dir: 图像目录
+        num_images: 最多使用的图像数
+        patch_size: 中心裁剪大小（LR 像素）
+
+    Returns:
+        tensor 列表，每个为 (1, C, H, W)
+    """
+    valid_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff']
+    batches = []
+
+    if not os.path.isdir(image_dir):
+        return batches
+
+    for file in sorted(os.listdir(image_dir)):
+        if os.path.splitext(file)[1].lower() not in valid_extensions:
+            continue
+
+        image = load_image(os.path.join(image_dir, file), mode='RGB')
+        h, w = image.shape[:2]
+        top = max(0, (h - patch_size) // 2)
+        left = max(0, (w - patch_size) // 2)
+        patch = image[top:top + patch_size, left:left + patch_size]
+
+        batches.append(image_to_tensor(patch, normalize=True))
+        if len(batches) >= num_images:
+            break
+
+    return batches
+
+
+def quantize_int8(model: nn.Module, calibration_batches: List[torch.Tensor]) -> nn.Module:
+    """
+    训练后静态 int8 量化（FX 图模式）
+    卷积、LeakyReLU、拼接和残差相加都转换为量化算子，量化参数由校准数据统计
+
+    Args:
+        model: fp32 模型（不会被修改）
+        calibration_batches: 校准输入列表
+
+    Returns:
+        量化后的模型（仅支持 CPU）
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    if not calibration_batches:
+        raise ValueError("int8 量化需要至少一个校准输入")
+
+    engines = torch.backends.quantized.supported_engines
+    backend = 'x86' if 'x86' in engines else ('fbgemm' if 'fbgemm' in engines else 'qnnpack')
+    torch.backends.quantized.engine = backend
+
+    model = copy.deepcopy(model).cpu().eval()
+
+    # 量化版 LeakyReLU 不支持 inplace
+    for module in model.modules():
+        if isinstance(module, nn.LeakyReLU):
+            module.inplace = False
+
+    prepared = prepare_fx(
+        model,
+        get_default_qconfig_mapping(backend),
+        example_inputs=(calibration_batches[0],)
+    )
+
+    # 校准：统计各层激活的取值范围
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)
+
+    return convert_fx(prepared)
@@ -0,0 +1,257 @@
+"""
+推理服务的动态批处理
+并发请求进入有界队列，后台线程在很短的等待窗口内把尺寸相近的图像合并为一个批次，
+并统计队列深度、批次大小和请求延迟
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from .image_utils import image_to_tensor, tensor_to_image
+
+
+class ServingMetrics:
+    """推理服务统计（线程安全），延迟分位数基于最近 window 个请求"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.rejected = 0
+        self.failed = 0
+        self.batches = 0
+        self.images = 0
+        self.infer_time = 0.0
+        self.start_time = time.time()
+
+    def record_batch(self, batch_size: int, infer_time: float):
+        with self._lock:
+            self.batches += 1
+            self.images += batch_size
+            self.infer_time += infer_time
+            self.batch_sizes.append(batch_size)
+
+    def record_request(self, latency: float, ok: bool = True):
+        with self._lock:
+            self.requests += 1
+            if ok:
+                self.latencies.append(latency)
+            else:
+                self.failed += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self, queue_depth: int = 0) -> Dict:
+        """
+        Returns:
+            统计字典；延迟单位为毫秒
+        """
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            batch_sizes = list(self.batch_sizes)
+            result = {
+                'uptime_sec': round(time.time() - self.start_time, 1),
+                'queue_depth': queue_depth,
+                'requests': self.requests,
+                'rejected': self.rejected,
+                'failed': self.failed,
+                'batches': self.batches,
+                'images': self.images,
+                'avg_batch_size': round(self.images / self.batches, 2) if self.batches else 0.0,
+                'recent_avg_batch_size': round(sum(batch_sizes) / len(batch_sizes), 2) if batch_sizes else 0.0,
+                'infer_time_sec': round(self.infer_time, 3)
+            }
+
+        for q in (50, 90, 99):
+            result[f'latency_p{q}_ms'] = round(float(np.percentile(latencies, q)), 2) if len(latencies) else 0.0
+
+        return result
+
+
+class _Request:
+    """一个待处理的图像请求"""
+
+    __slots__ = ('image', 'key', 'arrival', 'future')
+
+    def __init__(self, image: np.ndarray, key):
+        self.image = image
+        self.key = key
+        self.arrival = time.perf_counter()
+        self.future = Future()
+
+
+class DynamicBatcher:
+    """
+    动态批处理器
+
+    - submit() 把图像放入有界队列，返回 Future（结果为超分后的 uint8 图像）；队列满时抛出 queue.Full
+    - 后台线程取出最早到达的请求所在的尺寸分组，最多等待 max_wait 秒凑满 max_batch_size 张后一起推理
+    - 尺寸按 size_bucket 向上取整分组，同组图像用边缘复制填充到相同尺寸，输出再裁回原尺寸
+      （填充只影响靠近右/下边缘的少量像素；size_bucket 为 0 时只合并尺寸完全相同的图像，输出逐位不变）
+    - 大于 tile_size 的图像走分块推理，不参与合并也不等待
+    """
+
+    def __init__(
+        self,
+        forward_fn: Callable[[torch.Tensor], torch.Tensor],
+        scale: int,
+        device: torch.device,
+        max_batch_size: int = 4,
+        max_wait: float = 0.01,
+        size_bucket: int = 32,
+        tile_size: int = 0,
+        max_queue: int = 64,
+        metrics: ServingMetrics = None
+    ):
+        """
+        Args:
+            forward_fn: 前向函数，输入 (B, C, H, W) [0, 1] tensor，返回 (B, C, H*scale, W*scale)
+            scale: 放大倍数
+            device: 推理设备
+            max_batch_size: 每批最多图像数
+            max_wait: 最早到达的请求最多等待的时间（秒）
+            size_bucket: 尺寸分组的粒度（LR 像素），0 表示只合并相同尺寸
+            tile_size: 超过此尺寸的图像单独推理（forward_fn 负责分块），0 表示不限制
+            max_queue: 等待队列长度上限
+            metrics: 统计对象（None 时新建）
+        """
+        self.forward_fn = forward_fn
+        self.scale = scale
+        self.device = device
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.size_bucket = size_bucket
+        self.tile_size = tile_size
+        self.metrics = metrics or ServingMetrics()
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = {}  # 分组键 -> 按到达顺序的请求列表
+        self._num_pending = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='dynamic-batcher', daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """等待中的请求数（队列中和已分组未推理的）"""
+        return self._queue.qsize() + self._num_pending
+
+    def _group_key(self, height: int, width: int):
+        """分组键: 需要分块的大图单独成组，其余按 size_bucket 向上取整"""
+        if self.tile_size and max(height, width) > self.tile_size:
+            return ('tiled', height, width)
+        if self.size_bucket:
+            bucket = self.size_bucket
+            return (-(-height // bucket) * bucket, -(-width // bucket) * bucket)
+        return (height, width)
+
+    def submit(self, image: np.ndarray) -> Future:
+        """
+        提交一张 RGB uint8 图像 (H, W, C)
+
+        Returns:
+            Future，结果为超分后的 uint8 图像
+        """
+        request = _Request(image, self._group_key(*image.shape[:2]))
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            self.metrics.record_rejected()
+            raise
+
+        request.future.add_done_callback(
+            lambda f: self.metrics.record_request(time.perf_counter() - request.arrival, f.exception() is None)
+        )
+        return request.future
+
+    def close(self):
+        """处理完已提交的请求后停止后台线程"""
+        self._stop.set()
+        self._thread.join()
+
+    def _add(self, request: _Request):
+        self._pending.setdefault(request.key, []).append(request)
+        self._num_pending += 1
+
+    def _run(self):
+        while True:
+            if not self._pending:
+                try:
+                    self._add(self._queue.get(timeout=0.1))
+                except queue.Empty:
+                    if self._stop.is_set():
+                        return
+                    continue
+
+            # 上一批推理期间到达的请求（不等待）
+            while True:
+                try:
+                    self._add(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # 最早到达的请求所在的分组优先
+            key = min(self._pending, key=lambda k: self._pending[k][0].arrival)
+            group = self._pending[key]
+            deadline = group[0].arrival + self.max_wait
+
+            # 在等待窗口内收集请求（其他尺寸的请求进入各自的分组）
+            while len(group) < self.max_batch_size and key[0] != 'tiled':
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    self._add(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            batch = group[:self.max_batch_size]
+            del group[:len(batch)]
+            if not group:
+                del self._pending[key]
+            self._num_pending -= len(batch)
+
+            self._execute(key, batch)
+
+    def _execute(self, key, batch: List[_Request]):
+        """推理一个批次并设置各请求的结果"""
+        try:
+            if key[0] == 'tiled':
+                height, width = key[1:]
+            else:
+                height, width = key
+
+            tensors = []
+            for request in batch:
+                tensor = image_to_tensor(request.image, normalize=True, device=self.device)
+                pad_h, pad_w = height - tensor.shape[2], width - tensor.shape[3]
+                if pad_h or pad_w:
+                    tensor = F.pad(tensor, (0, pad_w, 0, pad_h), mode='replicate')
+                tensors.append(tensor)
+            lr_tensor = torch.cat(tensors)
+
+            start = time.perf_counter()
+            sr_tensor = self.forward_fn(lr_tensor)
+            if self.device.type == 'cuda':
+                torch.cuda.synchronize(self.device)
+            self.metrics.record_batch(len(batch), time.perf_counter() - start)
+
+            # 在设备上裁剪、量化，每张图像只拷回 uint8 结果
+            for request, sr in zip(batch, sr_tensor):
+                h, w = request.image.shape[:2]
+                request.future.set_result(tensor_to_image(sr[:, :h * self.scale, :w * self.scale]))
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
@@ -0,0 +1,131 @@
+"""
+分块推理工具
+将大图切分为相互重叠的图块，批量送入模型，再用羽化权重融合，
+峰值显存/内存只与图块大小和批次大小有关
+"""
+
+import torch
+from typing import List, Tuple
+
+
+def tile_starts(length: int, window: int, stride: int) -> List[int]:
+    """
+    计算一个维度上各图块的起始位置
+    最后一个图块贴齐图像边缘，因此所有图块尺寸相同
+
+    Args:
+        length: 图像在该维度上的长度
+        window: 图块（含重叠边距）长度
+        stride: 相邻图块的步长
+
+    Returns:
+        起始位置列表
+    """
+    if length <= window:
+        return [0]
+
+    starts = list(range(0, length - window, stride))
+    starts.append(length - window)
+    return starts
+
+
+def feather_mask(
+    height: int,
+    width: int,
+    ramp: int,
+    borders: Tuple[bool, bool, bool, bool],
+    device=None
+) -> torch.Tensor:
+    """
+    生成羽化权重 (1, 1, H, W)
+    与相邻图块重叠的边缘从接近 0 线性过渡到 1，图像外边界一侧保持为 1
+
+    Args:
+        height, width: 权重尺寸（输出像素）
+        ramp: 过渡带宽度（输出像素）
+        borders: (上, 下, 左, 右) 是否位于图像边界
+
+    Returns:
+        权重 tensor
+    """
+    top, bottom, left, right = borders
+
+    def ramp_1d(length, at_start, at_end):
+        weights = torch.ones(length, device=device)
+        if ramp > 0:
+            edge = torch.clamp((torch.arange(length, device=device) + 1.0) / (ramp + 1.0), max=1.0)
+            if not at_start:
+                weights = torch.minimum(weights, edge)
+            if not at_end:
+                weights = torch.minimum(weights, edge.flip(0))
+        return weights
+
+    wy = ramp_1d(height, top, bottom)
+    wx = ramp_1d(width, left, right)
+
+    return (wy[:, None] * wx[None, :])[None, None]
+
+
+def tiled_forward(
+    model: torch.nn.Module,
+    lr_tensor: torch.Tensor,
+    scale: int,
+    tile_size: int,
+    tile_pad: int = 16,
+    batch_size: int = 4
+) -> torch.Tensor:
+    """
+    分块推理
+
+    Args:
+        model: 超分辨率模型
+        lr_tensor: 低分辨率输入 (1, C, H, W)
+        scale: 放大倍数
+        tile_size: 图块步长（LR 像素），每个图块实际大小为 tile_size + 2 * tile_pad
+        tile_pad: 相邻图块的重叠边距（LR 像素）
+        batch_size: 每次前向传播合并的图块数
+
+    Returns:
+        超分辨率输出 (1, C, H*scale, W*scale)
+    """
+    _, _, h, w = lr_tensor.shape
+
+    win_h = min(tile_size + 2 * tile_pad, h)
+    win_w = min(tile_size + 2 * tile_pad, w)
+
+    ys = tile_starts(h, win_h, tile_size)
+    xs = tile_starts(w, win_w, tile_size)
+    windows = [(y, x) for y in ys for x in xs]
+
+    ramp = 2 * tile_pad * scale
+    masks = {}
+
+    output = None
+    weight = None
+
+    with torch.no_grad():
+        for i in range(0, len(windows), batch_size):
+            chunk = windows[i:i + batch_size]
+
+            # 所有图块尺寸相同，可以合并成一个批次
+            batch = torch.cat([lr_tensor[:, :, y:y + win_h, x:x + win_w] for y, x in chunk], dim=0)
+            batch_out = model(batch)
+
+            if output is None:
+                out_channels = batch_out.shape[1]
+                output = batch_out.new_zeros((1, out_channels, h * scale, w * scale))
+                weight = batch_out.new_zeros((1, 1, h * scale, w * scale))
+
+            for (y, x), tile_out in zip(chunk, batch_out):
+                borders = (y == 0, y + win_h == h, x == 0, x + win_w == w)
+                if borders not in masks:
+                    masks[borders] = feather_mask(
+                        win_h * scale, win_w * scale, ramp, borders, device=batch_out.device
+                    ).to(batch_out.dtype)
+                mask = masks[borders]
+
+                oy, ox = y * scale, x * scale
+                output[:, :, oy:oy + win_h * scale, ox:ox + win_w * scale] += tile_out.unsqueeze(0) * mask
+                weight[:, :, oy:oy + win_h * scale, ox:ox + win_w * scale] += mask
+
+    return output / weight
@@ -7,6 +7,7 @@
 from src.vector3 import Vector3
 from src.camera import Camera
 from src.renderer import Renderer
+from src.render_cache import RenderCache
 from scenes.demo_scene import create_demo_scene, create_simple_scene, create_metal_scene
 
 
@@ -21,6 +22,14 @@ def main():
     # 渲染参数
     samples_per_pixel = 100  # 每像素采样数（越大质量越好，但速度越慢）
     max_depth = 50           # 最大递归深度
+    backend = "python"       # 渲染后端: "python" 或 "numba"（需要 pip install numba）
+    
+    # 缓存参数（反复渲染相同场景时复用结果；只增大采样数时只补渲染差额样本）
+    cache_dir = None         # 设置为 "cache" 启用渲染结果缓存
+    seed = 0                 # 随机种子（参与缓存键）
+    
+    # 分块输出（超大分辨率时使用：图块直接写入内存映射文件，内存占用与分辨率无关）
+    tile_size = None         # 设置为 64 等值启用分块输出
     
     # 创建相机
     camera = Camera(
@@ -40,17 +49,28 @@ def main():
     # 创建渲染器
     renderer = Renderer(
         max_depth=max_depth,
-        samples_per_pixel=samples_per_pixel
+        samples_per_pixel=samples_per_pixel,
+        backend=backend
     )
     
     # 渲染场景
     print("\n" + "="*50)
-    pixels = renderer.render(scene, camera, image_width, image_height)
-    
-    # 保存图像
     output_path = "output/render.png"
-    print("\n保存图像...")
-    renderer.save_image(pixels, output_path)
+    
+    if tile_size:
+        renderer.render_to_file(scene, camera, image_width, image_height, output_path, tile_size=tile_size)
+    elif cache_dir:
+        cache = RenderCache(cache_dir)
+        image = cache.render(renderer, scene, camera, image_width, image_height, seed=seed)
+        
+        print("\n保存图像...")
+        renderer.save_image_array(image, output_path)
+    else:
+        pixels = renderer.render(scene, camera, image_width, image_height)
+        
+        # 保存图像
+        print("\n保存图像...")
+        renderer.save_image(pixels, output_path)
     
     print("\n" + "="*50)
     print("渲染完成！")
@@ -0,0 +1,212 @@
+"""
+交互式渐进预览 - 边渲染边查看结果
+
+使用方法:
+    # 每渲染完一遍就刷新 output/preview.png
+    python preview.py --scene demo --passes 50
+
+    # 启动本地网页预览 (http://127.0.0.1:8000)，可在网页中移动相机
+    python preview.py --scene demo --serve --port 8000
+"""
+import argparse
+import io
+import json
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from src.vector3 import Vector3
+from src.camera import Camera
+from src.renderer import Renderer
+from src.progressive import ProgressiveRenderer
+from src.serialization import camera_to_dict, camera_from_dict
+from scenes.demo_scene import SCENES
+
+
+PREVIEW_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>PathTracing 预览</title>
+<style>
+  body { font-family: sans-serif; background: #222; color: #ddd; }
+  img { image-rendering: pixelated; width: 800px; border: 1px solid #555; }
+  button { margin: 2px; }
+</style>
+</head>
+<body>
+<div><img id="preview" src="/preview.png"></div>
+<div id="status"></div>
+<div>
+  <button onclick="move(-0.2, 0, 0)">← 左</button>
+  <button onclick="move(0.2, 0, 0)">右 →</button>
+  <button onclick="move(0, 0.2, 0)">↑ 上</button>
+  <button onclick="move(0, -0.2, 0)">↓ 下</button>
+  <button onclick="move(0, 0, -0.2)">拉近</button>
+  <button onclick="move(0, 0, 0.2)">拉远</button>
+</div>
+<script>
+let passes = -1, generation = -1;
+async function refresh() {
+  const status = await (await fetch('/status')).json();
+  document.getElementById('status').textContent =
+    `遍数: ${status.passes}  采样数: ${status.samples}`;
+  if (status.passes !== passes || status.generation !== generation) {
+    passes = status.passes; generation = status.generation;
+    document.getElementById('preview').src = '/preview.png?t=' + Date.now();
+  }
+}
+async function move(dx, dy, dz) {
+  const camera = await (await fetch('/camera')).json();
+  camera.look_from[0] += dx; camera.look_from[1] += dy; camera.look_from[2] += dz;
+  await fetch('/camera', {method: 'POST', body: JSON.stringify(camera)});
+}
+setInterval(refresh, 500);
+</script>
+</body>
+</html>
+"""
+
+
+def encode_png(image):
+    """将线性浮点图像编码为 PNG 字节"""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(Renderer.to_rgb8(image)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def make_handler(progressive):
+    """创建绑定到渐进式渲染器的 HTTP 请求处理类"""
+
+    class PreviewHandler(BaseHTTPRequestHandler):
+        """预览网页、当前图像、状态和相机接口"""
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/':
+                self._send(200, 'text/html; charset=utf-8', PREVIEW_PAGE.encode('utf-8'))
+            elif path == '/preview.png':
+                image, _, _ = progressive.snapshot()
+                self._send(200, 'image/png', encode_png(image))
+            elif path == '/status':
+                _, passes, generation = progressive.snapshot()
+                status = {
+                    'passes': passes,
+                    'samples': passes * progressive.renderer.samples_per_pixel,
+                    'generation': generation,
+                }
+                self._send(200, 'application/json', json.dumps(status).encode('utf-8'))
+            elif path == '/camera':
+                self._send(200, 'application/json', json.dumps(camera_to_dict(progressive.camera)).encode('utf-8'))
+            else:
+                self._send(404, 'text/plain', b'not found')
+
+        def do_POST(self):
+            if self.path != '/camera':
+                self._send(404, 'text/plain', b'not found')
+                return
+
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                camera = camera_from_dict(json.loads(self.rfile.read(length)))
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(400, 'text/plain', str(e).encode('utf-8'))
+                return
+
+            progressive.set_camera(camera)
+            self._send(200, 'application/json', b'{}')
+
+        def _send(self, status, content_type, body):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # 预览页面每 0.5 秒轮询一次，不打印访问日志
+            pass
+
+    return PreviewHandler
+
+
+def run_file_preview(progressive, output_path, interval=0.5):
+    """
+    显示循环：每有新的一遍结果就刷新预览文件，直到达到最大遍数（未设置时一直运行）
+
+    Args:
+        interval: float - 两次写文件之间的最短间隔（秒），避免编码拖慢采样
+    """
+    seen_passes, seen_generation = 0, 0
+    start_time = time.time()
+
+    while True:
+        progressive.wait_for_pass(seen_passes, seen_generation, timeout=1.0)
+        image, passes, generation = progressive.snapshot()
+
+        if passes != seen_passes or generation != seen_generation:
+            Renderer.save_image_array(image, output_path)
+            print(f"第 {passes} 遍，用时 {time.time() - start_time:.1f} 秒")
+            seen_passes, seen_generation = passes, generation
+
+        if progressive.max_passes is not None and passes >= progressive.max_passes:
+            break
+
+        time.sleep(interval)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='交互式渐进预览')
+    parser.add_argument('--scene', type=str, default='demo', choices=sorted(SCENES), help='场景名称')
+    parser.add_argument('--width', type=int, default=400, help='图像宽度')
+    parser.add_argument('--aspect-ratio', type=float, default=16.0 / 9.0, help='宽高比')
+    parser.add_argument('--spp-per-pass', type=int, default=1, help='每遍每像素采样数')
+    parser.add_argument('--passes', type=int, default=None, help='最大遍数（默认不限）')
+    parser.add_argument('--max-depth', type=int, default=10, help='最大递归深度')
+    parser.add_argument('--backend', type=str, default='python', choices=Renderer.BACKENDS, help='渲染后端')
+    parser.add_argument('--output', type=str, default='output/preview.png', help='预览文件路径')
+    parser.add_argument('--serve', action='store_true', help='启动本地网页预览')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='网页预览监听地址')
+    parser.add_argument('--port', type=int, default=8000, help='网页预览端口')
+
+    args = parser.parse_args()
+
+    image_width = args.width
+    image_height = int(image_width / args.aspect_ratio)
+
+    camera = Camera(
+        look_from=Vector3(0, 0, 0),
+        look_at=Vector3(0, 0, -1),
+        vup=Vector3(0, 1, 0),
+        vfov=90,
+        aspect_ratio=args.aspect_ratio
+    )
+
+    renderer = Renderer(max_depth=args.max_depth, samples_per_pixel=args.spp_per_pass, backend=args.backend)
+    progressive = ProgressiveRenderer(
+        renderer, SCENES[args.scene](), camera, image_width, image_height,
+        max_passes=args.passes
+    )
+
+    print(f"渐进预览 {image_width}x{image_height}，每遍 {args.spp_per_pass} 个样本")
+    progressive.start()
+
+    try:
+        if args.serve:
+            server = ThreadingHTTPServer((args.host, args.port), make_handler(progressive))
+            print(f"预览地址: http://{args.host}:{args.port}")
+            server.serve_forever()
+        else:
+            # 不限遍数时一直刷新，Ctrl+C 结束
+            run_file_preview(progressive, args.output)
+    except KeyboardInterrupt:
+        print("\n预览已停止")
+    finally:
+        progressive.stop()
+
+
+if __name__ == "__main__":
+    main()
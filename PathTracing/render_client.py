@@ -0,0 +1,138 @@
+"""
+渲染服务客户端 - 向 render_server.py 提交任务并接收流式图块
+
+使用方法:
+    python render_client.py --scene demo --width 400 --height 225 --spp 10 --output output/render.png
+"""
+import argparse
+import base64
+import http.client
+import json
+import socket
+
+import numpy as np
+
+from src.renderer import Renderer
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """通过 Unix 套接字通信的 HTTP 连接"""
+
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.unix_path)
+
+
+def _connect(host, port, unix_path):
+    if unix_path:
+        return UnixHTTPConnection(unix_path)
+    return http.client.HTTPConnection(host, port)
+
+
+def submit_job(job, host='127.0.0.1', port=8765, unix_path=None):
+    """
+    提交渲染任务，逐个产出服务端事件
+
+    Args:
+        job: dict - 任务描述（格式见 render_server.py）
+
+    Yields:
+        dict - 事件；tile 事件额外带有解码后的 'pixels' (ndarray float32 (H, W, 3))
+    """
+    conn = _connect(host, port, unix_path)
+    try:
+        conn.request('POST', '/jobs', body=json.dumps(job),
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+
+        if response.status != 200:
+            raise RuntimeError(f"任务被拒绝 ({response.status}): {response.read().decode('utf-8')}")
+
+        while True:
+            line = response.readline()
+            if not line:
+                break
+
+            event = json.loads(line)
+            if event['event'] == 'tile':
+                data = np.frombuffer(base64.b64decode(event.pop('data')), dtype=np.float32)
+                event['pixels'] = data.reshape(event['height'], event['width'], 3)
+            elif event['event'] == 'error':
+                raise RuntimeError(f"图块 {event['tile']} 渲染失败: {event['error']}")
+
+            yield event
+
+            if event['event'] == 'done':
+                break
+    finally:
+        conn.close()
+
+
+def render(job, host='127.0.0.1', port=8765, unix_path=None, on_tile=None):
+    """
+    提交任务并拼接完整图像
+
+    Args:
+        on_tile: callable(event, image) - 每收到一个图块后调用（用于实时预览）
+
+    Returns:
+        ndarray float32 (H, W, 3) - 线性颜色，第0行为图像顶部
+    """
+    image = None
+    for event in submit_job(job, host, port, unix_path):
+        if event['event'] == 'accepted':
+            image = np.zeros((event['height'], event['width'], 3), dtype=np.float32)
+        elif event['event'] == 'tile':
+            x, y = event['x'], event['y']
+            image[y:y + event['height'], x:x + event['width']] = event['pixels']
+            if on_tile is not None:
+                on_tile(event, image)
+    return image
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='渲染服务客户端')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='服务地址')
+    parser.add_argument('--port', type=int, default=8765, help='服务端口')
+    parser.add_argument('--unix', type=str, default=None, help='Unix 套接字路径')
+    parser.add_argument('--scene', type=str, default='demo', help='场景名称')
+    parser.add_argument('--width', type=int, default=400, help='图像宽度')
+    parser.add_argument('--height', type=int, default=225, help='图像高度')
+    parser.add_argument('--spp', type=int, default=10, help='每像素采样数')
+    parser.add_argument('--max-depth', type=int, default=50, help='最大递归深度')
+    parser.add_argument('--tile-size', type=int, default=32, help='图块尺寸')
+    parser.add_argument('--backend', type=str, default='python', choices=Renderer.BACKENDS, help='渲染后端')
+    parser.add_argument('--seed', type=int, default=None, help='随机数种子')
+    parser.add_argument('--priority', type=int, default=0, help='优先级（越大越优先）')
+    parser.add_argument('--output', type=str, default='output/render.png', help='输出路径')
+
+    args = parser.parse_args()
+
+    job = {
+        'scene': args.scene,
+        'settings': {
+            'width': args.width,
+            'height': args.height,
+            'samples_per_pixel': args.spp,
+            'max_depth': args.max_depth,
+            'tile_size': args.tile_size,
+            'backend': args.backend,
+            'seed': args.seed,
+        },
+        'priority': args.priority,
+    }
+
+    def report(event, image):
+        print(f"收到图块 {event['tile']} ({event['x']}, {event['y']})")
+
+    image = render(job, args.host, args.port, args.unix, on_tile=report)
+    Renderer.save_image_array(image, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+渲染服务 - 常驻的本地路径追踪渲染服务
+
+工作进程常驻（场景按内容哈希缓存在进程内，只在未命中时传输一次场景数据），任务按优先级调度，
+完成的图块以 NDJSON 流的形式实时返回给客户端。
+
+使用方法:
+    python render_server.py --port 8765 --workers 4
+    python render_server.py --unix /tmp/pathtracing.sock
+
+HTTP 接口:
+    POST /jobs    提交渲染任务，响应为逐行 JSON 流（accepted / tile / done / error）
+    GET  /status  查看队列长度、工作进程和任务统计
+
+任务格式:
+    {
+        "scene": "demo",                 # 场景名称（见 scenes/demo_scene.py）或 scene_to_dict 字典
+        "camera": {...},                 # 可选，camera_to_dict 字典
+        "settings": {"width": 400, "height": 225, "samples_per_pixel": 10,
+                     "max_depth": 50, "tile_size": 32, "backend": "python", "seed": 0},
+        "priority": 0                    # 数值越大越优先
+    }
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.vector3 import Vector3
+from src.camera import Camera
+from src.renderer import Renderer
+from src.serialization import scene_from_dict, scene_to_dict, camera_from_dict, camera_to_dict, content_hash
+from scenes.demo_scene import SCENES, create_simple_scene
+
+
+DEFAULT_SETTINGS = {
+    'width': 400,
+    'height': 225,
+    'samples_per_pixel': 10,
+    'max_depth': 50,
+    'tile_size': 32,
+    'backend': 'python',
+    'seed': None,
+}
+
+# 每个工作进程缓存的场景数量
+SCENE_CACHE_SIZE = 16
+
+# 工作进程内的场景缓存：内容哈希 -> HittableList
+_scene_cache = {}
+
+
+class SceneNotCached(Exception):
+    """工作进程中没有缓存该场景，需要附带场景数据重新提交"""
+
+
+def _worker_warmup(backend):
+    """预热工作进程：导入模块，并在使用 JIT 后端时触发内核加载"""
+    scene = create_simple_scene()
+    camera = Camera(Vector3(0, 0, 0), Vector3(0, 0, -1), Vector3(0, 1, 0), 90, 1.0)
+    Renderer(max_depth=2, samples_per_pixel=1, backend=backend).render_tile(scene, camera, 2, 2, 0, 0, 1, 1)
+    return os.getpid()
+
+
+def _render_tile_task(scene_key, scene_data, camera_data, settings, tile):
+    """
+    在工作进程中渲染一个图块
+
+    Args:
+        scene_data: dict - 场景数据；为 None 时只使用进程内缓存
+
+    Returns:
+        ndarray float32 (tile_height, tile_width, 3)
+
+    Raises:
+        SceneNotCached - scene_data 为 None 且缓存中没有该场景
+    """
+    scene = _scene_cache.get(scene_key)
+    if scene is None:
+        if scene_data is None:
+            raise SceneNotCached(scene_key)
+        if len(_scene_cache) >= SCENE_CACHE_SIZE:
+            _scene_cache.pop(next(iter(_scene_cache)))
+        scene = scene_from_dict(scene_data)
+        _scene_cache[scene_key] = scene
+
+    camera = camera_from_dict(camera_data)
+    renderer = Renderer(
+        max_depth=settings['max_depth'],
+        samples_per_pixel=settings['samples_per_pixel'],
+        backend=settings['backend']
+    )
+
+    index, x0, y0, tile_width, tile_height = tile
+
+    # 固定种子时每个图块使用独立且可复现的随机序列
+    if settings['seed'] is not None:
+        renderer.seed(settings['seed'] * 1000003 + index)
+
+    data = renderer.render_tile(scene, camera, settings['width'], settings['height'],
+                                x0, y0, tile_width, tile_height)
+    return data.astype(np.float32)
+
+
+def make_tiles(width, height, tile_size):
+    """按从上到下、从左到右的顺序切分图块：(index, x0, y0, tile_width, tile_height)"""
+    tiles = []
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            tiles.append((len(tiles), x0, y0, min(tile_size, width - x0), min(tile_size, height - y0)))
+    return tiles
+
+
+class RenderJob:
+    """一个渲染任务：场景、相机、设置以及完成图块的结果队列"""
+
+    def __init__(self, job_id, request):
+        """
+        Args:
+            job_id: int - 任务编号
+            request: dict - 客户端提交的任务描述
+
+        Raises:
+            ValueError / KeyError / TypeError - 任务描述无效
+        """
+        if not isinstance(request, dict):
+            raise TypeError("任务描述必须是 JSON 对象")
+
+        self.job_id = job_id
+        self.priority = int(request.get('priority', 0))
+
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(request.get('settings', {}))
+        if settings['backend'] not in Renderer.BACKENDS:
+            raise ValueError(f"不支持的渲染后端: {settings['backend']}")
+        if settings['width'] < 2 or settings['height'] < 2 or settings['tile_size'] < 1:
+            raise ValueError("图像尺寸至少为 2x2，图块尺寸至少为 1")
+        self.settings = settings
+
+        scene = request.get('scene', 'demo')
+        if isinstance(scene, str):
+            if scene not in SCENES:
+                raise ValueError(f"未知的场景: {scene}")
+            scene = scene_to_dict(SCENES[scene]())
+        # 先构建一次，尽早发现无效场景
+        scene_from_dict(scene)
+        self.scene_data = scene
+        self.scene_key = content_hash(scene)
+
+        camera = request.get('camera')
+        if camera is None:
+            camera = camera_to_dict(Camera(
+                look_from=Vector3(0, 0, 0),
+                look_at=Vector3(0, 0, -1),
+                vup=Vector3(0, 1, 0),
+                vfov=90,
+                aspect_ratio=settings['width'] / settings['height']
+            ))
+        camera_from_dict(camera)
+        self.camera_data = camera
+
+        self.tiles = make_tiles(settings['width'], settings['height'], settings['tile_size'])
+        self.results = asyncio.Queue()
+        self.cancelled = False
+        self.submitted_at = time.time()
+
+
+class RenderServer:
+    """基于 asyncio 的渲染服务"""
+
+    def __init__(self, workers=None, backend='python'):
+        """
+        Args:
+            workers: int - 工作进程数量（默认 CPU 核心数）
+            backend: str - 预热工作进程时使用的渲染后端
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.backend = backend
+        self.executor = None
+        self.queue = None
+        self._sequence = itertools.count()
+        self._job_ids = itertools.count(1)
+        self._dispatchers = []
+        self.active_jobs = {}
+        self.completed_jobs = 0
+        self.rendered_tiles = 0
+
+    async def start(self):
+        """启动并预热工作进程和调度协程"""
+        loop = asyncio.get_running_loop()
+
+        self.queue = asyncio.PriorityQueue()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        print(f"启动 {self.workers} 个工作进程...")
+        pids = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, _worker_warmup, self.backend)
+            for _ in range(self.workers)
+        ])
+        print(f"工作进程已就绪: {sorted(set(pids))}")
+
+        # 每个工作进程对应一个调度协程，保证队列中剩余图块始终按优先级取出
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def close(self):
+        """停止调度并关闭工作进程"""
+        for task in self._dispatchers:
+            task.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, job):
+        """将任务的所有图块放入优先级队列"""
+        self.active_jobs[job.job_id] = job
+        for tile in job.tiles:
+            # 优先级高的先出队；同优先级按提交顺序
+            self.queue.put_nowait((-job.priority, next(self._sequence), job, tile))
+
+    async def _dispatch(self):
+        """从队列取出图块并交给工作进程渲染"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            _, _, job, tile = await self.queue.get()
+            if job.cancelled:
+                continue
+
+            try:
+                # 先只发送场景哈希，工作进程未缓存该场景时再附带完整场景数据，
+                # 避免每个图块都序列化一遍场景
+                try:
+                    data = await loop.run_in_executor(
+                        self.executor, _render_tile_task,
+                        job.scene_key, None, job.camera_data, job.settings, tile
+                    )
+                except SceneNotCached:
+                    data = await loop.run_in_executor(
+                        self.executor, _render_tile_task,
+                        job.scene_key, job.scene_data, job.camera_data, job.settings, tile
+                    )
+                self.rendered_tiles += 1
+                job.results.put_nowait((tile, data))
+            except Exception as e:
+                job.results.put_nowait((tile, e))
+
+    def status(self):
+        """服务状态"""
+        return {
+            'workers': self.workers,
+            'queued_tiles': self.queue.qsize() if self.queue else 0,
+            'active_jobs': len(self.active_jobs),
+            'completed_jobs': self.completed_jobs,
+            'rendered_tiles': self.rendered_tiles,
+        }
+
+    async def handle_client(self, reader, writer):
+        """处理一个 HTTP 连接"""
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            if not request_line:
+                return
+            method, path, _ = request_line.split(' ', 2)
+
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            body = b''
+            if 'content-length' in headers:
+                body = await reader.readexactly(int(headers['content-length']))
+
+            if method == 'GET' and path == '/status':
+                await self._send_json(writer, 200, self.status())
+            elif method == 'POST' and path == '/jobs':
+                await self._handle_job(writer, body)
+            else:
+                await self._send_json(writer, 404, {'error': f"未知的接口: {method} {path}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_job(self, writer, body):
+        """提交任务并以分块传输流式返回图块"""
+        try:
+            job = RenderJob(next(self._job_ids), json.loads(body))
+        except (ValueError, KeyError, TypeError) as e:
+            await self._send_json(writer, 400, {'error': str(e)})
+            return
+
+        self.submit(job)
+        settings = job.settings
+        print(f"任务 {job.job_id}: {settings['width']}x{settings['height']}, "
+              f"{len(job.tiles)} 个图块, 优先级 {job.priority}, 场景 {job.scene_key[:12]}")
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+
+        try:
+            await self._send_chunk(writer, {
+                'event': 'accepted',
+                'job_id': job.job_id,
+                'width': settings['width'],
+                'height': settings['height'],
+                'tiles': len(job.tiles),
+                'scene_hash': job.scene_key,
+            })
+
+            for _ in range(len(job.tiles)):
+                tile, data = await job.results.get()
+                index, x0, y0, tile_width, tile_height = tile
+
+                if isinstance(data, Exception):
+                    await self._send_chunk(writer, {'event': 'error', 'tile': index, 'error': str(data)})
+                    return
+
+                await self._send_chunk(writer, {
+                    'event': 'tile',
+                    'tile': index,
+                    'x': x0,
+                    'y': y0,
+                    'width': tile_width,
+                    'height': tile_height,
+                    'dtype': 'float32',
+                    'data': base64.b64encode(data.tobytes()).decode('ascii'),
+                })
+
+            elapsed = time.time() - job.submitted_at
+            await self._send_chunk(writer, {'event': 'done', 'job_id': job.job_id, 'elapsed': elapsed})
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+
+            self.completed_jobs += 1
+            print(f"任务 {job.job_id} 完成，用时 {elapsed:.2f} 秒")
+        except ConnectionError:
+            print(f"任务 {job.job_id}: 客户端断开，取消剩余图块")
+        finally:
+            # 客户端断开或出错时，队列中剩余的图块会被跳过
+            job.cancelled = True
+            self.active_jobs.pop(job.job_id, None)
+
+    @staticmethod
+    async def _send_chunk(writer, event):
+        """发送一行 JSON 作为一个 HTTP 分块"""
+        payload = (json.dumps(event) + '\n').encode('utf-8')
+        writer.write(f"{len(payload):X}\r\n".encode('ascii') + payload + b"\r\n")
+        await writer.drain()
+
+    @staticmethod
+    async def _send_json(writer, status, data):
+        """发送普通 JSON 响应"""
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found'}
+        payload = json.dumps(data).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {reasons[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + payload
+        )
+        await writer.drain()
+
+
+async def serve(host, port, unix_path, workers, backend):
+    """运行渲染服务直到被中断"""
+    server = RenderServer(workers=workers, backend=backend)
+    await server.start()
+
+    if unix_path:
+        listener = await asyncio.start_unix_server(server.handle_client, path=unix_path)
+        print(f"渲染服务已启动: unix:{unix_path}")
+    else:
+        listener = await asyncio.start_server(server.handle_client, host, port)
+        print(f"渲染服务已启动: http://{host}:{port}")
+
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='路径追踪渲染服务')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--unix', type=str, default=None, help='Unix 套接字路径（指定后忽略 host/port）')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程数量（默认 CPU 核心数）')
+    parser.add_argument('--backend', type=str, default='python', choices=Renderer.BACKENDS,
+                        help='预热工作进程使用的渲染后端')
+
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.backend))
+    except KeyboardInterrupt:
+        print("\n渲染服务已停止")
+
+
+if __name__ == "__main__":
+    main()
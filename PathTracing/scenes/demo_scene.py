@@ -79,4 +79,12 @@ def create_metal_scene():
     material_right = Metal(Vector3(0.8, 0.8, 0.8), 1.0)
     scene.add(Sphere(Vector3(1, 0, -1), 0.5, material_right))
     
-    return scene
\ No newline at end of file
+    return scene
+
+
+# 场景注册表：名称 -> 构建函数（供渲染服务按名称创建场景）
+SCENES = {
+    'demo': create_demo_scene,
+    'simple': create_simple_scene,
+    'metal': create_metal_scene,
+}
@@ -20,6 +20,13 @@ class Camera:
             vfov: float - 垂直视场角（度）
             aspect_ratio: float - 宽高比
         """
+        # 保留构造参数（用于序列化和内容哈希）
+        self.look_from = look_from
+        self.look_at = look_at
+        self.vup = vup
+        self.vfov = vfov
+        self.aspect_ratio = aspect_ratio
+        
         self.origin = look_from
         
         # 计算视场参数
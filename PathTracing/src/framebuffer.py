@@ -0,0 +1,186 @@
+"""
+分块帧缓冲 - 超大分辨率渲染的内存受限输出
+
+渲染完成的图块直接写入磁盘上的内存映射数组（.npy，float16/float32），
+最后按条带（若干行）读取并流式编码为 PNG 或 TIFF，
+常驻内存只与图块/条带大小有关，与整幅图像分辨率无关。
+"""
+import os
+import struct
+import zlib
+
+import numpy as np
+
+
+class TiledFramebuffer:
+    """基于内存映射文件的浮点帧缓冲"""
+
+    DTYPES = ('float16', 'float32')
+
+    def __init__(self, path, width, height, dtype='float32'):
+        """
+        Args:
+            path: str - 帧缓冲文件路径（.npy 格式，可用 np.load(path, mmap_mode='r') 打开）
+            width, height: int - 图像尺寸
+            dtype: str - 存储精度 ('float16' 或 'float32')
+        """
+        if dtype not in self.DTYPES:
+            raise ValueError(f"不支持的帧缓冲精度: {dtype}")
+
+        self.path = path
+        self.width = width
+        self.height = height
+        self.data = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(height, width, 3))
+
+    def write_tile(self, x0, y0, tile):
+        """写入一个图块（第0行为图块顶部）"""
+        tile_height, tile_width = tile.shape[:2]
+        self.data[y0:y0 + tile_height, x0:x0 + tile_width] = tile
+
+    def read_strip(self, y0, strip_height):
+        """读取一个条带，返回 float32 数组"""
+        return np.asarray(self.data[y0:y0 + strip_height], dtype=np.float32)
+
+    def flush(self):
+        """把已写入的图块刷回磁盘，使对应页面可以被系统回收"""
+        self.data.flush()
+
+    def close(self):
+        """关闭内存映射"""
+        if self.data is not None:
+            self.data.flush()
+            self.data = None
+
+
+def _png_chunk(f, chunk_type, data):
+    f.write(struct.pack('>I', len(data)))
+    f.write(chunk_type)
+    f.write(data)
+    f.write(struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+
+def write_png_strips(framebuffer, filename, strip_height=64, to_rgb8=None):
+    """
+    按条带流式写出 8 位 RGB PNG
+
+    Args:
+        framebuffer: TiledFramebuffer - 帧缓冲
+        filename: str - 输出文件
+        strip_height: int - 每次读取和压缩的行数
+        to_rgb8: callable - 线性颜色 -> uint8 的转换（默认 Renderer.to_rgb8）
+    """
+    if to_rgb8 is None:
+        from src.renderer import Renderer
+        to_rgb8 = Renderer.to_rgb8
+
+    width, height = framebuffer.width, framebuffer.height
+    compressor = zlib.compressobj(6)
+
+    with open(filename, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        # 8 位深度，颜色类型 2 (RGB)，无隔行
+        _png_chunk(f, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+        for y0 in range(0, height, strip_height):
+            strip = to_rgb8(framebuffer.read_strip(y0, strip_height))
+            rows = strip.shape[0]
+
+            # 每行前加过滤类型字节 0 (None)
+            scanlines = np.zeros((rows, 1 + width * 3), dtype=np.uint8)
+            scanlines[:, 1:] = strip.reshape(rows, width * 3)
+
+            compressed = compressor.compress(scanlines.tobytes())
+            if compressed:
+                _png_chunk(f, b'IDAT', compressed)
+
+        _png_chunk(f, b'IDAT', compressor.flush())
+        _png_chunk(f, b'IEND', b'')
+
+
+def write_tiff_strips(framebuffer, filename, strip_height=64, to_rgb8=None):
+    """
+    按条带流式写出未压缩的 8 位 RGB TIFF（小端，经典 TIFF 格式，文件上限 4 GB）
+
+    Args:
+        framebuffer: TiledFramebuffer - 帧缓冲
+        filename: str - 输出文件
+        strip_height: int - 每个 TIFF 条带的行数
+        to_rgb8: callable - 线性颜色 -> uint8 的转换（默认 Renderer.to_rgb8）
+    """
+    if to_rgb8 is None:
+        from src.renderer import Renderer
+        to_rgb8 = Renderer.to_rgb8
+
+    width, height = framebuffer.width, framebuffer.height
+    row_bytes = width * 3
+    image_bytes = row_bytes * height
+
+    strip_starts = list(range(0, height, strip_height))
+    strip_counts = [min(strip_height, height - y0) * row_bytes for y0 in strip_starts]
+    strip_offsets = []
+    offset = 8
+    for count in strip_counts:
+        strip_offsets.append(offset)
+        offset += count
+
+    # 图像数据之后依次是：BitsPerSample、StripOffsets、StripByteCounts 数组和 IFD
+    num_strips = len(strip_starts)
+    bits_offset = 8 + image_bytes + (image_bytes % 2)
+    offsets_offset = bits_offset + 6 + 2
+    counts_offset = offsets_offset + 4 * num_strips
+    ifd_offset = counts_offset + 4 * num_strips
+
+    if ifd_offset + 2 + 10 * 12 + 4 > 0xffffffff:
+        raise ValueError("图像超过经典 TIFF 的 4 GB 上限，请改用 PNG 输出")
+
+    SHORT, LONG = 3, 4
+
+    def entry(tag, field_type, count, value):
+        if field_type == SHORT and count == 1:
+            return struct.pack('<HHIHH', tag, field_type, count, value, 0)
+        return struct.pack('<HHII', tag, field_type, count, value)
+
+    # StripOffsets / StripByteCounts 只有一个条带时直接存值
+    offsets_value = strip_offsets[0] if num_strips == 1 else offsets_offset
+    counts_value = strip_counts[0] if num_strips == 1 else counts_offset
+
+    entries = [
+        entry(256, LONG, 1, width),                     # ImageWidth
+        entry(257, LONG, 1, height),                    # ImageLength
+        entry(258, SHORT, 3, bits_offset),              # BitsPerSample
+        entry(259, SHORT, 1, 1),                        # Compression: 无
+        entry(262, SHORT, 1, 2),                        # PhotometricInterpretation: RGB
+        entry(273, LONG, num_strips, offsets_value),    # StripOffsets
+        entry(277, SHORT, 1, 3),                        # SamplesPerPixel
+        entry(278, LONG, 1, strip_height),              # RowsPerStrip
+        entry(279, LONG, num_strips, counts_value),     # StripByteCounts
+        entry(284, SHORT, 1, 1),                        # PlanarConfiguration: 交错
+    ]
+
+    with open(filename, 'wb') as f:
+        f.write(b'II*\x00' + struct.pack('<I', ifd_offset))
+
+        for y0 in strip_starts:
+            f.write(to_rgb8(framebuffer.read_strip(y0, strip_height)).tobytes())
+        if image_bytes % 2:
+            f.write(b'\x00')
+
+        f.write(struct.pack('<HHHH', 8, 8, 8, 0))
+        f.write(struct.pack(f'<{num_strips}I', *strip_offsets))
+        f.write(struct.pack(f'<{num_strips}I', *strip_counts))
+
+        f.write(struct.pack('<H', len(entries)))
+        for e in entries:
+            f.write(e)
+        f.write(struct.pack('<I', 0))
+
+
+def export_strips(framebuffer, filename, strip_height=64):
+    """根据扩展名 (.png / .tif / .tiff) 选择流式编码器"""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.png':
+        write_png_strips(framebuffer, filename, strip_height)
+    elif ext in ('.tif', '.tiff'):
+        write_tiff_strips(framebuffer, filename, strip_height)
+    else:
+        raise ValueError(f"分块输出只支持 PNG 和 TIFF: {filename}")
@@ -0,0 +1,274 @@
+"""
+JIT 渲染后端 - 使用 Numba 编译球体求交、材质散射和光线反弹循环
+
+渲染前先把场景和相机打包成 NumPy 数组，内核函数只操作标量和数组：
+- 安装了 Numba 时，内核被编译为机器码
+- 未安装 Numba 时，内核以普通 Python 函数执行（仅用于测试对照）
+"""
+import math
+import numpy as np
+
+from src.objects import Sphere
+from src.material import Lambertian, Metal, Dielectric
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """未安装 Numba 时的占位装饰器：原样返回函数"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# 材质类型编号
+MATERIAL_LAMBERTIAN = 0
+MATERIAL_METAL = 1
+MATERIAL_DIELECTRIC = 2
+
+
+def pack_scene(scene):
+    """
+    将场景打包为数组
+
+    Args:
+        scene: HittableList - 场景（只能包含球体）
+
+    Returns:
+        (centers, radii, mat_types, albedos, mat_params)
+        mat_params 对金属是模糊度，对电介质是折射率
+    """
+    objects = scene.objects
+    count = len(objects)
+
+    centers = np.zeros((count, 3), dtype=np.float64)
+    radii = np.zeros(count, dtype=np.float64)
+    mat_types = np.zeros(count, dtype=np.int64)
+    albedos = np.ones((count, 3), dtype=np.float64)
+    mat_params = np.zeros(count, dtype=np.float64)
+
+    for idx, obj in enumerate(objects):
+        if not isinstance(obj, Sphere):
+            raise TypeError(f"JIT 后端只支持球体: {type(obj).__name__}")
+
+        centers[idx] = (obj.center.x, obj.center.y, obj.center.z)
+        radii[idx] = obj.radius
+
+        material = obj.material
+        if isinstance(material, Lambertian):
+            mat_types[idx] = MATERIAL_LAMBERTIAN
+            albedos[idx] = (material.albedo.x, material.albedo.y, material.albedo.z)
+        elif isinstance(material, Metal):
+            mat_types[idx] = MATERIAL_METAL
+            albedos[idx] = (material.albedo.x, material.albedo.y, material.albedo.z)
+            mat_params[idx] = material.fuzz
+        elif isinstance(material, Dielectric):
+            mat_types[idx] = MATERIAL_DIELECTRIC
+            mat_params[idx] = material.refractive_index
+        else:
+            raise TypeError(f"JIT 后端不支持的材质: {type(material).__name__}")
+
+    return centers, radii, mat_types, albedos, mat_params
+
+
+def pack_camera(camera):
+    """
+    将相机打包为 (4, 3) 数组：origin, lower_left_corner, horizontal, vertical
+    """
+    rows = (camera.origin, camera.lower_left_corner, camera.horizontal, camera.vertical)
+    return np.array([(v.x, v.y, v.z) for v in rows], dtype=np.float64)
+
+
+@njit(cache=True)
+def seed(value):
+    """设置内核使用的随机数种子"""
+    np.random.seed(value)
+
+
+@njit(cache=True)
+def _random_in_unit_sphere():
+    """在单位球内生成随机向量"""
+    while True:
+        x = np.random.uniform(-1.0, 1.0)
+        y = np.random.uniform(-1.0, 1.0)
+        z = np.random.uniform(-1.0, 1.0)
+        if x * x + y * y + z * z < 1.0:
+            return x, y, z
+
+
+@njit(cache=True)
+def _normalize(x, y, z):
+    """归一化（零向量保持为零）"""
+    length = math.sqrt(x * x + y * y + z * z)
+    if length > 0:
+        return x / length, y / length, z / length
+    return 0.0, 0.0, 0.0
+
+
+@njit(cache=True)
+def _hit_scene(ox, oy, oz, dx, dy, dz, t_min, t_max, centers, radii):
+    """
+    光线与所有球体求交
+
+    Returns:
+        (index, t) - 最近交点所在球体的下标和参数t，未击中时 index 为 -1
+    """
+    hit_index = -1
+    closest_so_far = t_max
+
+    a = dx * dx + dy * dy + dz * dz
+    for idx in range(radii.shape[0]):
+        ocx = ox - centers[idx, 0]
+        ocy = oy - centers[idx, 1]
+        ocz = oz - centers[idx, 2]
+
+        half_b = ocx * dx + ocy * dy + ocz * dz
+        c = ocx * ocx + ocy * ocy + ocz * ocz - radii[idx] * radii[idx]
+        discriminant = half_b * half_b - a * c
+        if discriminant < 0:
+            continue
+
+        sqrtd = math.sqrt(discriminant)
+        root = (-half_b - sqrtd) / a
+        if root < t_min or root > closest_so_far:
+            root = (-half_b + sqrtd) / a
+            if root < t_min or root > closest_so_far:
+                continue
+
+        hit_index = idx
+        closest_so_far = root
+
+    return hit_index, closest_so_far
+
+
+@njit(cache=True)
+def trace_ray(ox, oy, oz, dx, dy, dz, max_depth,
+              centers, radii, mat_types, albedos, mat_params):
+    """
+    计算光线颜色（与 Renderer.ray_color 等价的迭代版本）
+
+    递归中的 attenuation * scattered_color 改写为沿路径累乘衰减系数。
+    """
+    ar, ag, ab = 1.0, 1.0, 1.0
+
+    for _ in range(max_depth):
+        idx, t = _hit_scene(ox, oy, oz, dx, dy, dz, 0.001, np.inf, centers, radii)
+
+        if idx < 0:
+            # 天空颜色
+            ux, uy, uz = _normalize(dx, dy, dz)
+            s = 0.5 * (uy + 1.0)
+            return (ar * ((1.0 - s) + s * 0.5),
+                    ag * ((1.0 - s) + s * 0.7),
+                    ab * ((1.0 - s) + s * 1.0))
+
+        # 交点与法线
+        px = ox + t * dx
+        py = oy + t * dy
+        pz = oz + t * dz
+        radius = radii[idx]
+        nx = (px - centers[idx, 0]) / radius
+        ny = (py - centers[idx, 1]) / radius
+        nz = (pz - centers[idx, 2]) / radius
+        front_face = dx * nx + dy * ny + dz * nz < 0
+        if not front_face:
+            nx, ny, nz = -nx, -ny, -nz
+
+        mat_type = mat_types[idx]
+
+        if mat_type == MATERIAL_LAMBERTIAN:
+            rx, ry, rz = _random_in_unit_sphere()
+            rx, ry, rz = _normalize(rx, ry, rz)
+            sx, sy, sz = nx + rx, ny + ry, nz + rz
+            if abs(sx) < 1e-8 and abs(sy) < 1e-8 and abs(sz) < 1e-8:
+                sx, sy, sz = nx, ny, nz
+            sx, sy, sz = _normalize(sx, sy, sz)
+        elif mat_type == MATERIAL_METAL:
+            d_dot_n = dx * nx + dy * ny + dz * nz
+            fuzz = mat_params[idx]
+            rx, ry, rz = _random_in_unit_sphere()
+            sx, sy, sz = _normalize(dx - 2 * d_dot_n * nx + fuzz * rx,
+                                    dy - 2 * d_dot_n * ny + fuzz * ry,
+                                    dz - 2 * d_dot_n * nz + fuzz * rz)
+            if sx * nx + sy * ny + sz * nz <= 0:
+                return 0.0, 0.0, 0.0
+        else:
+            ref_idx = mat_params[idx]
+            ratio = 1.0 / ref_idx if front_face else ref_idx
+
+            ux, uy, uz = _normalize(dx, dy, dz)
+            cos_theta = min(-(ux * nx + uy * ny + uz * nz), 1.0)
+            sin_theta = (1.0 - cos_theta * cos_theta) ** 0.5
+            cannot_refract = ratio * sin_theta > 1.0
+
+            # Schlick近似
+            r0 = (1 - ratio) / (1 + ratio)
+            r0 = r0 * r0
+            reflectance = r0 + (1 - r0) * ((1 - cos_theta) ** 5)
+
+            if cannot_refract or reflectance > np.random.random():
+                u_dot_n = ux * nx + uy * ny + uz * nz
+                sx = ux - 2 * u_dot_n * nx
+                sy = uy - 2 * u_dot_n * ny
+                sz = uz - 2 * u_dot_n * nz
+            else:
+                perp_x = ratio * (ux + cos_theta * nx)
+                perp_y = ratio * (uy + cos_theta * ny)
+                perp_z = ratio * (uz + cos_theta * nz)
+                parallel = -math.sqrt(abs(1.0 - (perp_x * perp_x + perp_y * perp_y + perp_z * perp_z)))
+                sx = perp_x + parallel * nx
+                sy = perp_y + parallel * ny
+                sz = perp_z + parallel * nz
+
+        ar *= albedos[idx, 0]
+        ag *= albedos[idx, 1]
+        ab *= albedos[idx, 2]
+
+        ox, oy, oz = px, py, pz
+        dx, dy, dz = sx, sy, sz
+
+    # 达到最大深度
+    return 0.0, 0.0, 0.0
+
+
+@njit(cache=True, nogil=True)
+def render_kernel(image_width, image_height, x0, y0, tile_width, tile_height,
+                  samples_per_pixel, max_depth, camera,
+                  centers, radii, mat_types, albedos, mat_params):
+    """
+    渲染图像中的一个图块（整幅图像即为 x0=y0=0 的最大图块）
+
+    Returns:
+        ndarray (tile_height, tile_width, 3) - 线性颜色，第0行为图块顶部
+    """
+    pixels = np.zeros((tile_height, tile_width, 3), dtype=np.float64)
+
+    for row in range(tile_height):
+        j = image_height - 1 - (y0 + row)
+        for col in range(tile_width):
+            i = x0 + col
+            r, g, b = 0.0, 0.0, 0.0
+
+            for _ in range(samples_per_pixel):
+                u = (i + np.random.random()) / (image_width - 1)
+                v = (j + np.random.random()) / (image_height - 1)
+
+                dx, dy, dz = _normalize(
+                    camera[1, 0] + u * camera[2, 0] + v * camera[3, 0] - camera[0, 0],
+                    camera[1, 1] + u * camera[2, 1] + v * camera[3, 1] - camera[0, 1],
+                    camera[1, 2] + u * camera[2, 2] + v * camera[3, 2] - camera[0, 2],
+                )
+                cr, cg, cb = trace_ray(camera[0, 0], camera[0, 1], camera[0, 2], dx, dy, dz,
+                                       max_depth, centers, radii, mat_types, albedos, mat_params)
+                r += cr
+                g += cg
+                b += cb
+
+            pixels[row, col, 0] = r / samples_per_pixel
+            pixels[row, col, 1] = g / samples_per_pixel
+            pixels[row, col, 2] = b / samples_per_pixel
+
+    return pixels
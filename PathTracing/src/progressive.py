@@ -0,0 +1,142 @@
+"""
+渐进式渲染 - 逐遍累积样本，供实时预览使用
+
+采样循环运行在后台线程中，每一遍为所有像素各渲染 samples_per_pixel 个样本，
+累加到共享缓冲区；显示循环随时可以取出当前平均结果，两者互不阻塞。
+相机改变时丢弃当前这一遍并清空累积缓冲区，从头开始累积。
+"""
+import threading
+
+import numpy as np
+
+
+class ProgressiveRenderer:
+    """渐进式渲染器：在后台线程中逐遍累积样本"""
+
+    def __init__(self, renderer, scene, camera, image_width, image_height,
+                 band_height=8, max_passes=None):
+        """
+        Args:
+            renderer: Renderer - 单遍使用的渲染器（其 samples_per_pixel 为每遍样本数）
+            scene: HittableList - 场景
+            camera: Camera - 初始相机
+            image_width, image_height: int - 图像尺寸
+            band_height: int - 每次渲染的行带高度（越小相机切换响应越快）
+            max_passes: int - 最大遍数（None 表示一直累积直到停止）
+        """
+        self.renderer = renderer
+        self.scene = scene
+        self.image_width = image_width
+        self.image_height = image_height
+        self.band_height = band_height
+        self.max_passes = max_passes
+
+        self._camera = camera
+        self._generation = 0
+        self._sum = np.zeros((image_height, image_width, 3), dtype=np.float64)
+        self._samples = 0
+        self._passes = 0
+
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def camera(self):
+        return self._camera
+
+    @property
+    def passes(self):
+        return self._passes
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动后台采样线程"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='progressive-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止采样线程"""
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def set_camera(self, camera):
+        """切换相机：清空累积缓冲区并从头开始"""
+        with self._condition:
+            self._camera = camera
+            self._generation += 1
+            self._sum.fill(0.0)
+            self._samples = 0
+            self._passes = 0
+            self._condition.notify_all()
+
+    def snapshot(self):
+        """
+        取出当前累积结果
+
+        Returns:
+            (image, passes, generation) - image 为 ndarray float32 (H, W, 3)，尚无样本时为全黑
+        """
+        with self._condition:
+            if self._samples == 0:
+                image = np.zeros_like(self._sum, dtype=np.float32)
+            else:
+                image = (self._sum / self._samples).astype(np.float32)
+            return image, self._passes, self._generation
+
+    def wait_for_pass(self, seen_passes, seen_generation, timeout=None):
+        """
+        等待出现新的一遍结果（或相机切换、采样结束）
+
+        Returns:
+            bool - 是否有新内容
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: (self._passes != seen_passes or self._generation != seen_generation
+                         or self._stop.is_set() or not self.running),
+                timeout=timeout
+            )
+
+    def _run(self):
+        """采样循环"""
+        width, height = self.image_width, self.image_height
+        pass_buffer = np.empty((height, width, 3), dtype=np.float64)
+
+        while not self._stop.is_set():
+            with self._condition:
+                if self.max_passes is not None and self._passes >= self.max_passes:
+                    self._condition.wait(timeout=0.1)
+                    continue
+                generation = self._generation
+                camera = self._camera
+
+            completed = True
+            for y0 in range(0, height, self.band_height):
+                # 相机已切换或被要求停止：放弃这一遍
+                if self._generation != generation or self._stop.is_set():
+                    completed = False
+                    break
+
+                band = min(self.band_height, height - y0)
+                pass_buffer[y0:y0 + band] = self.renderer.render_tile(
+                    self.scene, camera, width, height, 0, y0, width, band
+                )
+
+            if not completed:
+                continue
+
+            with self._condition:
+                if self._generation == generation:
+                    samples = self.renderer.samples_per_pixel
+                    self._sum += pass_buffer * samples
+                    self._samples += samples
+                    self._passes += 1
+                    self._condition.notify_all()
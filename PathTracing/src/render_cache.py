@@ -0,0 +1,198 @@
+"""
+渲染结果缓存 - 按内容哈希在磁盘上缓存浮点帧缓冲
+
+缓存键由场景、材质、相机参数、分辨率、最大深度、后端和随机种子计算得到；
+每像素采样数（spp）不参与哈希，而是作为文件名的一部分：
+    <cache_dir>/<key>_<spp>.npy
+
+这样当只有 spp 增大时，可以复用已缓存的较低 spp 结果，只补渲染差额样本。
+固定种子时补渲染的结果与完整渲染的像素不同，存入由原键和复用的 spp 派生的键，
+保证同一个键总是对应同一幅图像。
+缓存总大小超过上限时按最近使用时间（文件 mtime）淘汰。
+"""
+import glob
+import os
+
+import numpy as np
+
+from src.serialization import scene_to_dict, camera_to_dict, content_hash
+
+
+# 缓存格式版本（渲染算法变化导致旧结果失效时递增）
+CACHE_VERSION = 1
+
+
+class RenderCache:
+    """基于内容哈希的渲染结果磁盘缓存（LRU 容量上限）"""
+
+    def __init__(self, cache_dir='cache', max_bytes=1 << 30):
+        """
+        Args:
+            cache_dir: str - 缓存目录
+            max_bytes: int - 缓存总大小上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(scene, camera, image_width, image_height, max_depth, backend, seed):
+        """
+        计算缓存键（不含 spp）
+
+        Returns:
+            str - 内容哈希
+        """
+        return content_hash({
+            'version': CACHE_VERSION,
+            'scene': scene_to_dict(scene),
+            'camera': camera_to_dict(camera),
+            'width': image_width,
+            'height': image_height,
+            'max_depth': max_depth,
+            'backend': backend,
+            'seed': seed,
+        })
+
+    @staticmethod
+    def make_reuse_key(key, cached_samples):
+        """
+        计算部分复用结果的缓存键：原键下 cached_samples 的结果加上补渲染的差额样本
+
+        Returns:
+            str - 内容哈希
+        """
+        return content_hash({'key': key, 'reused_samples': cached_samples})
+
+    def _path(self, key, samples_per_pixel):
+        return os.path.join(self.cache_dir, f"{key}_{samples_per_pixel}.npy")
+
+    def _cached_samples(self, key):
+        """该键下已缓存的所有 spp"""
+        samples = []
+        for path in glob.glob(os.path.join(self.cache_dir, f"{key}_*.npy")):
+            suffix = os.path.basename(path)[len(key) + 1:-len('.npy')]
+            if suffix.isdigit():
+                samples.append(int(suffix))
+        return samples
+
+    def _load(self, key, samples_per_pixel):
+        path = self._path(key, samples_per_pixel)
+        image = np.load(path)
+        # 更新访问时间，用于 LRU 淘汰
+        os.utime(path)
+        return image
+
+    def get(self, key, samples_per_pixel):
+        """
+        精确查找
+
+        Returns:
+            ndarray float32 (H, W, 3) 或 None
+        """
+        if not os.path.exists(self._path(key, samples_per_pixel)):
+            return None
+        return self._load(key, samples_per_pixel)
+
+    def get_partial(self, key, samples_per_pixel):
+        """
+        查找同一键下 spp 小于请求值的最大缓存结果
+
+        Returns:
+            (cached_samples, ndarray) 或 None
+        """
+        candidates = [s for s in self._cached_samples(key) if s < samples_per_pixel]
+        if not candidates:
+            return None
+        best = max(candidates)
+        return best, self._load(key, best)
+
+    def put(self, key, samples_per_pixel, image):
+        """写入缓存（先写临时文件再原子替换），然后按容量上限淘汰"""
+        path = self._path(key, samples_per_pixel)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, image.astype(np.float32))
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        """删除最久未使用的文件，直到总大小不超过上限"""
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, '*.npy')):
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+
+    def render(self, renderer, scene, camera, image_width, image_height, seed=None):
+        """
+        带缓存的渲染
+
+        1. 命中相同 spp 的结果：直接返回
+        2. 命中较低 spp 的结果：只渲染差额样本，按样本数加权合并
+           （固定种子时结果写入 make_reuse_key 派生的键，不与完整渲染混用）
+        3. 未命中：完整渲染
+
+        Args:
+            renderer: Renderer - 渲染器（提供 spp、最大深度和后端）
+            seed: int - 随机种子（None 表示不固定）
+
+        Returns:
+            ndarray float32 (H, W, 3) - 线性颜色，第0行为图像顶部
+        """
+        samples = renderer.samples_per_pixel
+        key = self.make_key(scene, camera, image_width, image_height,
+                            renderer.max_depth, renderer.backend, seed)
+
+        image = self.get(key, samples)
+        if image is not None:
+            print(f"缓存命中: {key[:12]} (spp={samples})")
+            return image
+
+        partial = self.get_partial(key, samples)
+        if partial is not None:
+            cached_samples, cached_image = partial
+            extra = samples - cached_samples
+
+            # 固定种子时，差额样本的随机序列与完整渲染不同，合并结果存入派生的键
+            store_key = key if seed is None else self.make_reuse_key(key, cached_samples)
+            if seed is not None:
+                image = self.get(store_key, samples)
+                if image is not None:
+                    print(f"缓存命中: {key[:12]} (spp={samples}，由 spp={cached_samples} 补渲染)")
+                    return image
+
+            print(f"部分命中: {key[:12]} (已缓存 spp={cached_samples}，补渲染 {extra} 个样本)")
+
+            # 差额样本使用由原种子和已有样本数派生的种子，避免与已缓存样本重复
+            if seed is not None:
+                renderer.seed(seed * 1000003 + cached_samples)
+
+            full_samples = renderer.samples_per_pixel
+            renderer.samples_per_pixel = extra
+            try:
+                extra_image = renderer.render_tile(scene, camera, image_width, image_height,
+                                                   0, 0, image_width, image_height)
+            finally:
+                renderer.samples_per_pixel = full_samples
+
+            image = (cached_image * cached_samples + extra_image * extra) / samples
+        else:
+            store_key = key
+            print(f"缓存未命中: {key[:12]} (spp={samples})")
+            if seed is not None:
+                renderer.seed(seed)
+            image = renderer.render_tile(scene, camera, image_width, image_height,
+                                         0, 0, image_width, image_height)
+
+        image = image.astype(np.float32)
+        self.put(store_key, samples, image)
+        return image
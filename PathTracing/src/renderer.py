@@ -9,14 +9,35 @@ from src.ray import Ray
 class Renderer:
     """路径追踪渲染器"""
     
-    def __init__(self, max_depth=50, samples_per_pixel=10):
+    BACKENDS = ('python', 'numba')
+    
+    def __init__(self, max_depth=50, samples_per_pixel=10, backend='python'):
         """
         Args:
             max_depth: int - 最大递归深度
             samples_per_pixel: int - 每像素采样数（用于抗锯齿）
+            backend: str - 渲染后端 ('python' 或 'numba')，
+                     未安装 Numba 时 'numba' 回退到 'python'
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的渲染后端: {backend}")
+        
+        if backend == 'numba':
+            from src.jit_backend import NUMBA_AVAILABLE
+            if not NUMBA_AVAILABLE:
+                print("警告: 未安装 Numba，回退到纯 Python 渲染路径")
+                backend = 'python'
+        
         self.max_depth = max_depth
         self.samples_per_pixel = samples_per_pixel
+        self.backend = backend
+    
+    def seed(self, value):
+        """设置当前渲染后端的随机数种子"""
+        random.seed(value)
+        if self.backend == 'numba':
+            from src import jit_backend
+            jit_backend.seed(value)
     
     def render(self, scene, camera, image_width, image_height):
         """
@@ -31,38 +52,145 @@ class Renderer:
         Returns:
             list of list of Vector3 - 像素颜色数组
         """
-        pixels = []
-        
         print(f"开始渲染 {image_width}x{image_height} 图像...")
         print(f"每像素采样数: {self.samples_per_pixel}")
         print(f"最大递归深度: {self.max_depth}")
         
+        if self.backend == 'numba':
+            image = self._render_jit(scene, camera, image_width, image_height,
+                                     0, 0, image_width, image_height)
+            pixels = [
+                [Vector3(r, g, b) for r, g, b in row]
+                for row in image.tolist()
+            ]
+            print("渲染完成！")
+            return pixels
+        
+        pixels = []
+        
         for j in range(image_height - 1, -1, -1):
             if (image_height - j) % 10 == 0:
                 print(f"进度: {image_height - j}/{image_height} 行")
             
             row = []
             for i in range(image_width):
-                pixel_color = Vector3(0, 0, 0)
-                
-                # 多重采样抗锯齿
-                for _ in range(self.samples_per_pixel):
-                    # 添加随机偏移
-                    u = (i + random.random()) / (image_width - 1)
-                    v = (j + random.random()) / (image_height - 1)
-                    
-                    ray = camera.get_ray(u, v)
-                    pixel_color = pixel_color + self.ray_color(ray, scene, self.max_depth)
-                
-                # 平均颜色
-                pixel_color = pixel_color / self.samples_per_pixel
-                row.append(pixel_color)
+                row.append(self._sample_pixel(scene, camera, i, j, image_width, image_height))
             
             pixels.append(row)
         
         print("渲染完成！")
         return pixels
     
+    def render_tile(self, scene, camera, image_width, image_height, x0, y0, tile_width, tile_height):
+        """
+        渲染图像中的一个矩形区域（图块）
+        
+        Args:
+            scene: HittableList - 场景
+            camera: Camera - 相机
+            image_width: int - 完整图像宽度
+            image_height: int - 完整图像高度
+            x0, y0: int - 图块左上角像素坐标（y 从图像顶部开始计）
+            tile_width, tile_height: int - 图块尺寸
+            
+        Returns:
+            ndarray (tile_height, tile_width, 3) - 线性颜色，第0行为图块顶部
+        """
+        import numpy as np
+        
+        if self.backend == 'numba':
+            return self._render_jit(scene, camera, image_width, image_height,
+                                    x0, y0, tile_width, tile_height)
+        
+        tile = np.zeros((tile_height, tile_width, 3), dtype=np.float64)
+        for row in range(tile_height):
+            j = image_height - 1 - (y0 + row)
+            for col in range(tile_width):
+                color = self._sample_pixel(scene, camera, x0 + col, j, image_width, image_height)
+                tile[row, col] = (color.x, color.y, color.z)
+        
+        return tile
+    
+    def render_to_file(self, scene, camera, image_width, image_height, filename,
+                       tile_size=64, dtype='float32', framebuffer_path=None, strip_height=64):
+        """
+        分块渲染并直接输出到文件（内存占用只与图块大小有关，适合超大分辨率）
+        
+        完成的图块写入磁盘上的内存映射帧缓冲，最后按条带流式编码为 PNG/TIFF。
+        
+        Args:
+            scene: HittableList - 场景
+            camera: Camera - 相机
+            image_width, image_height: int - 图像尺寸
+            filename: str - 输出文件（.png / .tif / .tiff）
+            tile_size: int - 图块边长
+            dtype: str - 帧缓冲精度 ('float16' 或 'float32')
+            framebuffer_path: str - 帧缓冲文件路径（默认 filename + '.fb.npy'，渲染后保留，
+                              可用 np.load(path, mmap_mode='r') 读取浮点结果）
+            strip_height: int - 输出编码时每次读取的行数
+        """
+        from src.framebuffer import TiledFramebuffer, export_strips
+        
+        if framebuffer_path is None:
+            framebuffer_path = filename + '.fb.npy'
+        
+        print(f"开始分块渲染 {image_width}x{image_height} 图像（图块 {tile_size}x{tile_size}）...")
+        print(f"每像素采样数: {self.samples_per_pixel}")
+        print(f"帧缓冲: {framebuffer_path} ({dtype})")
+        
+        framebuffer = TiledFramebuffer(framebuffer_path, image_width, image_height, dtype)
+        try:
+            for y0 in range(0, image_height, tile_size):
+                tile_height = min(tile_size, image_height - y0)
+                for x0 in range(0, image_width, tile_size):
+                    tile_width = min(tile_size, image_width - x0)
+                    tile = self.render_tile(scene, camera, image_width, image_height,
+                                            x0, y0, tile_width, tile_height)
+                    framebuffer.write_tile(x0, y0, tile)
+                
+                # 每完成一行图块就刷盘，已写完的页面可被系统回收
+                framebuffer.flush()
+                print(f"进度: {y0 + tile_height}/{image_height} 行")
+            
+            export_strips(framebuffer, filename, strip_height)
+        finally:
+            framebuffer.close()
+        
+        print(f"图像已保存到: {filename}")
+    
+    def _sample_pixel(self, scene, camera, i, j, image_width, image_height):
+        """
+        计算单个像素的颜色（多重采样抗锯齿）
+        
+        Args:
+            i: int - 像素列
+            j: int - 像素行（从图像底部开始计）
+        """
+        pixel_color = Vector3(0, 0, 0)
+        
+        for _ in range(self.samples_per_pixel):
+            # 添加随机偏移
+            u = (i + random.random()) / (image_width - 1)
+            v = (j + random.random()) / (image_height - 1)
+            
+            ray = camera.get_ray(u, v)
+            pixel_color = pixel_color + self.ray_color(ray, scene, self.max_depth)
+        
+        # 平均颜色
+        return pixel_color / self.samples_per_pixel
+    
+    def _render_jit(self, scene, camera, image_width, image_height, x0, y0, tile_width, tile_height):
+        """使用 Numba 编译的内核渲染一个图块，返回 ndarray"""
+        from src import jit_backend
+        
+        scene_arrays = jit_backend.pack_scene(scene)
+        camera_array = jit_backend.pack_camera(camera)
+        
+        return jit_backend.render_kernel(
+            image_width, image_height, x0, y0, tile_width, tile_height,
+            self.samples_per_pixel, self.max_depth, camera_array, *scene_arrays
+        )
+    
     def ray_color(self, ray, scene, depth):
         """
         计算光线的颜色（递归路径追踪）
@@ -154,4 +282,35 @@ class Renderer:
         # 保存图像
         img = Image.fromarray(img_array)
         img.save(filename)
-        print(f"图像已保存到: {filename}")
\ No newline at end of file
+        print(f"图像已保存到: {filename}")
+    
+    @staticmethod
+    def save_image_array(image, filename):
+        """
+        保存 ndarray 形式的渲染结果为图像
+        
+        Args:
+            image: ndarray (H, W, 3) - 线性颜色，第0行为图像顶部
+            filename: str - 输出文件名
+        """
+        from PIL import Image
+        
+        img = Image.fromarray(Renderer.to_rgb8(image))
+        img.save(filename)
+        print(f"图像已保存到: {filename}")
+    
+    @staticmethod
+    def to_rgb8(image):
+        """
+        线性颜色 ndarray -> 8 位 RGB 数组（与 save_image 相同的伽马校正和裁剪）
+        
+        Args:
+            image: ndarray (H, W, 3) - 线性颜色
+            
+        Returns:
+            ndarray uint8 (H, W, 3)
+        """
+        import numpy as np
+        
+        # 伽马校正（gamma = 2.0），裁剪到[0, 1]并转换到[0, 255]
+        return (256 * np.clip(np.sqrt(np.maximum(image, 0)), 0, 0.999)).astype(np.uint8)
@@ -0,0 +1,95 @@
+"""
+场景序列化 - 场景、材质、相机与 JSON 字典互转，以及内容哈希
+"""
+import hashlib
+import json
+
+from src.vector3 import Vector3
+from src.camera import Camera
+from src.objects import HittableList, Sphere
+from src.material import Lambertian, Metal, Dielectric
+
+
+def _vec(v):
+    return [v.x, v.y, v.z]
+
+
+def material_to_dict(material):
+    """材质 -> 字典"""
+    if isinstance(material, Lambertian):
+        return {'type': 'lambertian', 'albedo': _vec(material.albedo)}
+    if isinstance(material, Metal):
+        return {'type': 'metal', 'albedo': _vec(material.albedo), 'fuzz': material.fuzz}
+    if isinstance(material, Dielectric):
+        return {'type': 'dielectric', 'refractive_index': material.refractive_index}
+    raise TypeError(f"无法序列化的材质: {type(material).__name__}")
+
+
+def material_from_dict(data):
+    """字典 -> 材质"""
+    kind = data['type']
+    if kind == 'lambertian':
+        return Lambertian(Vector3(*data['albedo']))
+    if kind == 'metal':
+        return Metal(Vector3(*data['albedo']), data.get('fuzz', 0.0))
+    if kind == 'dielectric':
+        return Dielectric(data['refractive_index'])
+    raise ValueError(f"未知的材质类型: {kind}")
+
+
+def scene_to_dict(scene):
+    """场景 -> 字典"""
+    objects = []
+    for obj in scene.objects:
+        if not isinstance(obj, Sphere):
+            raise TypeError(f"无法序列化的物体: {type(obj).__name__}")
+        objects.append({
+            'type': 'sphere',
+            'center': _vec(obj.center),
+            'radius': obj.radius,
+            'material': material_to_dict(obj.material),
+        })
+    return {'objects': objects}
+
+
+def scene_from_dict(data):
+    """字典 -> 场景"""
+    scene = HittableList()
+    for obj in data['objects']:
+        if obj['type'] != 'sphere':
+            raise ValueError(f"未知的物体类型: {obj['type']}")
+        scene.add(Sphere(Vector3(*obj['center']), obj['radius'], material_from_dict(obj['material'])))
+    return scene
+
+
+def camera_to_dict(camera):
+    """相机 -> 字典"""
+    return {
+        'look_from': _vec(camera.look_from),
+        'look_at': _vec(camera.look_at),
+        'vup': _vec(camera.vup),
+        'vfov': camera.vfov,
+        'aspect_ratio': camera.aspect_ratio,
+    }
+
+
+def camera_from_dict(data):
+    """字典 -> 相机"""
+    return Camera(
+        look_from=Vector3(*data['look_from']),
+        look_at=Vector3(*data['look_at']),
+        vup=Vector3(*data['vup']),
+        vfov=data['vfov'],
+        aspect_ratio=data['aspect_ratio']
+    )
+
+
+def content_hash(data):
+    """
+    计算 JSON 兼容数据的内容哈希（键排序，与字典插入顺序无关）
+
+    Returns:
+        str - SHA-256 十六进制摘要
+    """
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
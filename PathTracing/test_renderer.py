@@ -0,0 +1,362 @@
+"""
+渲染器测试脚本
+验证渲染后端的结果一致性和渲染辅助功能
+"""
+import os
+import random
+import tempfile
+import numpy as np
+from PIL import Image
+
+from src.vector3 import Vector3
+from src.camera import Camera
+from src.objects import HittableList, Sphere
+from src.material import Metal
+from src.renderer import Renderer
+from src.render_cache import RenderCache
+from src import jit_backend
+from scenes.demo_scene import create_demo_scene, create_simple_scene
+
+
+def _create_camera(aspect_ratio):
+    return Camera(
+        look_from=Vector3(0, 0, 0),
+        look_at=Vector3(0, 0, -1),
+        vup=Vector3(0, 1, 0),
+        vfov=90,
+        aspect_ratio=aspect_ratio
+    )
+
+
+def _create_mirror_scene():
+    """只含完美镜面的场景：光线路径完全确定"""
+    scene = HittableList()
+    scene.add(Sphere(Vector3(0, -100.5, -1), 100, Metal(Vector3(0.8, 0.8, 0.8), 0.0)))
+    scene.add(Sphere(Vector3(0, 0, -1), 0.5, Metal(Vector3(0.8, 0.6, 0.2), 0.0)))
+    scene.add(Sphere(Vector3(-1, 0, -1), 0.5, Metal(Vector3(0.2, 0.6, 0.8), 0.0)))
+    return scene
+
+
+def test_ray_color_parity():
+    """测试 1: 确定性场景中 JIT 内核与 ray_color 逐光线一致"""
+    print("="*60)
+    print("测试 1: ray_color 逐光线一致性")
+    print("="*60)
+
+    random.seed(0)
+    jit_backend.seed(0)
+
+    scene = _create_mirror_scene()
+    camera = _create_camera(16.0 / 9.0)
+    renderer = Renderer(max_depth=10)
+    scene_arrays = jit_backend.pack_scene(scene)
+
+    max_error = 0.0
+    for j in range(9):
+        for i in range(16):
+            ray = camera.get_ray(i / 15, j / 8)
+            expected = renderer.ray_color(ray, scene, renderer.max_depth)
+            actual = jit_backend.trace_ray(
+                ray.origin.x, ray.origin.y, ray.origin.z,
+                ray.direction.x, ray.direction.y, ray.direction.z,
+                renderer.max_depth, *scene_arrays
+            )
+            error = max(abs(expected.x - actual[0]), abs(expected.y - actual[1]), abs(expected.z - actual[2]))
+            max_error = max(max_error, error)
+
+    print(f"\n最大误差: {max_error:.2e}")
+    assert max_error < 1e-9, f"ray_color 结果不一致: {max_error}"
+    print("✓ 逐光线结果一致")
+
+
+def test_render_parity():
+    """测试 2: 随机场景中两种后端的图像统计一致"""
+    print("\n" + "="*60)
+    print("测试 2: 整幅图像统计一致性")
+    print("="*60)
+
+    # 没有 numba 时 backend='numba' 会回退到 Python 路径，比较失去意义
+    if not jit_backend.NUMBA_AVAILABLE:
+        print("✗ 未安装 numba，跳过此测试")
+        return
+
+    aspect_ratio = 2.0
+    width, height = 16, 8
+    scene = create_demo_scene()
+    camera = _create_camera(aspect_ratio)
+
+    random.seed(0)
+    reference = Renderer(max_depth=10, samples_per_pixel=64, backend='python')
+    expected = np.array([[(c.x, c.y, c.z) for c in row]
+                         for row in reference.render(scene, camera, width, height)])
+
+    jit_backend.seed(0)
+    jit = Renderer(max_depth=10, samples_per_pixel=64, backend='numba')
+    assert jit.backend == 'numba', f"未选用 JIT 后端: {jit.backend}"
+    actual = np.array([[(c.x, c.y, c.z) for c in row]
+                       for row in jit.render(scene, camera, width, height)])
+
+    assert actual.shape == expected.shape, "图像尺寸不一致"
+
+    mean_error = abs(actual.mean() - expected.mean())
+    pixel_error = np.abs(actual - expected).mean()
+    print(f"\n平均亮度差: {mean_error:.4f}")
+    print(f"平均像素差: {pixel_error:.4f}")
+
+    assert mean_error < 0.02, f"平均亮度差异过大: {mean_error}"
+    assert pixel_error < 0.05, f"平均像素差异过大: {pixel_error}"
+    print("✓ 图像统计一致")
+
+
+def test_render_cache():
+    """测试 3: 渲染结果缓存（命中、spp 增量复用、LRU 淘汰）"""
+    print("\n" + "="*60)
+    print("测试 3: 渲染结果缓存")
+    print("="*60)
+
+    width, height = 8, 4
+    scene = create_demo_scene()
+    camera = _create_camera(2.0)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = RenderCache(cache_dir)
+        renderer = Renderer(max_depth=5, samples_per_pixel=4)
+
+        first = cache.render(renderer, scene, camera, width, height, seed=1)
+        second = cache.render(renderer, scene, camera, width, height, seed=1)
+        assert np.array_equal(first, second), "缓存命中结果不一致"
+
+        # 不同相机应得到不同的键
+        other_camera = _create_camera(2.0)
+        other_camera.vfov = 60
+        key = cache.make_key(scene, camera, width, height, 5, 'python', 1)
+        assert key != cache.make_key(scene, other_camera, width, height, 5, 'python', 1), "相机参数未参与哈希"
+
+        # 只增大 spp 时复用已缓存样本
+        renderer.samples_per_pixel = 12
+        upgraded = cache.render(renderer, scene, camera, width, height, seed=1)
+        assert upgraded.shape == first.shape, "增量渲染尺寸错误"
+        reuse_key = cache.make_reuse_key(key, 4)
+        assert cache.get(reuse_key, 12) is not None, "增量渲染结果未写入缓存"
+        assert np.array_equal(cache.render(renderer, scene, camera, width, height, seed=1), upgraded), \
+            "相同的增量渲染请求结果不一致"
+
+        # 增量结果不写入完整渲染的键：同一个键总是对应同一幅图像
+        assert cache.get(key, 12) is None, "增量渲染结果写入了完整渲染的键"
+        with tempfile.TemporaryDirectory() as other_dir:
+            other_cache = RenderCache(other_dir)
+            full = other_cache.render(renderer, scene, camera, width, height, seed=1)
+            assert np.array_equal(other_cache.get(key, 12), full), "完整渲染结果未写入缓存"
+            assert np.array_equal(full, other_cache.render(renderer, scene, camera, width, height, seed=1)), \
+                "完整渲染的缓存命中结果不一致"
+        print("\n✓ 命中与增量复用正常")
+
+        # 容量上限：只保留最近写入的条目
+        cache.max_bytes = first.nbytes + 200
+        cache.put(key, 99, first)
+        assert cache.get(key, 99) is not None, "最新条目被错误淘汰"
+        assert cache.get(key, 4) is None, "超出容量的旧条目未被淘汰"
+        print("✓ LRU 淘汰正常")
+
+
+def test_tiled_output():
+    """测试 4: 分块输出（内存映射帧缓冲 + 条带编码 PNG/TIFF）"""
+    print("\n" + "="*60)
+    print("测试 4: 分块输出")
+    print("="*60)
+
+    width, height = 21, 13
+    scene = create_demo_scene()
+    camera = _create_camera(width / height)
+    renderer = Renderer(max_depth=5, samples_per_pixel=2)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        png_path = os.path.join(output_dir, 'tiled.png')
+        renderer.render_to_file(scene, camera, width, height, png_path, tile_size=8, strip_height=5)
+
+        framebuffer = np.load(png_path + '.fb.npy', mmap_mode='r')
+        expected = Renderer.to_rgb8(np.asarray(framebuffer, dtype=np.float32))
+        assert framebuffer.shape == (height, width, 3), "帧缓冲尺寸错误"
+
+        with Image.open(png_path) as img:
+            assert np.array_equal(np.asarray(img), expected), "PNG 条带编码结果错误"
+
+        tiff_path = os.path.join(output_dir, 'tiled.tif')
+        renderer.render_to_file(scene, camera, width, height, tiff_path,
+                                tile_size=8, dtype='float16', strip_height=4)
+        framebuffer = np.load(tiff_path + '.fb.npy', mmap_mode='r')
+        expected = Renderer.to_rgb8(np.asarray(framebuffer, dtype=np.float32))
+
+        with Image.open(tiff_path) as img:
+            assert np.array_equal(np.asarray(img), expected), "TIFF 条带编码结果错误"
+        del framebuffer
+
+    print("\n✓ PNG/TIFF 分块输出正确")
+
+
+def test_render_server():
+    """测试 5: 渲染服务（优先级调度、流式图块拼接、无效请求）"""
+    print("\n" + "="*60)
+    print("测试 5: 渲染服务")
+    print("="*60)
+
+    import asyncio
+    import http.client
+    import json
+    import render_client
+    from render_server import RenderServer, RenderJob, SceneNotCached, _render_tile_task
+
+    settings = {'width': 8, 'height': 6, 'samples_per_pixel': 2, 'max_depth': 5, 'tile_size': 4, 'seed': 3}
+    request = {'scene': 'simple', 'settings': settings}
+
+    def post(port, body):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        try:
+            conn.request('POST', '/jobs', body=body)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+
+    async def run():
+        server = RenderServer(workers=1)
+        await server.start()
+        listener = await asyncio.start_server(server.handle_client, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+
+        try:
+            # 两个任务在调度协程取出图块之前入队：后提交的高优先级任务应先完成全部图块
+            low = RenderJob(next(server._job_ids), dict(request, priority=0))
+            high = RenderJob(next(server._job_ids), dict(request, priority=5))
+            server.submit(low)
+            server.submit(high)
+
+            order = []
+
+            async def collect(job):
+                for _ in job.tiles:
+                    await job.results.get()
+                    order.append(job.job_id)
+
+            await asyncio.gather(collect(low), collect(high))
+
+            # 通过 HTTP 提交，拼接流式返回的图块
+            loop = asyncio.get_running_loop()
+            image = await loop.run_in_executor(None, render_client.render, request, '127.0.0.1', port)
+
+            # 合法 JSON 但不是对象的任务描述应返回 400
+            rejected = [await loop.run_in_executor(None, post, port, body) for body in ('[]', '"x"')]
+        finally:
+            listener.close()
+            await server.close()
+
+        return low, high, order, image, rejected
+
+    low, high, order, image, rejected = asyncio.run(run())
+
+    assert order == [high.job_id] * len(high.tiles) + [low.job_id] * len(low.tiles), f"调度顺序错误: {order}"
+    print(f"\n✓ 高优先级任务先执行: {order}")
+
+    for status, response in rejected:
+        assert status == 400, f"非对象的任务描述应返回 400: {status} {response}"
+    print("✓ 非对象的任务描述返回 400")
+
+    # 未缓存的场景只发送哈希时应要求重新附带场景数据
+    try:
+        _render_tile_task(low.scene_key, None, low.camera_data, low.settings, low.tiles[0])
+    except SceneNotCached:
+        pass
+    else:
+        raise AssertionError("未缓存的场景应抛出 SceneNotCached")
+
+    # 固定种子时每个图块可复现，在本进程逐块渲染作为参照
+    expected = np.zeros((settings['height'], settings['width'], 3), dtype=np.float32)
+    for tile in low.tiles:
+        _, x0, y0, tile_width, tile_height = tile
+        expected[y0:y0 + tile_height, x0:x0 + tile_width] = _render_tile_task(
+            low.scene_key, low.scene_data, low.camera_data, low.settings, tile
+        )
+
+    assert image.shape == expected.shape, "拼接图像尺寸错误"
+    assert np.array_equal(image, expected), "流式图块拼接结果与逐块渲染不一致"
+    print("✓ 流式图块拼接为完整图像")
+
+
+def test_progressive():
+    """测试 6: 渐进式渲染（逐遍累积、停止与重新启动）"""
+    print("\n" + "="*60)
+    print("测试 6: 渐进式渲染")
+    print("="*60)
+
+    from src.progressive import ProgressiveRenderer
+
+    width, height, spp = 8, 4, 2
+    scene = create_simple_scene()
+    camera = _create_camera(width / height)
+
+    def render_reference(samples_per_pixel):
+        random.seed(0)
+        renderer = Renderer(max_depth=5, samples_per_pixel=samples_per_pixel)
+        return np.array([[(c.x, c.y, c.z) for c in row]
+                         for row in renderer.render(scene, camera, width, height)])
+
+    def accumulate(progressive, passes):
+        while progressive.passes < passes:
+            assert progressive.wait_for_pass(progressive.passes, progressive.snapshot()[2], timeout=30), "等待采样超时"
+        return progressive.snapshot()[0]
+
+    # 第一遍与相同种子、相同 spp 的 render() 消耗随机数的顺序一致，结果相同
+    random.seed(0)
+    progressive = ProgressiveRenderer(Renderer(max_depth=5, samples_per_pixel=spp), scene, camera,
+                                      width, height, band_height=3, max_passes=1)
+    progressive.start()
+    first = accumulate(progressive, 1)
+    # 采样线程达到 max_passes 后空闲，不会与参照渲染争用全局随机数
+    assert np.allclose(first, render_reference(spp), atol=1e-6), "第一遍结果与 render() 不一致"
+    print("\n✓ 第一遍与 render() 结果一致")
+
+    # 累积多遍后收敛到相同总样本数的 render() 结果
+    progressive.max_passes = 16
+    image = accumulate(progressive, 16)
+    reference = render_reference(16 * spp)
+    first_error = np.abs(first - reference).mean()
+    error = np.abs(image - reference).mean()
+    print(f"平均像素差: 1 遍 {first_error:.4f}, 16 遍 {error:.4f}")
+    assert error < first_error and error < 0.05, "累积结果没有收敛"
+
+    # 停止后线程已退出；切换相机清空累积，重新启动后继续采样
+    progressive.stop()
+    assert not progressive.running and not progressive._thread.is_alive(), "停止后采样线程仍在运行"
+
+    other_camera = _create_camera(width / height)
+    other_camera.vfov = 60
+    progressive.set_camera(other_camera)
+    _, passes, generation = progressive.snapshot()
+    assert passes == 0 and generation == 1, "切换相机后未清空累积结果"
+
+    progressive.max_passes = None
+    progressive.start()
+    accumulate(progressive, 2)
+    progressive.stop()
+    assert not progressive.running, "重新启动后无法停止"
+    print("✓ 停止与重新启动正常")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print(f"Numba 可用: {jit_backend.NUMBA_AVAILABLE}\n")
+
+    test_ray_color_parity()
+    test_render_parity()
+    test_render_cache()
+    test_tiled_output()
+    test_render_server()
+    test_progressive()
+
+    print("\n" + "="*60)
+    print("✓ 所有测试通过！")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    run_all_tests()